@@ -1,5 +1,55 @@
-from .initialize import SAPModel
-from .outputs.frame_output import FrameJtForces, FrameForces, FrameElmSort, Frame_Stress_Avg
-from .outputs.shell_output import W_A_Eq, AreaForceShell, Shell_Stress_Avg
-from .outputs.structure_output import base_reactions
-from .outputs.joint_output import JointReact
+## sap2k
+# Public names are imported from their submodules on first use, so importing
+# the package loads neither pandas nor the COM client and post-processing
+# functions can be used on machines without SAP2000.
+
+import importlib
+
+# Public name -> submodule defining it
+_EXPORTS = {
+    'SAPModel': '.initialize',
+    'FrameJtForces': '.outputs.frame_output',
+    'FrameForces': '.outputs.frame_output',
+    'FrameElmSort': '.outputs.frame_output',
+    'Frame_Stress_Avg': '.outputs.frame_output',
+    'FrameForcesIter': '.outputs.frame_output',
+    'W_A_Eq': '.outputs.shell_output',
+    'W_A_Eq_Array': '.outputs.shell_output',
+    'AreaForceShell': '.outputs.shell_output',
+    'AreaForceShellIter': '.outputs.shell_output',
+    'Shell_Stress_Avg': '.outputs.shell_output',
+    'wood_armer_fields': '.outputs.shell_output',
+    'SectionCutForces': '.outputs.shell_output',
+    'base_reactions': '.outputs.structure_output',
+    'BaseReactionTensor': '.outputs.structure_output',
+    'ReactionTensor': '.functions.reactions',
+    'JointReact': '.outputs.joint_output',
+    'ResultSession': '.functions.session',
+    'ResultCache': '.functions.cache',
+    'ResultStore': '.functions.store',
+    'Profiler': '.functions.profiler',
+    'AsyncSession': '.aio',
+    'LocalCombos': '.functions.combos',
+    'Envelope': '.functions.envelope',
+    'IncidenceOperator': '.functions.averaging',
+    'spatial_index': '.functions.spatial',
+    'Selection': '.functions.spatial',
+    'SectionCuts': '.functions.strips',
+    'strip_cuts': '.functions.strips',
+    'convert_units': '.functions.units',
+}
+
+__all__ = list(_EXPORTS)
+
+
+def __getattr__(name):
+    module = _EXPORTS.get(name)
+    if module is None:
+        raise AttributeError("module {0!r} has no attribute {1!r}".format(__name__, name))
+    value = getattr(importlib.import_module(module, __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
@@ -0,0 +1,151 @@
+## Asynchronous SAP2000 Session
+# This module runs extractions on a single worker thread which owns the
+# SapModel, so that asyncio code can await results while it processes earlier
+# ones. COM objects are bound to the apartment of the thread that created
+# them, so the model is created on the worker thread and every OAPI call is
+# made there, one job at a time in submission order.
+
+import asyncio
+import collections
+import concurrent.futures
+import threading
+
+from .functions.session import ResultSession
+
+
+class AsyncSession:
+    """
+    Asyncio facade over one SAP2000 model.
+
+    Variable Definitions:
+      factory     = Callable run on the worker thread returning the SapModel,
+                    e.g. lambda: SAPModel('24', AttachToInstance=True).SapModel.
+                    COM objects must be created this way.
+      model       = Model to use in place of a factory, for objects which may
+                    be used from any thread (e.g. testing.FakeSapModel)
+
+    The model is wrapped in a ResultSession, so back to back extractions only
+    change the units, options and selections that differ. Extraction
+    coroutines return once the worker has finished the call, leaving the
+    event loop free in the meantime.
+
+    Example:
+      async with AsyncSession(factory) as session:
+          async for case, table in session.iter_cases(AreaForceShell, cases, groups):
+              report(case, table)     # overlaps extraction of the next case
+    """
+
+    def __init__(self, factory=None, model=None):
+        if (factory is None) == (model is None):
+            raise ValueError("Give either a factory or a model.")
+        self._executor = concurrent.futures.ThreadPoolExecutor(
+            max_workers=1, thread_name_prefix='sap2k-com',
+            initializer=self._start, initargs=(factory, model))
+        self._session = None
+        self.thread_id = None
+
+    def _start(self, factory, model):
+        # Runs on the worker thread: enter a COM apartment and create the model
+        self._com = None
+        try:
+            import comtypes
+            comtypes.CoInitialize()
+            self._com = comtypes
+        except ImportError:
+            pass
+        self.thread_id = threading.get_ident()
+        self._session = ResultSession(factory() if model is None else model)
+
+    def _stop(self):
+        if self._com is not None:
+            self._com.CoUninitialize()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.close()
+
+    async def close(self):
+        """Wait for queued jobs and stop the worker thread."""
+        if self._session is not None:
+            await self.call(lambda model: self._stop())
+        await asyncio.get_running_loop().run_in_executor(None, self._executor.shutdown)
+
+    async def call(self, func, *args, **kwargs):
+        """Run func(model, *args, **kwargs) on the worker thread and return
+        its result."""
+        return await asyncio.wrap_future(self.submit(func, *args, **kwargs))
+
+    def submit(self, func, *args, **kwargs):
+        """Queue func(model, *args, **kwargs) on the worker thread and return
+        a concurrent.futures.Future of its result."""
+        return self._executor.submit(self._run, func, args, kwargs)
+
+    def _run(self, func, args, kwargs):
+        return func(self._session, *args, **kwargs)
+
+    async def iter_cases(self, func, LoadCases, *args, prefetch=1, **kwargs):
+        """
+        Extract load cases one at a time, yielding (case, table) in order.
+        The next prefetch cases are queued before each table is yielded, so
+        the worker extracts them while the caller processes it.
+
+        Variable Definitions:
+          func        = Output function taking (model, LoadCases, ...), e.g.
+                        AreaForceShell or JointReact
+          LoadCases   = Load cases and combinations to extract
+          prefetch    = Number of cases extracted ahead (Default 1)
+
+        Cases queued ahead are cancelled when the loop is left early. An
+        extraction which has already started on the worker runs to the end.
+        Wrap the generator in contextlib.aclosing to cancel them as soon as
+        the loop is left rather than when the generator is collected.
+        """
+        cases = iter([LoadCases] if isinstance(LoadCases, str) else LoadCases)
+        pending = collections.deque()
+
+        def queue_next():
+            for case in cases:
+                future = self.submit(func, case, *args, **kwargs)
+                pending.append((case, future))
+                return
+
+        try:
+            for _ in range(prefetch + 1):
+                queue_next()
+            while pending:
+                case, future = pending.popleft()
+                table = await asyncio.wrap_future(future)
+                queue_next()
+                yield case, table
+        finally:
+            for case, future in pending:
+                future.cancel()
+
+    # ---- Output functions ----
+
+    async def area_force_shell(self, LoadCases, Groups, **kwargs):
+        """Awaitable outputs.shell_output.AreaForceShell."""
+        from .outputs.shell_output import AreaForceShell
+        return await self.call(AreaForceShell, LoadCases, Groups, **kwargs)
+
+    async def frame_forces(self, LoadCases, Groups, **kwargs):
+        """Awaitable outputs.frame_output.FrameForces."""
+        from .outputs.frame_output import FrameForces
+        return await self.call(FrameForces, LoadCases, Groups, **kwargs)
+
+    async def frame_jt_forces(self, LoadCases, Groups, **kwargs):
+        """Awaitable outputs.frame_output.FrameJtForces."""
+        from .outputs.frame_output import FrameJtForces
+        return await self.call(FrameJtForces, LoadCases, Groups, **kwargs)
+
+    async def joint_react(self, LoadCases, Groups, **kwargs):
+        """Awaitable outputs.joint_output.JointReact."""
+        from .outputs.joint_output import JointReact
+        return await self.call(JointReact, LoadCases, Groups, **kwargs)
+
+    async def base_reactions(self, LoadCases, **kwargs):
+        """Awaitable outputs.structure_output.base_reactions."""
+        from .outputs.structure_output import base_reactions
+        return await self.call(base_reactions, LoadCases, **kwargs)
@@ -8,3 +8,4 @@ def load_json(file_name):
 
 units = load_json('units.json')
 sap_paths = load_json('sap_paths.json')
+unit_factors = load_json('unit_factors.json')
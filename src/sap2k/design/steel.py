@@ -1,37 +1,239 @@
 """
 This module processes and reports on the steel design module in SAP 2000
+
+Design summaries can be kept in a functions.cache.ResultCache. Summaries are
+stored per group under a signature of the group's frame sections, frame
+loads and design combinations, so after an edit only the groups whose
+signature changed have to be designed again (see StartDesign).
 """
-from ..functions.helpers import result_setup, select_groups
+from ..functions.helpers import result_setup, select_groups, model_fingerprint, unit_code
+from ..functions.groups import group_index
+from ..functions.results import ResultTable, CodedColumn
+from ..functions.averaging import factorize
+from ..functions.combos import read_combos
+from ..functions.tables import display_table
 
-def StartDesign(model):
-    #Are Design Results Available?
-    design_status = model.DesignSteel.GetResultsAvailable()
+import hashlib
+import json
 
-    if design_status:
-        return
-    else:
+import numpy as np
+
+# The names of each of the SAP2000 Output Parameters
+FIELD_NAMES = ["NumberItems", "FrameName", "Ratio", "RatioType",
+               "Location", "ComboName", "ErrorSummary",
+               "WarningSummary", "ret"]
+
+# Database table of the section assigned to each frame object
+SECTION_TABLE = 'Frame Section Assignments'
+
+
+def StartDesign(model, Groups=None, Cache=None, Units=4):
+    """Run the steel design when no design results are available and save
+    the model.
+
+    Variable Definitions:
+      Groups      = Groups to design (Default all frames)
+      Cache       = Optional ResultCache. With Groups, only groups whose
+                    frame sections, frame loads or design combinations
+                    changed since their summary was cached are designed:
+                    their frames are selected before StartDesign, which
+                    designs only the selected frames, whether or not design
+                    results are available. The new summaries are added to
+                    the cache.
+      Units       = Units of the cached summaries
+      Returns     = List of the groups designed (None without a Cache)
+
+    Force changes in a group caused by edits to other groups (e.g. stiffness
+    redistribution) are not detected, design such groups explicitly by
+    leaving them out of the cache.
+    """
+    if Cache is None or Groups is None:
+        #Are Design Results Available?
+        if model.DesignSteel.GetResultsAvailable():
+            return
         model.DesignSteel.StartDesign()
         model.File.Save()
+        return
+
+    keys = design_keys(model, Groups, Units)
+    dirty = [grp for grp in Groups if keys[grp] is None or Cache.get(keys[grp]) is None]
+    if not dirty:
+        return dirty
+
+    # Existing design results may predate the edits, so always redesign
+    select_groups(model, dirty)
+    model.DesignSteel.StartDesign()
+    select_groups(model, [])
+    model.File.Save()
+
+    result_setup(model, Units=Units)
+    for grp in dirty:
+        if keys[grp] is not None:
+            Cache.put(keys[grp], _group_summary(model, grp, Units))
+    return dirty
+
+
+def design_signatures(model, Groups):
+    """
+    This function returns a hash of the design inputs of each group: the
+    section of each of its frames, the distributed and point loads assigned
+    to them and the definition of the steel design combinations.
+
+    Variable Definitions:
+      Groups      = Groups to sign
+      Returns     = {group: hex digest}
+    """
+    index = group_index(model, Groups)
+    frames = list(dict.fromkeys(nm for grp in Groups for nm in index.names(grp, 'Frame')))
+    sections = frame_sections(model, frames)
 
+    # Combinations are shared by every group
+    combo_names = list(model.DesignSteel.GetComboStrength()[1])
+    combos = read_combos(model, combo_names) if combo_names else {}
+    shared = sorted([nm, typ, [list(item) for item in items]] for nm, (typ, items) in combos.items())
 
-def GetSummaryResults(model, groups=list|None, Units=4):
-    
-    # The names of each of the SAP2000 Output Parameters
-    field_names = ["NumberItems", "FrameName", "Ratio", "RatioType",
-                    "Location", "ComboName", "ErrorSummary",
-                    "WarningSummary"]
-    
-    #Prepare the Model for Output
-    result_setup(model,Units = Units)
+    signatures = {}
+    for grp in Groups:
+        distributed = model.FrameObj.GetLoadDistributed(grp, ItemType=1)
+        point = model.FrameObj.GetLoadPoint(grp, ItemType=1)
+        parts = [sorted([nm, sections[nm]] for nm in index.names(grp, 'Frame')),
+                 sorted(map(list, zip(*distributed[1:-1]))),
+                 sorted(map(list, zip(*point[1:-1]))),
+                 shared]
+        signatures[grp] = hashlib.sha256(json.dumps(parts, default=str).encode()).hexdigest()
+    return signatures
+
+
+def frame_sections(model, frames):
+    """Return {frame: section} of the given frames, read from the frame
+    section assignments table in one call. Frames missing from the table
+    are read with FrameObj.GetSection."""
+    table = display_table(model, SECTION_TABLE)
+    sections = dict(zip(table['Frame'], table['AnalSect'])) if table else {}
+    return {nm: sections[nm] if nm in sections else model.FrameObj.GetSection(nm)[0]
+            for nm in frames}
+
+
+def design_keys(model, Groups, Units=4):
+    """Return the cache key of the design summary of each group, or None for
+    every group when the model has not been saved to disk."""
+    fingerprint = model_fingerprint(model)
+    if fingerprint[1] is None:
+        return {grp: None for grp in Groups}
+    signatures = design_signatures(model, Groups)
+    return {grp: hashlib.sha256(json.dumps([fingerprint[0], 'DesignSteel', grp, signatures[grp],
+                                            unit_code(Units)]).encode()).hexdigest()
+            for grp in Groups}
+
+
+def _group_summary(model, grp, Units):
+    # Design summary of the frames of one group, labeled with the group
+    output = model.DesignSteel.GetSummaryResults(grp, ItemType=1)
+    table = ResultTable.from_output(FIELD_NAMES, output, Units=unit_code(Units))
+    return table.with_columns(Group=CodedColumn(table.pool.encode([grp] * table.nrows)))
+
+
+def GetSummaryResults(model, groups=list|None, Units=4, Cache=None, GroupLabels=False):
+    """This function returns the steel design summary of the frames in the
+    given groups as a ResultTable.
+
+    Variable Definitions:
+      groups      = List of selection groups
+      Units       = Units of the reported locations
+      Cache       = Optional ResultCache. The summary is read from the cache
+                    while the model file is unchanged, and otherwise each
+                    group is read from the cache while its design inputs are
+                    unchanged (see StartDesign), so only edited groups are
+                    read from SAP2000.
+      GroupLabels = When True add a 'Group' column naming the group of the
+                    frame in each row. Frames in several groups are then
+                    repeated once per group.
+    """
+    if Cache is None:
+        #Prepare the Model for Output
+        result_setup(model,Units = Units)
+
+        # Select elements in groups
+        select_groups(model, groups)
+
+        output = model.DesignSteel.GetSummaryResults("",ItemType=2)
+        table = ResultTable.from_output(FIELD_NAMES, output, Units=unit_code(Units))
+        if GroupLabels:
+            table = group_index(model, groups).tag(table, groups, 'Frame', on='FrameName')
+        return table
+
+    method = 'DesignSteel.GetSummaryResults' + (':Group' if GroupLabels else '')
+    key = Cache.key(model, method, [], groups, Units)
+    table = None if key is None else Cache.get(key)
+    if table is None:
+        result_setup(model, Units=Units)
+        group_keys = design_keys(model, groups, Units)
+        parts = []
+        for grp in groups:
+            part = None if group_keys[grp] is None else Cache.get(group_keys[grp])
+            if part is None:
+                part = _group_summary(model, grp, Units)
+                if group_keys[grp] is not None and part.nrows:
+                    Cache.put(group_keys[grp], part)
+            parts.append(part)
+        table = ResultTable.concat(parts)
+        if not GroupLabels and table.nrows:
+            # One row per frame, as from a selection of the groups
+            first_rows = np.sort(factorize(table, ['FrameName'])[1])
+            table = table.take(first_rows)
+            table = ResultTable({fldnm: col for fldnm, col in table.items() if fldnm != 'Group'},
+                                Units=table.Units, pool=table.pool)
+        if key is not None:
+            Cache.put(key, table)
+    return table
+
+
+def DesignSummary(Summary, Threshold=1.0):
+    """
+    This function reduces a design summary to one row per group.
+
+    Variable Definitions:
+      Summary     = ResultTable from GetSummaryResults with GroupLabels=True
+                    (all rows form one group without a 'Group' column)
+      Threshold   = Ratio above which a frame is counted as overstressed
+      Returns     = ResultTable with Group, the governing FrameName, Ratio,
+                    ComboName and Location, and the NumberFrames,
+                    NumberOver (Ratio > Threshold) and NumberErrors of each
+                    group
+    """
+    table = Summary
+    ratio = np.asarray(table['Ratio'], dtype=np.float64)
+    if 'Group' in table:
+        grp_ids, grp_first = factorize(table, ['Group'])
+        order = np.argsort(grp_first)
+        rank = np.empty_like(order)
+        rank[order] = np.arange(len(order))
+        grp_ids, grp_first = rank[grp_ids], grp_first[order]
+    else:
+        grp_ids = np.zeros(table.nrows, dtype=np.int64)
+        grp_first = np.zeros(min(table.nrows, 1), dtype=np.int64)
+    ngrp = len(grp_first)
 
-    # Select elements in groups
-    select_groups(model, groups)
+    # Governing row of each group, the first on ties
+    best = np.full(ngrp, -np.inf)
+    np.maximum.at(best, grp_ids, ratio)
+    rows = np.nonzero(ratio == best[grp_ids])[0]
+    gov = rows[np.unique(grp_ids[rows], return_index=True)[1]]
 
-    output = model.DesignSteel.GetSummaryResults("",ItemType=2)
+    errors = np.asarray(table['ErrorSummary'] != '', dtype=bool)
+    columns = {'Group': table['Group'][grp_first] if 'Group' in table else [''] * ngrp,
+               'FrameName': table['FrameName'][gov],
+               'Ratio': ratio[gov],
+               'ComboName': table['ComboName'][gov],
+               'Location': np.asarray(table['Location'], dtype=np.float64)[gov],
+               'NumberFrames': np.bincount(grp_ids, minlength=ngrp).astype(np.float64),
+               'NumberOver': np.bincount(grp_ids, weights=ratio > Threshold, minlength=ngrp),
+               'NumberErrors': np.bincount(grp_ids, weights=errors, minlength=ngrp)}
+    return ResultTable(columns, Units=table.Units, pool=table.pool)
 
-    # Convert output into a dictionary
-    output_dict = {}
-    for i, fldnm in enumerate(field_names):
-        output_dict[fldnm] = output[i]
 
-    return output_dict
+def WorstMembers(Summary, N=10):
+    """Return the N rows of a design summary with the highest ratios,
+    highest first."""
+    ratio = np.asarray(Summary['Ratio'], dtype=np.float64)
+    return Summary.take(np.argsort(-ratio, kind='stable')[:N])
@@ -0,0 +1,370 @@
+## Nodal Averaging
+# This module averages element results over common joints. The composite key
+# (joint, load case, step type, step number) is factorized into integer codes
+# so that the means of all force components are found in one vectorized pass.
+
+from .results import ResultTable, CodedColumn, POOL
+
+import numpy as np
+
+# Fields identifying one nodal result
+AVG_KEYS = ('PointElm', 'LoadCase', 'StepType', 'StepNum')
+
+
+def as_table(RawResults):
+    """Return RawResults as a ResultTable. Accepts a ResultTable, a dict of
+    fields, or the legacy list layout where RawResults[0] holds the field
+    names and RawResults[i] holds the values of field i."""
+    if isinstance(RawResults, ResultTable):
+        return RawResults
+    if isinstance(RawResults, dict):
+        return ResultTable(RawResults)
+    return ResultTable({fldnm: RawResults[i] for i, fldnm in enumerate(RawResults[0])
+                        if i > 0})
+
+
+def location_keys(table):
+    """Return the fields identifying a result location independent of its
+    load case and step: the string fields other than LoadCase and StepType
+    plus the frame stations."""
+    keys = [fldnm for fldnm in table.string_fields if fldnm not in ('LoadCase', 'StepType')]
+    return keys + [fldnm for fldnm in ('ObjSta', 'ElmSta') if fldnm in table]
+
+
+def factorize(table, keys):
+    """
+    This function assigns an integer group id to every row of a table based
+    on the values of the key fields.
+
+    Returns [group_ids, first_rows] where first_rows holds the first row of
+    each group, in group id order.
+    """
+    group_ids = np.zeros(table.nrows, dtype=np.int64)
+    first_rows = np.zeros(min(table.nrows, 1), dtype=np.int64)
+    for key in keys:
+        col = table[key]
+        if isinstance(col, CodedColumn):
+            key_ids = col.codes.astype(np.int64)
+        else:
+            key_ids = np.unique(col, return_inverse=True)[1].ravel()
+        combined = group_ids * (int(key_ids.max(initial=0)) + 1) + key_ids
+        _, first_rows, group_ids = np.unique(combined, return_index=True,
+                                             return_inverse=True)
+        group_ids = group_ids.ravel()
+    return [group_ids, first_rows]
+
+
+def nodal_average(RawResults, fields, keys=AVG_KEYS, carry=()):
+    """
+    This function averages result fields over rows which share the same key
+    values, e.g. the shell forces reported at a joint by each element framing
+    into it.
+
+    Variable Definitions:
+      RawResults  = ResultTable, dict of fields or legacy result list, or an
+                    iterable of ResultTables (e.g. from iter_results) which
+                    is consumed chunk by chunk with a NodalAccumulator
+      fields      = Numeric fields to average
+      keys        = Fields identifying a result location (Default AVG_KEYS)
+      carry       = Fields copied from the first row of each group (e.g.
+                    coordinates). Missing carry fields are filled with NaN.
+      Returns     = ResultTable of keys, carry fields and averaged fields
+    """
+    if not isinstance(RawResults, (ResultTable, dict, list, tuple)):
+        accumulator = NodalAccumulator(fields, keys, carry)
+        for chunk in RawResults:
+            accumulator.add(chunk)
+        return accumulator.result()
+
+    table = as_table(RawResults)
+    group_ids, first_rows = factorize(table, keys)
+    counts = np.bincount(group_ids, minlength=len(first_rows))
+
+    columns = {}
+    for key in keys:
+        columns[key] = table[key][first_rows]
+    for fldnm in carry:
+        if fldnm in table:
+            columns[fldnm] = table[fldnm][first_rows]
+        else:
+            columns[fldnm] = np.full(len(first_rows), np.nan)
+    for fldnm in fields:
+        columns[fldnm] = np.bincount(group_ids, weights=table[fldnm],
+                                     minlength=len(first_rows)) / counts
+
+    return ResultTable(columns, Units=table.Units, pool=table.pool)
+
+
+class LocationIndex:
+    """
+    Running index of the result locations seen in a stream of tables. Each
+    distinct combination of key values is given an id in the order it is
+    first seen, and the key and carry values of its first row are kept.
+
+    Variable Definitions:
+      keys        = Fields identifying a location
+      carry       = Fields copied from the first row of each location. Missing
+                    carry fields are filled with NaN.
+    """
+
+    def __init__(self, keys, carry=()):
+        self.keys = list(keys)
+        self.carry = list(carry)
+        self.Units = None
+        self.pool = POOL
+        self._ids = {}
+        self._first = {fldnm: [] for fldnm in self.keys + self.carry}
+        self._coded = {}
+
+    def __len__(self):
+        return len(self._ids)
+
+    def add(self, table):
+        """Return the location id of every row of a table, adding any new
+        locations to the index."""
+        if not self._ids:
+            self.Units, self.pool = table.Units, table.pool
+        if not self.keys:
+            local_ids = np.zeros(table.nrows, dtype=np.int64)
+            first_rows = np.zeros(min(table.nrows, 1), dtype=np.int64)
+        else:
+            local_ids, first_rows = factorize(table, self.keys)
+
+        key_values = []
+        for key in self.keys:
+            col = table[key]
+            self._coded[key] = isinstance(col, CodedColumn)
+            key_values.append((col.codes if self._coded[key] else np.asarray(col))[first_rows].tolist())
+        ids = self._ids
+        start = len(ids)
+        key_rows = zip(*key_values) if self.keys else [()] * len(first_rows)
+        global_ids = np.fromiter((ids.setdefault(kv, len(ids)) for kv in key_rows),
+                                 dtype=np.int64, count=len(first_rows))
+        new_rows = first_rows[global_ids >= start]
+        for fldnm in self.keys + self.carry:
+            if fldnm in table:
+                col = table[fldnm]
+                self._coded[fldnm] = isinstance(col, CodedColumn)
+                col = col.codes if self._coded[fldnm] else np.asarray(col, dtype=np.float64)
+                self._first[fldnm].append(col[new_rows])
+            else:
+                self._first[fldnm].append(np.full(len(new_rows), np.nan))
+        return global_ids[local_ids]
+
+    def columns(self):
+        """Return {field: column} of the key and carry values of every
+        location."""
+        columns = {}
+        for fldnm in self.keys + self.carry:
+            parts = self._first[fldnm]
+            values = np.concatenate(parts) if parts else np.empty(0)
+            if self._coded.get(fldnm):
+                columns[fldnm] = CodedColumn(values, self.pool)
+            else:
+                columns[fldnm] = values
+        return columns
+
+
+class NodalAccumulator:
+    """
+    Incremental version of nodal_average. Tables are added one at a time and
+    only the running sums and counts of each key are kept, so results can be
+    averaged while they are streamed from the model.
+
+    Variable Definitions:
+      fields      = Numeric fields to average
+      keys        = Fields identifying a result location (Default AVG_KEYS)
+      carry       = Fields copied from the first row of each location
+
+    Locations are returned in the order they are first seen.
+    """
+
+    def __init__(self, fields, keys=AVG_KEYS, carry=()):
+        self.fields = list(fields)
+        self.index = LocationIndex(keys, carry)
+        self._sums = np.zeros((len(self.fields), 0))
+        self._counts = np.zeros(0)
+
+    def add(self, RawResults):
+        """Add the rows of one table to the running sums."""
+        table = as_table(RawResults)
+        if table.nrows == 0:
+            return
+        row_ids = self.index.add(table)
+
+        # Accumulate sums and counts
+        size = len(self.index)
+        self._counts = np.concatenate([self._counts, np.zeros(size - len(self._counts))])
+        self._counts += np.bincount(row_ids, minlength=size)
+        self._sums = np.hstack([self._sums, np.zeros((len(self.fields), size - self._sums.shape[1]))])
+        for k, fldnm in enumerate(self.fields):
+            self._sums[k] += np.bincount(row_ids, weights=table[fldnm], minlength=size)
+
+    def result(self):
+        """Return the averages of everything added so far as a ResultTable."""
+        columns = self.index.columns()
+        for k, fldnm in enumerate(self.fields):
+            columns[fldnm] = self._sums[k] / self._counts
+        return ResultTable(columns, Units=self.index.Units, pool=self.index.pool)
+
+
+def _corner_keys(elm_codes, pt_codes):
+    # One int64 key per (element, joint) pair of pool codes
+    return np.asarray(elm_codes, dtype=np.int64) << 32 | np.asarray(pt_codes, dtype=np.int64)
+
+
+class IncidenceOperator:
+    """
+    Joint incidence of the element corners of a shell mesh, for weighted
+    averaging at the joints.
+
+    Variable Definitions:
+      index       = SpatialIndex of the analysis mesh (spatial_index(model,
+                    Units, Elements=True))
+      Weights     = "area" (Default) to weight each element corner by the
+                    tributary area of its element (element area / number of
+                    corners), or None for the plain mean of nodal_average
+
+    The joint and weight of every element corner are found once per mesh.
+    Averaging works on the rows present in the results only: each row is
+    keyed on (step, joint) and the weighted values and the weights are
+    summed per key with np.unique and np.bincount, so the memory used grows
+    with the results rather than with the mesh size times the number of
+    steps. Corners missing from the results (elements outside the
+    extracted groups) are left out of the average of their joint.
+
+    Example:
+      avg = IncidenceOperator.from_model(model)
+      nodal = avg.average(AreaForceShell(model, cases, groups), ['M11', 'M22', 'M12'])
+    """
+
+    def __init__(self, index, Weights='area'):
+        nodes, offsets = index.area_points, index.area_offsets
+        sizes = np.diff(np.append(offsets, len(nodes)))
+        elements = np.repeat(np.arange(len(offsets)), sizes)
+        if Weights == 'area':
+            weights = (self.element_areas(index) / np.maximum(sizes, 1))[elements]
+        elif Weights is None:
+            weights = np.ones(len(nodes))
+        else:
+            raise ValueError("Weights must be 'area' or None, not {0!r}.".format(Weights))
+
+        # Joint and weight of every element corner
+        joints = np.unique(nodes)
+        self.joint_codes = POOL.encode([index.coords.names[k] for k in joints])
+        self.corner_joint = np.searchsorted(joints, nodes)
+        self.corner_weight = weights
+
+        # Lookup of corners by (element, joint) key
+        keys = _corner_keys(POOL.encode([index.area_names[a] for a in elements]),
+                            POOL.encode([index.coords.names[k] for k in nodes]))
+        self._key_order = np.argsort(keys, kind='stable')
+        self._keys = keys[self._key_order]
+
+    @classmethod
+    def from_model(cls, model, Units=None, Weights='area'):
+        """Build the operator from the model's analysis mesh."""
+        from .spatial import spatial_index
+        return cls(spatial_index(model, Units, Elements=True), Weights)
+
+    @staticmethod
+    def element_areas(index):
+        """Return the area of every element of a SpatialIndex."""
+        nodes, offsets = index.area_points, index.area_offsets
+        if not len(offsets):
+            return np.empty(0)
+        xyz = index.coords.xyz[nodes]
+        following = np.arange(1, len(nodes) + 1)
+        following[np.append(offsets[1:], len(nodes)) - 1] = offsets
+        cross = np.add.reduceat(np.cross(xyz, xyz[following]), offsets, axis=0)
+        return 0.5 * np.linalg.norm(cross, axis=1)
+
+    @property
+    def shape(self):
+        """(joints, element corners) of the mesh."""
+        return (len(self.joint_codes), len(self.corner_joint))
+
+    def corners(self, table):
+        """Return the corner of every row of a table, -1 for rows at an
+        (element, joint) pair which is not in the mesh."""
+        keys = _corner_keys(table.codes('Elm'), table.codes('PointElm'))
+        if not len(self._keys):
+            return np.full(len(keys), -1, dtype=np.int64)
+        pos = np.minimum(np.searchsorted(self._keys, keys), len(self._keys) - 1)
+        return np.where(self._keys[pos] == keys, self._key_order[pos], -1)
+
+    def _sums(self, chunks, fields):
+        # Weighted sums (last column: sum of weights) of every (step, joint)
+        # key present in the results, keyed on step id * joints + joint
+        steps = LocationIndex(['LoadCase', 'StepType', 'StepNum'])
+        njoints = self.shape[0]
+        chunk_keys, chunk_values = [], []
+        for chunk in chunks:
+            table = as_table(chunk)
+            corners = self.corners(table)
+            rows = np.nonzero(corners >= 0)[0]
+            step_ids = steps.add(table)[rows]
+            if not len(rows):
+                continue
+            corners = corners[rows]
+            weight = self.corner_weight[corners]
+            values = np.empty((len(fields) + 1, len(rows)))
+            if fields:
+                values[:-1] = table.to_numpy(fields)[:, rows] * weight
+            values[-1] = weight
+            chunk_keys.append(step_ids * njoints + self.corner_joint[corners])
+            chunk_values.append(values)
+
+        if not chunk_keys:
+            return steps, np.empty(0, dtype=np.int64), np.zeros((0, len(fields) + 1))
+        keys, key_ids = np.unique(np.concatenate(chunk_keys), return_inverse=True)
+        key_ids = key_ids.ravel()
+        values = np.concatenate(chunk_values, axis=1)
+        sums = np.stack([np.bincount(key_ids, weights=col, minlength=len(keys))
+                         for col in values], axis=1)
+        return steps, keys, sums
+
+    def average(self, RawResults, fields):
+        """
+        This function averages shell results at the joints of the mesh.
+
+        Variable Definitions:
+          RawResults  = AreaForceShell ResultTable, or an iterable of tables
+                        (e.g. AreaForceShellIter) consumed chunk by chunk
+          fields      = Numeric fields to average
+          Returns     = ResultTable of PointElm, LoadCase, StepType, StepNum
+                        and the averaged fields, one row per joint with
+                        results in each step. Steps are in the order they
+                        are first seen.
+        """
+        if isinstance(RawResults, (ResultTable, dict, list, tuple)):
+            RawResults = [RawResults]
+        fields = list(fields)
+        steps, keys, sums = self._sums(RawResults, fields)
+        found = sums[:, -1] > 0
+        keys, sums = keys[found], sums[found]
+        step_ids, joints = np.divmod(keys, self.shape[0])
+
+        columns = {'PointElm': CodedColumn(self.joint_codes[joints])}
+        for fldnm, col in steps.columns().items():
+            columns[fldnm] = col[step_ids]
+        for k, fldnm in enumerate(fields):
+            columns[fldnm] = sums[:, k] / sums[:, -1]
+        return ResultTable(columns, Units=steps.Units, pool=steps.pool)
+
+    def smooth(self, RawResults, fields):
+        """Return a shell result table with the given fields replaced by
+        their averages at the joint of each row. Rows at elements outside
+        the mesh are set to NaN."""
+        table = as_table(RawResults)
+        fields = list(fields)
+        steps, keys, sums = self._sums([table], fields)
+        corners = self.corners(table)
+        row_keys = steps.add(table) * self.shape[0] + self.corner_joint[corners]
+        values = np.full((table.nrows, len(fields)), np.nan)
+        if len(keys):
+            pos = np.minimum(np.searchsorted(keys, row_keys), len(keys) - 1)
+            found = (corners >= 0) & (keys[pos] == row_keys)
+            with np.errstate(divide='ignore', invalid='ignore'):
+                values[found] = sums[pos[found], :-1] / sums[pos[found], -1:]
+        return table.with_columns(**{fldnm: values[:, k] for k, fldnm in enumerate(fields)})
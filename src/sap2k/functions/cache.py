@@ -0,0 +1,311 @@
+## Persistent Result Cache
+# This module stores extracted ResultTables on disk so that rerunning a
+# post-processing script does not pull identical results from SAP2000 again.
+# Entries are keyed on the model file fingerprint and the output settings and
+# are evicted least recently used first. A per-case cache keys each load case
+# on its own definition and run status and on the rest of the model
+# definition instead, so that after changing and rerunning some cases only
+# those are extracted again.
+
+from .helpers import model_fingerprint, model_key, unit_code
+from .results import ResultTable, CodedColumn, POOL
+from .tables import display_table
+from .coords import _in_units
+
+import hashlib
+import json
+import os
+import zipfile
+
+import numpy as np
+
+# Default cache location, can be overridden with the SAP2K_CACHE_DIR variable
+DEFAULT_DIR = os.path.join(os.path.expanduser('~'), '.sap2k', 'cache')
+
+# LoadCases interfaces defining the loads of each case type, keyed on the
+# eCase code or (eCase code, sub type) returned by LoadCases.GetTypeOAPI_1
+CASE_INTERFACES = {1: 'StaticLinear', 2: 'StaticNonlinear', 4: 'ResponseSpectrum',
+                   (5, 1): 'ModHistLinear', (5, 2): 'DirHistLinear',
+                   (6, 1): 'ModHistNonlinear', (6, 2): 'DirHistNonlinear',
+                   10: 'Buckling', 13: 'StaticLinearMultistep'}
+
+# Analyze.GetCaseStatus code of a case which has finished running
+FINISHED = 4
+
+# Database tables defining the model apart from its load cases and
+# combinations (which are covered by case_fingerprints), hashed by
+# model_state. Edits to other definitions (e.g. releases, links,
+# constraints) are not detected; clear() the cache after such edits.
+MODEL_TABLES = ('Joint Coordinates', 'Connectivity - Frame', 'Connectivity - Area',
+                'Frame Section Assignments', 'Area Section Assignments',
+                'Frame Section Properties 01 - General', 'Area Section Properties',
+                'Material Properties 02 - Basic Mechanical Properties',
+                'Joint Restraint Assignments', 'Joint Spring Assignments 1 - Uncoupled',
+                'Load Pattern Definitions', 'Joint Loads - Force', 'Frame Loads - Distributed',
+                'Frame Loads - Point', 'Area Loads - Uniform')
+
+# Model state digests keyed by model file and units
+_state_cache = {}
+
+
+def _digest(parts):
+    return hashlib.sha256(json.dumps(parts, default=str).encode()).hexdigest()
+
+
+def _case_definition(model, name):
+    # Type, loads and initial case of a load case as returned by the OAPI
+    case_type = list(model.LoadCases.GetTypeOAPI_1(name)[:-1])
+    interface = CASE_INTERFACES.get(tuple(case_type[:2]), CASE_INTERFACES.get(case_type[0]))
+    loads = initial = None
+    if interface is not None:
+        methods = getattr(model.LoadCases, interface)
+        loads = list(methods.GetLoads(name)[:-1])
+        if hasattr(methods, 'GetInitialCase'):
+            initial = methods.GetInitialCase(name)[0]
+    return case_type, loads, initial
+
+
+def case_fingerprints(model, LoadCases):
+    """
+    This function returns a hash of the definition and run status of each
+    load case or combination.
+
+    Variable Definitions:
+      LoadCases   = Load cases and combinations
+      Returns     = {name: hex digest}. The digest is None when a case has
+                    not finished running, or a combination uses such a case.
+
+    The digest of a load case covers its type, its loads and the digest of
+    its initial case. The digest of a combination covers its type, its
+    scale factors and the digests of the cases and combinations in it.
+    """
+    if isinstance(LoadCases, str):
+        LoadCases = [LoadCases]
+    output = model.Analyze.GetCaseStatus()
+    status = dict(zip(output[1], output[2]))
+    combos = set(model.RespCombo.GetNameList()[1])
+    digests = {}
+
+    def fingerprint(name):
+        if name in digests:
+            return digests[name]
+        digests[name] = None
+        if name in combos:
+            output = model.RespCombo.GetCaseList(name)
+            items = [list(item) for item in zip(*output[1:4])]
+            members = [fingerprint(item[1]) for item in items]
+            if None in members:
+                return None
+            parts = ['combo', model.RespCombo.GetTypeOAPI(name)[0], items, members]
+        else:
+            if status.get(name) != FINISHED:
+                return None
+            case_type, loads, initial = _case_definition(model, name)
+            parts = ['case', case_type, loads, initial,
+                     fingerprint(initial) if initial else None]
+        digests[name] = _digest(parts)
+        return digests[name]
+
+    return {name: fingerprint(name) for name in LoadCases}
+
+
+def model_state(model, Units=4):
+    """
+    This function returns a hash of the model definition other than its load
+    cases and combinations, read from the MODEL_TABLES: the geometry,
+    sections, materials, supports, load patterns and load assignments. The
+    tables are read in Units and the caller's units are restored after.
+
+    The hash of a saved model is kept while its file is unchanged, as
+    SAP2000 saves the model before running an analysis, so the tables are
+    read once per analysis run rather than once per extraction. When none
+    of the tables is available the model file fingerprint is used instead.
+    """
+    fingerprint = model_fingerprint(model)
+    saved = fingerprint[1] is not None
+    key = (model_key(model, fingerprint), unit_code(Units))
+    cached = _state_cache.get(key) if saved else None
+    if cached is not None and cached[0] == fingerprint:
+        return cached[1]
+
+    tables = _in_units(model, unit_code(Units),
+                       lambda: [[table_key, display_table(model, table_key)]
+                                for table_key in MODEL_TABLES])
+    parts = [table for table in tables if table[1] is not None] or list(fingerprint)
+    digest = _digest(parts)
+    if saved:
+        _state_cache[key] = (fingerprint, digest)
+    return digest
+
+
+def write_table(path, table):
+    """Write a ResultTable to an uncompressed .npz file. Numeric fields are
+    stored as one float64 block and string fields as int32 codes into a
+    per-file list of names."""
+    meta = {'fields': [], 'Units': table.Units}
+    arrays = {'block': table.block}
+    for fldnm, col in table.items():
+        if isinstance(col, CodedColumn):
+            uniq, local = np.unique(col.codes, return_inverse=True)
+            arrays['codes_' + fldnm] = local.astype(np.int32).ravel()
+            arrays['names_' + fldnm] = np.array(col.pool.decode(uniq).tolist(), dtype=str)
+            meta['fields'].append([fldnm, 'string', None])
+        elif isinstance(col, np.ndarray):
+            meta['fields'].append([fldnm, 'numeric', None])
+        else:
+            meta['fields'].append([fldnm, 'scalar', col])
+    arrays['meta'] = np.array(json.dumps(meta))
+
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'wb') as file:
+        np.savez(file, **arrays)
+    os.replace(tmp_path, path)
+
+
+def read_table(path):
+    """Read a ResultTable written by write_table."""
+    with np.load(path, allow_pickle=False) as data:
+        meta = json.loads(str(data['meta']))
+        block = data['block']
+        columns = {}
+        row = 0
+        for fldnm, kind, value in meta['fields']:
+            if kind == 'string':
+                pool_codes = POOL.encode(data['names_' + fldnm].tolist())
+                columns[fldnm] = CodedColumn(pool_codes[data['codes_' + fldnm]])
+            elif kind == 'numeric':
+                columns[fldnm] = block[row]
+                row += 1
+            else:
+                columns[fldnm] = value
+    return ResultTable(columns, Units=meta['Units'])
+
+
+class ResultCache:
+    """
+    On-disk cache of extraction results.
+
+    Variable Definitions:
+      directory   = Folder holding the cache files (Default SAP2K_CACHE_DIR
+                    or ~/.sap2k/cache)
+      max_bytes   = Total size above which the least recently used entries
+                    are removed (Default 2 GB)
+      max_entries = Optional limit on the number of entries
+      ContentHash = Key on a hash of the model file contents in addition to
+                    its size and modification time. Slower for large models
+                    but survives copying the file.
+      PerCase     = Keep the results of each load case separately, keyed on
+                    the model path, the case_fingerprints of the case, the
+                    model_state of the rest of the model and the objects in
+                    the groups instead of the model file fingerprint. An
+                    extraction then only queries SAP2000 for the cases which
+                    changed or were rerun since they were cached, and for
+                    every case after an edit to the MODEL_TABLES.
+
+    Extractions only store results read with the Results methods. Results
+    read from the database tables are rounded to their display precision and
+    are not cached, but a Backend="tables" or "auto" extraction is served
+    from the cached full precision results.
+    """
+
+    def __init__(self, directory=None, max_bytes=2 * 1024**3, max_entries=None,
+                 ContentHash=False, PerCase=False):
+        if directory is None:
+            directory = os.environ.get('SAP2K_CACHE_DIR', DEFAULT_DIR)
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.max_entries = max_entries
+        self.ContentHash = ContentHash
+        self.PerCase = PerCase
+        os.makedirs(directory, exist_ok=True)
+
+    def key(self, model, method, LoadCases, Groups=None, Units=4, NLStatic=1,
+            MSStatic=1, MVCombo=1):
+        """Return the cache key of an extraction, or None when the model has
+        not been saved to disk and cannot be fingerprinted."""
+        fingerprint = model_fingerprint(model, self.ContentHash)
+        if fingerprint[1] is None:
+            return None
+        if isinstance(LoadCases, str) or not hasattr(LoadCases, '__iter__'):
+            LoadCases = [LoadCases]
+        if isinstance(Groups, str):
+            Groups = [Groups]
+        parts = [list(fingerprint), method, 'results',
+                 sorted(map(str, LoadCases)),
+                 None if Groups is None else sorted(map(str, Groups)),
+                 unit_code(Units), NLStatic, MSStatic, MVCombo]
+        return hashlib.sha256(json.dumps(parts).encode()).hexdigest()
+
+    def case_keys(self, model, method, LoadCases, Groups=None, Units=4, NLStatic=1,
+                  MSStatic=1, MVCombo=1):
+        """Return {case: key} of the per-case entries of an extraction. A
+        key is None when the model has not been saved or the case has no
+        finished results."""
+        if isinstance(LoadCases, str) or not hasattr(LoadCases, '__iter__'):
+            LoadCases = [LoadCases]
+        path = model.GetModelFileName(True)
+        if not path:
+            return {case: None for case in LoadCases}
+        if isinstance(Groups, str):
+            Groups = [Groups]
+        members = None
+        if Groups is not None:
+            members = sorted(map(str, Groups))
+            if not hasattr(Groups, 'select'):
+                members = [[grp] + [list(val) for val in model.GroupDef.GetAssignments(grp)[1:3]]
+                           for grp in members]
+        settings = [path, model_state(model, Units), method, 'results', members,
+                    unit_code(Units), NLStatic, MSStatic, MVCombo]
+        return {case: None if digest is None else _digest(settings + [case, digest])
+                for case, digest in case_fingerprints(model, LoadCases).items()}
+
+    def _path(self, key):
+        return os.path.join(self.directory, key + '.npz')
+
+    def get(self, key):
+        """Return the cached ResultTable for a key, or None."""
+        path = self._path(key)
+        try:
+            table = read_table(path)
+        except (OSError, ValueError, KeyError, zipfile.BadZipFile):
+            return None
+        # Mark the entry as recently used
+        os.utime(path)
+        return table
+
+    def put(self, key, table):
+        """Store a ResultTable under a key and evict old entries."""
+        write_table(self._path(key), table)
+        self.evict()
+
+    def entries(self):
+        """Return [path, size, last used] of every entry, oldest first."""
+        entries = []
+        for name in os.listdir(self.directory):
+            if name.endswith('.npz'):
+                path = os.path.join(self.directory, name)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                entries.append([path, stat.st_size, stat.st_mtime_ns])
+        entries.sort(key=lambda entry: entry[2])
+        return entries
+
+    def evict(self):
+        """Remove least recently used entries until the cache is within its
+        size and entry limits."""
+        entries = self.entries()
+        total = sum(entry[1] for entry in entries)
+        while entries and (total > self.max_bytes or
+                           (self.max_entries is not None and len(entries) > self.max_entries)):
+            path, size, used = entries.pop(0)
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            total -= size
+
+    def clear(self):
+        for path, size, used in self.entries():
+            os.remove(path)
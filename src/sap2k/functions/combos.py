@@ -0,0 +1,262 @@
+## Local Load Combinations
+# This module evaluates load combinations from the results of their load
+# cases instead of extracting every combination from SAP2000. The combination
+# definitions are read from RespCombo, linear additive combinations are
+# computed for all locations and fields as one matrix product, and envelope,
+# absolute, SRSS and range combinations are evaluated with vectorized max/min.
+
+from .results import ResultTable, CodedColumn
+from .averaging import factorize, location_keys
+
+import numpy as np
+
+# RespCombo.GetTypeOAPI combination types
+LINEAR, ENVELOPE, ABSOLUTE, SRSS, RANGE = 0, 1, 2, 3, 4
+
+# Derived fields which are not linear in the component results and so can
+# not be combined (principal values, angles, Von Mises)
+NONLINEAR_FIELDS = ('FMax', 'FMin', 'FAngle', 'FVM', 'MMax', 'MMin', 'MAngle',
+                    'VMax', 'VAngle')
+
+# Numeric fields which locate a result rather than being one
+LOCATION_FIELDS = ('StepNum', 'ObjSta', 'ElmSta', 'Xcoord', 'Ycoord', 'Zcoord')
+
+
+def read_combos(model, Names=None):
+    """
+    This function reads the definition of load combinations, including any
+    combinations they contain.
+
+    Variable Definitions:
+      model       = SAP Model object
+      Names       = Combinations to read (Default all combinations)
+      Returns     = {name: (combo type, [(case or combo name, scale factor)])}
+    """
+    if Names is None:
+        Names = model.RespCombo.GetNameList()[1]
+    elif isinstance(Names, str):
+        Names = [Names]
+
+    combos = {}
+    pending = list(Names)
+    while pending:
+        name = pending.pop(0)
+        if name in combos:
+            continue
+        combo_type = model.RespCombo.GetTypeOAPI(name)[0]
+        NumberItems, CNameType, CName, SF, ret = model.RespCombo.GetCaseList(name)
+        combos[name] = (combo_type, list(zip(CName, SF)))
+        pending += [nm for typ, nm in zip(CNameType, CName) if typ == 1]
+    return combos
+
+
+def base_cases(combos, Names=None):
+    """Return the load cases the given combinations are built from, in the
+    order they are first referenced."""
+    cases = []
+    def visit(name):
+        for item, sf in combos[name][1]:
+            if item in combos:
+                visit(item)
+            elif item not in cases:
+                cases.append(item)
+    for name in (combos if Names is None else Names):
+        visit(name)
+    return cases
+
+
+def factor_matrix(combos, Names, cases):
+    """
+    Return the scale factor of each load case in each combination as a
+    (combinations x cases) array, expanding combinations nested in linear
+    additive combinations. Returns None for the row of any combination which
+    is not linear in its cases.
+    """
+    col = {case: k for k, case in enumerate(cases)}
+    memo = {}
+    def expand(name):
+        if name not in memo:
+            combo_type, items = combos[name]
+            row = np.zeros(len(cases)) if combo_type == LINEAR else None
+            for item, sf in (items if row is not None else ()):
+                if item in combos:
+                    sub = expand(item)
+                    if sub is None:
+                        row = None
+                        break
+                    row += sf * sub
+                elif item in col:
+                    row[col[item]] += sf
+                else:
+                    row = None
+                    break
+            memo[name] = row
+        return memo[name]
+    return [expand(name) for name in Names]
+
+
+def evaluate_combos(RawResults, combos, Names=None, fields=None, keys=None):
+    """
+    This function evaluates load combinations from a ResultTable holding the
+    results of their load cases.
+
+    Variable Definitions:
+      RawResults  = ResultTable of load case results, e.g. from AreaForceShell
+                    with the base_cases() of the combinations. Each case must
+                    report one value per location (linear and last step
+                    results) or Max / Min envelope rows.
+      combos      = Combination definitions from read_combos()
+      Names       = Combinations to return (Default all in combos)
+      fields      = Result fields to combine (Default every numeric field
+                    except LOCATION_FIELDS and NONLINEAR_FIELDS, which are
+                    left out of the output)
+      keys        = Fields identifying a location (Default location_keys())
+      Returns     = ResultTable in the layout of RawResults with one row per
+                    location for linear combinations of single valued cases
+                    and Max and Min rows for all others, as SAP2000 reports
+                    combinations with the envelope multi-valued option.
+    """
+    table = RawResults
+    Names = list(combos) if Names is None else ([Names] if isinstance(Names, str) else Names)
+    if keys is None:
+        keys = location_keys(table)
+    if fields is None:
+        fields = [fldnm for fldnm in table.numeric_fields
+                  if fldnm not in LOCATION_FIELDS and fldnm not in NONLINEAR_FIELDS]
+
+    # Locations and cases of the rows, locations in order of appearance
+    if keys:
+        loc_ids, loc_first = factorize(table, keys)
+        order = np.argsort(loc_first)
+        rank = np.empty_like(order)
+        rank[order] = np.arange(len(order))
+        loc_ids, loc_first = rank[loc_ids], loc_first[order]
+    else:
+        loc_ids, loc_first = np.zeros(table.nrows, dtype=np.int64), np.zeros(1, dtype=np.int64)
+    case_ids, case_first = factorize(table, ['LoadCase'])
+    cases = list(table['LoadCase'][case_first])
+    nloc, ncase = len(loc_first), len(cases)
+
+    # Step kind of each row: 0 single value, 1 Max, 2 Min
+    kind = np.zeros(table.nrows, dtype=np.int64)
+    if 'StepType' in table:
+        kind[table['StepType'] == 'Max'] = 1
+        kind[table['StepType'] == 'Min'] = 2
+    slot = (case_ids * nloc + loc_ids) * 3 + kind
+    if np.bincount(slot, minlength=ncase * nloc * 3).max(initial=0) > 1:
+        raise ValueError("Load case results have more than one value per location. "
+                         "Combinations can only be evaluated from single step or "
+                         "enveloped case results.")
+    multi = np.bincount(case_ids, weights=kind > 0, minlength=ncase) > 0
+
+    # (case, location, field) arrays of the maximum and minimum values
+    values = table.to_numpy(fields).T if fields else np.empty((table.nrows, 0))
+    case_max = np.full((ncase, nloc, len(fields)), np.nan)
+    case_min = np.full((ncase, nloc, len(fields)), np.nan)
+    case_max[case_ids[kind != 2], loc_ids[kind != 2]] = values[kind != 2]
+    case_min[case_ids[kind != 1], loc_ids[kind != 1]] = values[kind != 1]
+
+    # Linear combinations of single valued cases as one matrix product
+    single = [case for case, mv in zip(cases, multi) if not mv]
+    rows = factor_matrix(combos, Names, single)
+    evaluated = {}
+    linear = [k for k, row in enumerate(rows) if row is not None]
+    if linear:
+        factors = np.vstack([rows[k] for k in linear])
+        index = [cases.index(case) for case in single]
+        combined = factors @ case_max[index].reshape(len(single), -1)
+        for k, res in zip(linear, combined):
+            res = res.reshape(nloc, len(fields))
+            evaluated[Names[k]] = (res, res)
+
+    members = {case: (case_max[k], case_min[k]) for k, case in enumerate(cases)}
+    def evaluate(name):
+        if name in evaluated:
+            return evaluated[name]
+        if name in members:
+            return members[name]
+        if name not in combos:
+            raise KeyError("'{0}' is neither a load case in the results nor a "
+                           "combination.".format(name))
+        combo_type, items = combos[name]
+        upper, lower = [], []
+        for item, sf in items:
+            item_max, item_min = evaluate(item)
+            upper.append(np.maximum(sf * item_max, sf * item_min))
+            lower.append(np.minimum(sf * item_max, sf * item_min))
+        upper, lower = np.array(upper), np.array(lower)
+        if combo_type == LINEAR:
+            res = (upper.sum(axis=0), lower.sum(axis=0))
+        elif combo_type == ENVELOPE:
+            res = (upper.max(axis=0), lower.min(axis=0))
+        elif combo_type == ABSOLUTE:
+            total = np.maximum(abs(upper), abs(lower)).sum(axis=0)
+            res = (total, -total)
+        elif combo_type == SRSS:
+            total = np.sqrt((np.maximum(abs(upper), abs(lower))**2).sum(axis=0))
+            res = (total, -total)
+        elif combo_type == RANGE:
+            res = (np.maximum(upper, 0).sum(axis=0), np.minimum(lower, 0).sum(axis=0))
+        else:
+            raise ValueError("Combination '{0}' has unsupported type {1}.".format(name, combo_type))
+        evaluated[name] = res
+        return res
+
+    # Assemble the output table, combination by combination
+    parts = []
+    for name in Names:
+        res_max, res_min = evaluate(name)
+        if res_max is res_min:
+            parts.append((name, '', res_max))
+        else:
+            parts.append((name, 'Max', res_max))
+            parts.append((name, 'Min', res_min))
+    nparts = len(parts)
+    pool = table.pool
+    columns = {}
+    for fldnm, col in table.items():
+        if fldnm in NONLINEAR_FIELDS:
+            continue
+        if fldnm == 'LoadCase':
+            columns[fldnm] = CodedColumn(np.repeat(pool.encode([p[0] for p in parts]), nloc), pool)
+        elif fldnm == 'StepType':
+            columns[fldnm] = CodedColumn(np.repeat(pool.encode([p[1] for p in parts]), nloc), pool)
+        elif fldnm == 'StepNum':
+            columns[fldnm] = np.zeros(nparts * nloc)
+        elif fldnm in fields:
+            k = fields.index(fldnm)
+            columns[fldnm] = np.concatenate([p[2][:, k] for p in parts]) if parts else np.empty(0)
+        elif isinstance(col, CodedColumn):
+            columns[fldnm] = CodedColumn(np.tile(col.codes[loc_first], nparts), pool)
+        elif isinstance(col, np.ndarray):
+            columns[fldnm] = np.tile(col[loc_first], nparts)
+        elif fldnm in ('NumberResults', 'NumberItems'):
+            columns[fldnm] = nparts * nloc
+        else:
+            columns[fldnm] = col
+    return ResultTable(columns, Units=table.Units, pool=pool)
+
+
+def LocalCombos(func, model, Combos=None, *args, **kwargs):
+    """
+    This function extracts the load cases of a set of combinations with one
+    call to an output function and evaluates the combinations locally.
+
+    Variable Definitions:
+      func        = Output function taking (model, LoadCases, ...), e.g.
+                    AreaForceShell, FrameForces or JointReact
+      model       = SAP Model object
+      Combos      = Combinations to evaluate (Default all combinations)
+      args/kwargs = Remaining arguments of func (Groups, Units, ...)
+      Returns     = ResultTable from evaluate_combos()
+
+    Example:
+      LocalCombos(AreaForceShell, model, ['LC1', 'LC2', 'ENV'], ['Wharf Deck'])
+    """
+    combos = read_combos(model, Combos)
+    if Combos is None:
+        Combos = list(combos)
+    elif isinstance(Combos, str):
+        Combos = [Combos]
+    table = func(model, base_cases(combos, Combos), *args, **kwargs)
+    return evaluate_combos(table, combos, Combos)
@@ -0,0 +1,159 @@
+## Point Coordinate Index
+# This module reads the coordinates of the model's points once and keeps them
+# in arrays so that coordinates can be joined onto results without a
+# GetCoordCartesian call per result row.
+
+from .helpers import model_fingerprint, model_key
+from .results import POOL
+
+import sys
+
+import numpy as np
+
+# Coordinate indices keyed by (model file, units)
+_coord_cache = {}
+
+# Database table listing every joint of the analysis model
+JOINT_TABLE = 'Objects And Elements - Joints'
+
+
+def _in_units(model, Units, read):
+    # Call read() with the model in Units, restoring the caller's units after
+    previous = model.GetPresentUnits()
+    if Units is None or Units == previous:
+        return read()
+    model.SetPresentUnits(Units)
+    try:
+        return read()
+    finally:
+        model.SetPresentUnits(previous)
+
+
+def element_joints(model):
+    """Return {name: (X, Y, Z)} of every joint of the analysis model, read
+    from the joint table in one call. Empty when the table is not
+    available."""
+    from .tables import display_table
+    table = display_table(model, JOINT_TABLE)
+    if not table:
+        return {}
+    xyz = np.column_stack([np.asarray(table[fld], dtype=np.float64)
+                           for fld in ('GlobalX', 'GlobalY', 'GlobalZ')]).reshape(-1, 3)
+    return dict(zip(table['ElmJt'], xyz.tolist()))
+
+
+class PointCoords:
+    """Coordinates of the point elements of a model.
+
+    Variable Definitions:
+      names       = Interned point names, in row order
+      xyz         = (n x 3) float64 array of global X, Y, Z coordinates
+      fingerprint = model_fingerprint() of the model when the index was built
+      Units       = SAP2000 unit code of the coordinates"""
+
+    def __init__(self, names, xyz, fingerprint=None, Units=None):
+        self.names = [sys.intern(nm) for nm in names]
+        self.xyz = np.asarray(xyz, dtype=np.float64).reshape(-1, 3)
+        self.index = dict(zip(self.names, range(len(self.names))))
+        self.fingerprint = fingerprint
+        self.Units = Units
+        self._code_rows = np.empty(0, dtype=np.int64)
+        self._joints = None
+
+    @classmethod
+    def from_model(cls, model, Units=None):
+        """Read every point object of the model in one GetAllPoints call."""
+        NumberNames, MyName, X, Y, Z, ret = model.PointObj.GetAllPoints()
+        xyz = np.column_stack([np.asarray(X, dtype=np.float64),
+                               np.asarray(Y, dtype=np.float64),
+                               np.asarray(Z, dtype=np.float64)])
+        return cls(MyName, xyz, model_fingerprint(model), Units)
+
+    def add_points(self, model, names):
+        """Read points which are not object points (e.g. joints created by
+        automatic meshing). The joint table of the analysis model is read in
+        one call the first time, points missing from it are read from
+        PointElm one at a time. Points the model does not have are left
+        out."""
+        names = [nm for nm in dict.fromkeys(names) if nm not in self.index]
+        if not names:
+            return
+
+        def read():
+            if self._joints is None:
+                self._joints = element_joints(model)
+            found = {}
+            for nm in names:
+                if nm in self._joints:
+                    found[nm] = self._joints[nm]
+                else:
+                    x, y, z, ret = model.PointElm.GetCoordCartesian(nm)
+                    if ret == 0:
+                        found[nm] = (x, y, z)
+            return found
+        found = _in_units(model, self.Units, read)
+        if not found:
+            return
+        self.xyz = np.vstack([self.xyz, np.asarray(list(found.values()), dtype=np.float64)])
+        for nm in found:
+            nm = sys.intern(nm)
+            self.index[nm] = len(self.names)
+            self.names.append(nm)
+
+    def rows(self, codes, model=None):
+        """Return the row of every pooled name code, reading missing points
+        from the model when one is given. Unknown points return -1."""
+        codes = np.asarray(codes)
+        if len(self._code_rows) < len(POOL):
+            grown = np.full(len(POOL), -2, dtype=np.int64)
+            grown[:len(self._code_rows)] = self._code_rows
+            self._code_rows = grown
+
+        # Resolve codes which have not been looked up yet
+        new_codes = np.unique(codes[self._code_rows[codes] == -2])
+        if len(new_codes):
+            new_names = POOL.decode(new_codes)
+            if model is not None:
+                self.add_points(model, new_names)
+            self._code_rows[new_codes] = [self.index.get(nm, -1) for nm in new_names]
+        return self._code_rows[codes]
+
+    def lookup(self, names, model=None):
+        """Return the (n x 3) coordinates of a sequence of point names."""
+        codes = names.codes if hasattr(names, 'codes') else POOL.encode(list(names))
+        rows = self.rows(codes, model)
+        xyz = self.xyz[rows]
+        xyz[rows < 0] = np.nan
+        return xyz
+
+    def join(self, table, on='PointElm', model=None):
+        """Return a copy of a ResultTable with Xcoord, Ycoord and Zcoord
+        columns for the points named in the given field."""
+        xyz = self.lookup(table[on], model)
+        return table.with_columns(Xcoord=xyz[:, 0], Ycoord=xyz[:, 1], Zcoord=xyz[:, 2])
+
+
+def point_coords(model, Units=None):
+    """
+    This function returns the PointCoords index of a model, reading it from
+    the model the first time and whenever the model file has changed since.
+    Coordinates are reported in the present units of the model unless Units
+    is given, in which case a new index is read in those units. The present
+    units of the model are left as they were.
+    """
+    if Units is None:
+        Units = model.GetPresentUnits()
+
+    fingerprint = model_fingerprint(model)
+    key = (model_key(model, fingerprint), Units)
+    coords = _coord_cache.get(key)
+    if coords is None or coords.fingerprint != fingerprint:
+        coords = _in_units(model, Units, lambda: PointCoords.from_model(model, Units))
+        _coord_cache[key] = coords
+    return coords
+
+
+def clear_coord_cache():
+    """Discard all cached coordinate indices, e.g. after editing geometry
+    without saving the model."""
+    _coord_cache.clear()
@@ -0,0 +1,125 @@
+## Streaming Result Envelopes
+# This module keeps the running maximum and minimum of result fields at each
+# location (element, joint, station) together with the load case and step
+# which govern them. Tables are added as they are extracted, so enveloping
+# many combinations only needs memory for one value per location and field.
+
+from .results import ResultTable, CodedColumn
+from .averaging import as_table, location_keys, LocationIndex
+
+import numpy as np
+
+
+class Envelope:
+    """
+    Incremental envelope of result fields.
+
+    Variable Definitions:
+      fields      = Numeric fields to envelope
+      keys        = Fields identifying a location (Default location_keys() of
+                    the first table added)
+      carry       = Fields copied from the first row of each location (e.g.
+                    coordinates)
+      derive      = Optional function returning {field: array} of fields
+                    calculated from each table before it is enveloped, e.g.
+                    outputs.shell_output.wood_armer_fields(). Derived fields
+                    are enveloped along with fields.
+
+    Example:
+      env = Envelope(['M11', 'M22', 'M12'], derive=wood_armer_fields())
+      for chunk in AreaForceShellIter(model, combos, groups):
+          env.add(chunk)
+      design = env.result()
+    """
+
+    def __init__(self, fields, keys=None, carry=(), derive=None):
+        self.fields = list(fields)
+        self.keys = None if keys is None else list(keys)
+        self.carry = list(carry)
+        self.derive = derive
+        self.index = None
+        self._names = list(self.fields)
+        self._max = self._min = None
+        self._max_case = self._min_case = None
+        self._max_step = self._min_step = None
+
+    def add(self, RawResults):
+        """Update the envelope with the rows of one table."""
+        table = as_table(RawResults)
+        if table.nrows == 0:
+            return
+        values = [np.asarray(table[fldnm], dtype=np.float64) for fldnm in self.fields]
+        if self.derive is not None:
+            derived = self.derive(table)
+            if self.index is None:
+                self._names = self.fields + list(derived)
+            values += [np.asarray(derived[fldnm], dtype=np.float64) for fldnm in derived]
+        if self.index is None:
+            self.index = LocationIndex(location_keys(table) if self.keys is None else self.keys,
+                                       self.carry)
+        row_ids = self.index.add(table)
+        self._grow(len(self.index))
+
+        values = np.vstack(values)
+        blank = table.pool.encode([''])[0]
+        case = table.codes('LoadCase') if 'LoadCase' in table else np.full(table.nrows, blank)
+        step = table['StepNum'] if 'StepNum' in table else np.zeros(table.nrows)
+        for k in range(len(self._names)):
+            self._update(k, row_ids, values[k], case, step, self._max, self._max_case,
+                         self._max_step, np.fmax, np.greater)
+            self._update(k, row_ids, values[k], case, step, self._min, self._min_case,
+                         self._min_step, np.fmin, np.less)
+
+    def _grow(self, size):
+        # Extend the running arrays to a number of locations
+        nfld = len(self._names)
+        if self._max is None:
+            self._max = np.empty((nfld, 0))
+            self._min = np.empty((nfld, 0))
+            self._max_case = np.empty((nfld, 0), dtype=np.int32)
+            self._min_case = np.empty((nfld, 0), dtype=np.int32)
+            self._max_step = np.empty((nfld, 0))
+            self._min_step = np.empty((nfld, 0))
+        extra = size - self._max.shape[1]
+        if extra <= 0:
+            return
+        pad = lambda arr, val: np.hstack([arr, np.full((nfld, extra), val, dtype=arr.dtype)])
+        self._max, self._min = pad(self._max, -np.inf), pad(self._min, np.inf)
+        blank = self.index.pool.encode([''])[0]
+        self._max_case, self._min_case = pad(self._max_case, blank), pad(self._min_case, blank)
+        self._max_step, self._min_step = pad(self._max_step, np.nan), pad(self._min_step, np.nan)
+
+    @staticmethod
+    def _update(k, row_ids, values, case, step, best, best_case, best_step, reduce, better):
+        # Governing value of the table at each location, first row on ties
+        chunk = np.full(best.shape[1], -np.inf if reduce is np.fmax else np.inf)
+        reduce.at(chunk, row_ids, values)
+        rows = np.nonzero(values == chunk[row_ids])[0]
+        locs, first = np.unique(row_ids[rows], return_index=True)
+        rows = rows[first]
+
+        # Replace the running values where the table governs
+        wins = better(chunk[locs], best[k, locs])
+        locs, rows = locs[wins], rows[wins]
+        best[k, locs] = values[rows]
+        best_case[k, locs] = case[rows]
+        best_step[k, locs] = step[rows]
+
+    def result(self):
+        """
+        Return the envelope as a ResultTable with one row per location. For
+        each field F the table holds FMax, FMin, the governing load cases
+        FMaxCase, FMinCase and steps FMaxStep, FMinStep.
+        """
+        if self.index is None:
+            return ResultTable()
+        columns = self.index.columns()
+        pool = self.index.pool
+        for k, fldnm in enumerate(self._names):
+            columns[fldnm + 'Max'] = self._max[k]
+            columns[fldnm + 'Min'] = self._min[k]
+            columns[fldnm + 'MaxCase'] = CodedColumn(self._max_case[k], pool)
+            columns[fldnm + 'MinCase'] = CodedColumn(self._min_case[k], pool)
+            columns[fldnm + 'MaxStep'] = self._max_step[k]
+            columns[fldnm + 'MinStep'] = self._min_step[k]
+        return ResultTable(columns, Units=self.index.Units, pool=pool)
@@ -0,0 +1,86 @@
+## Group Membership Index
+# This module reads the objects assigned to each group once per model and
+# labels result rows with the group their object belongs to, so several
+# groups can be extracted in one call and separated afterwards.
+
+from .helpers import model_fingerprint, model_key
+from .results import POOL, CodedColumn
+
+import numpy as np
+
+# SAP2000 object type codes returned by GroupDef.GetAssignments
+OBJECT_TYPES = {'Point': 1, 'Frame': 2, 'Cable': 3, 'Tendon': 4, 'Area': 5,
+                'Solid': 6, 'Link': 7}
+
+# Group indices keyed by model file
+_group_cache = {}
+
+
+class GroupIndex:
+    """Objects assigned to each group of a model.
+
+    Variable Definitions:
+      members     = {group: {object type: int32 pooled codes of object names}}
+      fingerprint = model_fingerprint() of the model when the index was built"""
+
+    def __init__(self, fingerprint=None):
+        self.members = {}
+        self.fingerprint = fingerprint
+
+    def load(self, model, groups):
+        """Read the assignments of any groups which are not yet indexed."""
+        for grp in groups:
+            if grp in self.members:
+                continue
+            NumberItems, ObjectType, ObjectName, ret = model.GroupDef.GetAssignments(grp)
+            ObjectType = np.asarray(ObjectType, dtype=np.int32)
+            codes = POOL.encode(list(ObjectName))
+            self.members[grp] = {typ: codes[ObjectType == typ] for typ in np.unique(ObjectType)}
+
+    def names(self, grp, ObjectType=None):
+        """Return the names of the objects in a group, optionally only those
+        of one object type (name or code)."""
+        return list(POOL.decode(self._codes(grp, ObjectType)))
+
+    def _codes(self, grp, ObjectType=None):
+        members = self.members[grp]
+        if ObjectType is None:
+            return np.concatenate(list(members.values())) if members else np.empty(0, np.int32)
+        ObjectType = OBJECT_TYPES.get(ObjectType, ObjectType)
+        return members.get(ObjectType, np.empty(0, np.int32))
+
+    def tag(self, table, groups, ObjectType=None, on='Obj'):
+        """
+        Return a copy of a ResultTable with a 'Group' column naming the group
+        of the object in each row. Rows of objects in more than one of the
+        groups are repeated once per group and rows of objects in none of
+        them are dropped. Rows keep their original order.
+        """
+        obj_codes = table.codes(on)
+        rows = []
+        labels = []
+        for grp in groups:
+            grp_rows = np.nonzero(np.isin(obj_codes, self._codes(grp, ObjectType)))[0]
+            rows.append(grp_rows)
+            labels.append(np.full(len(grp_rows), POOL.encode([grp])[0], dtype=np.int32))
+        rows = np.concatenate(rows) if rows else np.empty(0, np.int64)
+        labels = np.concatenate(labels) if labels else np.empty(0, np.int32)
+        order = np.argsort(rows, kind='stable')
+
+        return table.take(rows[order]).with_columns(Group=CodedColumn(labels[order]))
+
+
+def group_index(model, groups=()):
+    """
+    This function returns the GroupIndex of a model with the given groups
+    loaded. The index is kept between calls and rebuilt when the model file
+    changes.
+    """
+    fingerprint = model_fingerprint(model)
+    key = model_key(model, fingerprint)
+    index = _group_cache.get(key)
+    if index is None or index.fingerprint != fingerprint:
+        index = GroupIndex(fingerprint)
+        _group_cache[key] = index
+    index.load(model, groups)
+    return index
@@ -1,31 +1,82 @@
 from ..constants import units
+from .results import ResultTable
 
-def result_setup(model, load_cases=None, Units=4, NLStatic=1, MSStatic=1,
-                  MVCombo=1):
-    """
-    This function takes the specified output parameters and prepares the model
-    for data extraction.
-    """
-    # Set Units
+import hashlib
+import os
+
+def unit_code(Units):
+    """Return the SAP2000 unit code for a unit name (e.g. "kip, ft") or code."""
     if isinstance(Units, str):
-        Units = units[Units]
+        return units[Units]
     elif isinstance(Units, int):
-        Units = Units
+        return Units
     else:
         raise TypeError("Value of Units variable must be string or integer. \
 Reference the Units.json file in the constants directory for list \
 of valid units.")
-    
+
+def model_fingerprint(model, ContentHash=False):
+    """
+    This function returns a tuple identifying the current state of the model
+    file: (path, size, modification time). When ContentHash is True a hash of
+    the file contents is appended. Any of the values are None when the model
+    has not been saved to disk.
+    """
+    path = model.GetModelFileName(True)
+    try:
+        stat = os.stat(path)
+    except (OSError, TypeError, ValueError):
+        return (path, None, None) + ((None,) if ContentHash else ())
+
+    fingerprint = (path, stat.st_size, stat.st_mtime_ns)
+    if ContentHash:
+        digest = hashlib.blake2b(digest_size=16)
+        with open(path, 'rb') as file:
+            for chunk in iter(lambda: file.read(1 << 20), b''):
+                digest.update(chunk)
+        fingerprint += (digest.hexdigest(),)
+    return fingerprint
+
+def model_key(model, fingerprint):
+    """Return the key under which indices of a model are cached: the model
+    file path, or the model object itself while it has not been saved (all
+    unsaved models share an empty path)."""
+    return fingerprint[0] if fingerprint[1] is not None else model
+
+def result_setup(model, load_cases=None, Units=4, NLStatic=1, MSStatic=1,
+                  MVCombo=1, History=None):
+    """
+    This function takes the specified output parameters and prepares the model
+    for data extraction. History sets the direct and modal time history
+    output options, which are left unchanged when it is None. History may
+    also be a (DirectHist, ModalHist) pair.
+    """
+    # Set Units
+    Units = unit_code(Units)
+
     # Validate LoadCases Type
     if not hasattr(load_cases, '__iter__') or isinstance(load_cases,str):
         load_cases = [load_cases]
 
+    # A ResultSession only issues the calls which change its current state
+    from .session import ResultSession
+    if isinstance(model, ResultSession):
+        model.set_units(Units)
+        model.set_options(NLStatic, MSStatic, MVCombo, History)
+        if load_cases != [None]:
+            return model.select_cases(load_cases)
+        return 0
+
     model.SetPresentUnits(Units)
 
     # Set Result Options
     model.Results.Setup.SetOptionNLStatic(NLStatic)
     model.Results.Setup.SetOptionMultiStepStatic(MSStatic)
     model.Results.Setup.SetOptionMultiValuedCombo(MVCombo)
+    if History is not None:
+        DirectHist, ModalHist = History if isinstance(History, tuple) else (History, History)
+        model.Results.Setup.SetOptionDirectHist(DirectHist)
+        model.Results.Setup.SetOptionModalHist(ModalHist)
 
     # Set Load Cases For Output
     if load_cases != None:
@@ -38,8 +89,161 @@ of valid units.")
 
 def select_groups(model,groups=list):
 
+    from .session import ResultSession
+    if isinstance(model, ResultSession):
+        return model.select_groups(groups)
+
+    # A spatial Selection selects its objects directly
+    from .spatial import Selection
+    if isinstance(groups, Selection):
+        return groups.select(model)
+
     ret = model.SelectObj.ClearSelection()
     for grp in groups:
         ret = model.SelectObj.Group(grp)
     
-    return ret
\ No newline at end of file
+    return ret
+
+def extract_results(model, method, FldNms, LoadCases, Groups=None, Units=4,
+                    NLStatic=1, MSStatic=1, MVCombo=1, Cache=None, Backend="results"):
+    """
+    This function prepares the model for output, calls the given
+    model.Results method and returns the output as a ResultTable.
+
+    Variable Definitions:
+      method      = Name of the OAPI Results method (e.g. "AreaForceShell")
+      FldNms      = Field names of the values returned by the method
+      Groups      = Selection groups, or a functions.spatial.Selection of
+                    objects. When None no selection is made and the method
+                    is called without arguments (e.g. BaseReact)
+      Cache       = Optional ResultCache. On a cache hit the model is not
+                    prepared or queried at all. With a per-case cache only
+                    the cases missing from it are extracted. Only results
+                    read with the Results methods are stored, so a cache
+                    never returns values rounded by the tables backend.
+      Backend     = "results" (Default) to use the Results methods, "tables"
+                    to read the equivalent database table in bulk (see
+                    functions.tables), or "auto" to use the one predicted to
+                    be faster from previous timings. With "auto" each
+                    backend is tried once on the first extractions of a
+                    method to time it. Table values are rounded to their
+                    display precision, so "tables" and "auto" can return
+                    fewer digits than "results".
+    """
+    if Cache is not None and getattr(Cache, 'PerCase', False):
+        return _extract_cases(model, method, FldNms, LoadCases, Groups, Units, NLStatic,
+                              MSStatic, MVCombo, Cache, Backend)
+    if Cache is not None:
+        key = Cache.key(model, method, LoadCases, Groups, Units,
+                        NLStatic, MSStatic, MVCombo)
+        output_dict = None if key is None else Cache.get(key)
+        if output_dict is not None:
+            return output_dict
+
+    output_dict, used = _extract(model, method, FldNms, LoadCases, Groups, Units, NLStatic,
+                                 MSStatic, MVCombo, Backend)
+
+    # Only full precision results are cached, see ResultCache
+    if Cache is not None and key is not None and used == "results":
+        Cache.put(key, output_dict)
+    return output_dict
+
+def _extract(model, method, FldNms, LoadCases, Groups, Units, NLStatic, MSStatic, MVCombo,
+             Backend):
+    # Extraction through the chosen backend, without caching. Returns the
+    # table and the backend used
+    from .tables import choose_backend, timed_extract, extract_table
+    if Backend == "auto":
+        Backend = choose_backend(method, Groups, LoadCases)
+
+    if Backend == "tables":
+        extract = lambda: extract_table(model, method, FldNms, LoadCases, Groups, Units,
+                                        NLStatic, MSStatic, MVCombo)
+    elif Backend == "results":
+        extract = lambda: _results_call(model, method, FldNms, LoadCases, Groups, Units,
+                                        NLStatic, MSStatic, MVCombo)
+    else:
+        raise ValueError("Backend must be 'auto', 'results' or 'tables', not {0!r}."
+                         .format(Backend))
+    return timed_extract(method, LoadCases, Groups, Backend, extract), Backend
+
+def _extract_cases(model, method, FldNms, LoadCases, Groups, Units, NLStatic, MSStatic,
+                   MVCombo, Cache, Backend):
+    # Extraction through a per-case cache: cached cases are read from disk,
+    # the others are extracted in one call and split by case
+    if not hasattr(LoadCases, '__iter__') or isinstance(LoadCases, str):
+        LoadCases = [LoadCases]
+    keys = Cache.case_keys(model, method, LoadCases, Groups, Units,
+                           NLStatic, MSStatic, MVCombo)
+    tables = {case: Cache.get(key) for case, key in keys.items() if key is not None}
+    missing = [case for case in LoadCases if tables.get(case) is None]
+    if missing:
+        output_dict, used = _extract(model, method, FldNms, missing, Groups, Units, NLStatic,
+                                     MSStatic, MVCombo, Backend)
+        cases = output_dict['LoadCase']
+        for case in missing:
+            tables[case] = output_dict.take(cases == case)
+            if keys[case] is not None and used == "results":
+                Cache.put(keys[case], tables[case])
+    return ResultTable.concat([tables[case] for case in LoadCases])
+
+def _results_call(model, method, FldNms, LoadCases, Groups, Units, NLStatic, MSStatic,
+                  MVCombo):
+    # Extraction through the model.Results methods
+    result_setup(model=model, load_cases=LoadCases, Units=Units,
+                 NLStatic=NLStatic, MSStatic=MSStatic, MVCombo=MVCombo)
+
+    if Groups is None:
+        output = getattr(model.Results, method)()
+    else:
+        # Select all objects in specified groups
+        select_groups(model=model, groups=Groups)
+        output = getattr(model.Results, method)("", 3)
+
+    return ResultTable.from_output(FldNms, output, Units=unit_code(Units))
+
+def iter_results(model, method, FldNms, LoadCases, Groups=None, Units=4,
+                 NLStatic=1, MSStatic=1, MVCombo=1, Steps=None, ChunkRows=None):
+    """
+    Generator version of extract_results. The load cases are selected and
+    extracted one at a time and each case's output is yielded as ResultTables
+    of at most ChunkRows rows, so only one case is held in memory at once.
+
+    Variable Definitions:
+      Steps       = Optional (first, last) range of StepNum values to keep,
+                    inclusive. The OAPI returns every step of a case, the
+                    other steps are dropped before the case is yielded.
+      ChunkRows   = Maximum number of rows per yielded table. Default yields
+                    one table per load case.
+
+    Units, result options and the group selection are set once. Cases are
+    switched through a ResultSession so only the previous case is
+    deselected between calls.
+    """
+    from .session import ResultSession
+    session = model if isinstance(model, ResultSession) else ResultSession(model)
+
+    if not hasattr(LoadCases, '__iter__') or isinstance(LoadCases, str):
+        LoadCases = [LoadCases]
+    if Groups is not None:
+        session.select_groups(Groups)
+
+    for case in LoadCases:
+        result_setup(model=session, load_cases=[case], Units=Units,
+                     NLStatic=NLStatic, MSStatic=MSStatic, MVCombo=MVCombo)
+        if Groups is None:
+            output = getattr(session.Results, method)()
+        else:
+            output = getattr(session.Results, method)("", 3)
+        table = ResultTable.from_output(FldNms, output, Units=unit_code(Units))
+        del output
+
+        if Steps is not None and 'StepNum' in table:
+            first, last = Steps
+            table = table.take((table['StepNum'] >= first) & (table['StepNum'] <= last))
+
+        if ChunkRows is None or table.nrows <= ChunkRows:
+            yield table
+            continue
+        for start in range(0, table.nrows, ChunkRows):
+            yield table.take(slice(start, start + ChunkRows))
@@ -0,0 +1,203 @@
+## OAPI Call Profiler
+# This module wraps a SapModel in a recording proxy. Every OAPI method called
+# through the proxy is timed and attributed to the sap2k function calling it,
+# so the time of a script can be split between COM round trips, by method and
+# by caller, and the Python work around them. Nothing is wrapped unless a
+# model is passed through Profiler.wrap, and a disabled profiler only adds a
+# flag check to each call.
+
+from .results import ResultTable
+
+import sys
+import time
+
+import numpy as np
+
+# Modules whose frames are not attributed as callers
+_SKIP_MODULES = ('sap2k.functions.profiler', 'sap2k.testing')
+
+
+def payload_size(output):
+    """Return the number of values returned by an OAPI call, counting each
+    item of an array output."""
+    if isinstance(output, (tuple, list)):
+        return sum(len(val) if isinstance(val, (tuple, list, np.ndarray)) else 1
+                   for val in output)
+    return 1
+
+
+def _frame_name(frame):
+    code = frame.f_code
+    return frame.f_globals.get('__name__', '?') + ':' + getattr(code, 'co_qualname', code.co_name)
+
+
+class Profiler:
+    """
+    Recorder of the OAPI calls made through wrapped models.
+
+    Variable Definitions:
+      enabled     = Record calls (Default True). A disabled profiler passes
+                    calls straight through.
+      stacks      = Keep the full Python call stack of each call for
+                    folded() (Default True)
+
+    For each (caller, entry, method) the number of calls, cumulative seconds
+    and values returned are kept. The caller is the innermost sap2k function
+    making the call (e.g. result_setup) and the entry is the outermost one
+    (e.g. AreaForceShell). Using the profiler as a context manager enables
+    it and records the wall time of the block.
+
+    Example:
+      prof = Profiler()
+      model = prof.wrap(model)
+      with prof:
+          AreaForceShell(model, LoadCases, Groups)
+      print(prof.summary().to_pandas())
+      prof.write_folded('sap2k.folded')   # flamegraph.pl / speedscope input
+    """
+
+    def __init__(self, enabled=True, stacks=True):
+        self.enabled = enabled
+        self.stacks = stacks
+        self.wall_time = 0.0
+        self.reset()
+
+    def reset(self):
+        """Discard all recorded calls."""
+        self.records = {}
+        self.folded_time = {}
+        self.wall_time = 0.0
+
+    def wrap(self, model):
+        """Return a proxy of a SapModel (or SapObject) recording its calls."""
+        return ProfiledObject(model, self)
+
+    def __enter__(self):
+        self.enabled = True
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.wall_time += time.perf_counter() - self._start
+        self.enabled = False
+
+    def record(self, method, seconds, output, frame):
+        """Record one call of an OAPI method made from a Python frame."""
+        caller = entry = '<script>'
+        stack = []
+        while frame is not None:
+            module = frame.f_globals.get('__name__', '')
+            if module.startswith('sap2k') and not module.startswith(_SKIP_MODULES):
+                entry = frame.f_code.co_name
+                if caller == '<script>':
+                    caller = entry
+            if self.stacks and not module.startswith(_SKIP_MODULES):
+                stack.append(_frame_name(frame))
+            frame = frame.f_back
+
+        rec = self.records.get((caller, entry, method))
+        if rec is None:
+            rec = self.records[(caller, entry, method)] = [0, 0.0, 0]
+        rec[0] += 1
+        rec[1] += seconds
+        rec[2] += payload_size(output)
+        if self.stacks:
+            key = ';'.join(reversed(stack)) + ';' + method
+            self.folded_time[key] = self.folded_time.get(key, 0.0) + seconds
+
+    @property
+    def com_time(self):
+        """Total seconds spent in OAPI calls."""
+        return sum(rec[1] for rec in self.records.values())
+
+    @property
+    def python_time(self):
+        """Seconds of the profiled blocks spent outside OAPI calls."""
+        return self.wall_time - self.com_time
+
+    def summary(self, by=('Caller', 'Method')):
+        """
+        Return the recorded calls as a ResultTable sorted by time, highest
+        first.
+
+        Variable Definitions:
+          by          = Fields to total over, any of 'Caller', 'Entry' and
+                        'Method' (Default ('Caller', 'Method'))
+          Returns     = ResultTable of the by fields and Calls, Seconds,
+                        Values (values returned) and Share (fraction of the
+                        OAPI time)
+        """
+        by = [by] if isinstance(by, str) else list(by)
+        position = {'Caller': 0, 'Entry': 1, 'Method': 2}
+        totals = {}
+        for key, (calls, seconds, values) in self.records.items():
+            group = tuple(key[position[fld]] for fld in by)
+            tot = totals.setdefault(group, [0, 0.0, 0])
+            tot[0] += calls
+            tot[1] += seconds
+            tot[2] += values
+
+        groups = sorted(totals, key=lambda grp: -totals[grp][1])
+        stats = np.array([totals[grp] for grp in groups], dtype=np.float64).reshape(-1, 3)
+        columns = {fld: [grp[k] for grp in groups] for k, fld in enumerate(by)}
+        columns.update(Calls=stats[:, 0], Seconds=stats[:, 1], Values=stats[:, 2],
+                       Share=stats[:, 1] / max(stats[:, 1].sum(), 1e-300))
+        return ResultTable(columns)
+
+    def folded(self):
+        """Return the call stacks in the folded format of flamegraph.pl, one
+        'frame;frame;...;method microseconds' line per stack."""
+        return ['{0} {1}'.format(key, int(round(seconds * 1e6)))
+                for key, seconds in self.folded_time.items()]
+
+    def write_folded(self, path):
+        """Write folded() to a file."""
+        with open(path, 'w') as file:
+            file.write('\n'.join(self.folded()) + '\n')
+
+
+class ProfiledObject:
+    """
+    Proxy of an OAPI object. Attributes holding OAPI objects (Results,
+    SelectObj, ...) are returned as proxies and calls of methods are
+    recorded with the profiler. Use Profiler.wrap to create one.
+    """
+
+    def __init__(self, target, profiler, path=''):
+        object.__setattr__(self, '_target', target)
+        object.__setattr__(self, '_profiler', profiler)
+        object.__setattr__(self, '_path', path)
+        object.__setattr__(self, '_children', {})
+
+    def __getattr__(self, name):
+        children = self._children
+        if name in children:
+            return children[name]
+        value = getattr(self._target, name)
+        if callable(value):
+            child = _profiled_method(value, self._profiler, self._path + name)
+        elif isinstance(value, (str, bytes, int, float, bool, tuple, list, dict, type(None))):
+            return value
+        else:
+            child = ProfiledObject(value, self._profiler, self._path + name + '.')
+        children[name] = child
+        return child
+
+    def __setattr__(self, name, value):
+        setattr(self._target, name, value)
+
+    def __repr__(self):
+        return 'ProfiledObject({0!r})'.format(self._target)
+
+
+def _profiled_method(method, profiler, name):
+    # Timed version of a bound OAPI method
+    def call(*args, **kwargs):
+        if not profiler.enabled:
+            return method(*args, **kwargs)
+        start = time.perf_counter()
+        output = method(*args, **kwargs)
+        profiler.record(name, time.perf_counter() - start, output, sys._getframe(1))
+        return output
+    call.__name__ = name
+    return call
@@ -0,0 +1,160 @@
+## Base Reaction Tensor
+# This module arranges base reactions as a dense (case x step x component)
+# array, so that the peaks, root mean squares and envelopes of every load
+# case and component of a response spectrum or time history run are found
+# with single array operations instead of pivoting the result rows by hand.
+
+from .averaging import as_table
+from .results import ResultTable
+
+import numpy as np
+
+# Base reaction components, forces then moments
+COMPONENTS = ('Fx', 'Fy', 'Fz', 'Mx', 'My', 'Mz')
+
+
+class ReactionTensor:
+    """
+    Base reactions of several load cases and steps as one array.
+
+    Variable Definitions:
+      values      = (cases x steps x components) float64 array. Cases with
+                    fewer steps than the longest are padded with NaN.
+      cases       = Load case names along the first axis
+      step_num    = (cases x steps) StepNum of each entry, NaN for padding
+      step_type   = (cases x steps) StepType of each entry
+      components  = Component names along the last axis (Default COMPONENTS)
+      origin      = (gx, gy, gz) point the moments are reported about
+      Units       = SAP2000 unit code of the values
+
+    The summaries ignore padding and return ResultTables with one row per
+    load case. Step numbers of time history cases are reported by SAP2000
+    as the output step, multiply by the output time step for a time.
+
+    Example:
+      rx = BaseReactionTensor(model, ['EQX-TH', 'EQY-TH'])
+      peaks = rx.peak()                        # Fx, FxStep, Fy, FyStep, ...
+      shear = np.hypot(rx.component('Fx'), rx.component('Fy'))
+    """
+
+    def __init__(self, values, cases, step_num, step_type, components=COMPONENTS,
+                 origin=(0.0, 0.0, 0.0), Units=None):
+        self.values = np.asarray(values, dtype=np.float64)
+        self.cases = list(cases)
+        self.step_num = np.asarray(step_num, dtype=np.float64)
+        self.step_type = np.asarray(step_type, dtype=object)
+        self.components = list(components)
+        self.origin = np.asarray(origin, dtype=np.float64)
+        self.Units = Units
+
+    @classmethod
+    def from_table(cls, RawResults, LoadCases=None, components=COMPONENTS):
+        """
+        Build the tensor from base reaction rows.
+
+        Variable Definitions:
+          RawResults  = base_reactions ResultTable (or dict / legacy list)
+          LoadCases   = Order of the cases along the first axis. Rows of
+                        other cases are dropped and cases without rows are
+                        all NaN. Default: cases in the order they appear.
+        """
+        table = as_table(RawResults)
+        codes = table.codes('LoadCase')
+        if LoadCases is None:
+            uniq, first = np.unique(codes, return_index=True)
+            case_codes = uniq[np.argsort(first)]
+        else:
+            if isinstance(LoadCases, str):
+                LoadCases = [LoadCases]
+            case_codes = table.pool.encode(list(dict.fromkeys(LoadCases)))
+        cases = table.pool.decode(case_codes).tolist()
+
+        # Case of every row, rows of other cases are dropped
+        order = np.argsort(case_codes, kind='stable')
+        pos = np.minimum(np.searchsorted(case_codes[order], codes), max(len(order) - 1, 0))
+        rows = np.nonzero(case_codes[order][pos] == codes)[0] if len(order) else \
+            np.empty(0, dtype=np.int64)
+        case_ids = order[pos[rows]]
+
+        # Position of every row among the rows of its case
+        counts = np.bincount(case_ids, minlength=len(cases))
+        by_case = np.argsort(case_ids, kind='stable')
+        steps = np.empty(len(rows), dtype=np.int64)
+        steps[by_case] = np.arange(len(rows)) - np.repeat(np.cumsum(counts) - counts, counts)
+
+        shape = (len(cases), int(counts.max(initial=0)))
+        values = np.full(shape + (len(components),), np.nan)
+        values[case_ids, steps] = table.to_numpy(list(components))[:, rows].T
+        step_num = np.full(shape, np.nan)
+        step_num[case_ids, steps] = table['StepNum'][rows] if 'StepNum' in table else 0.0
+        step_type = np.full(shape, '', dtype=object)
+        if 'StepType' in table:
+            step_type[case_ids, steps] = np.asarray(table['StepType'])[rows]
+        origin = [table.get(fldnm, 0.0) for fldnm in ('gx', 'gy', 'gz')]
+        return cls(values, cases, step_num, step_type, components, origin, table.Units)
+
+    @property
+    def shape(self):
+        return self.values.shape
+
+    def component(self, name):
+        """Return the (cases x steps) values of one component."""
+        return self.values[:, :, self.components.index(name)]
+
+    def about(self, point):
+        """Return the tensor with the moments taken about another point
+        (X, Y, Z), e.g. the mudline for overturning checks. Requires the
+        Fx to Mz components."""
+        forces = np.stack([self.component(nm) for nm in ('Fx', 'Fy', 'Fz')], axis=-1)
+        moments = np.stack([self.component(nm) for nm in ('Mx', 'My', 'Mz')], axis=-1)
+        moments = moments + np.cross(self.origin - np.asarray(point, dtype=np.float64), forces)
+        values = self.values.copy()
+        for k, nm in enumerate(('Mx', 'My', 'Mz')):
+            values[:, :, self.components.index(nm)] = moments[:, :, k]
+        return self.__class__(values, self.cases, self.step_num, self.step_type,
+                              self.components, point, self.Units)
+
+    def _table(self, fields):
+        columns = {'LoadCase': self.cases}
+        columns.update(fields)
+        return ResultTable(columns, Units=self.Units)
+
+    def peak(self):
+        """Return the signed value of largest magnitude of each case and
+        component and, in <component>Step, the StepNum it occurs at."""
+        values, step_num = self.values, self.step_num
+        if not self.shape[1]:
+            values = np.full((self.shape[0], 1, self.shape[2]), np.nan)
+            step_num = np.full((self.shape[0], 1), np.nan)
+        # Padding is NaN in both arrays, so cases without steps give NaN
+        steps = np.argmax(np.where(np.isnan(values), -1.0, np.abs(values)), axis=1)
+        peak = np.take_along_axis(values, steps[:, None, :], axis=1)[:, 0]
+        step = np.take_along_axis(step_num, steps, axis=1)
+        fields = {}
+        for k, nm in enumerate(self.components):
+            fields[nm] = peak[:, k]
+            fields[nm + 'Step'] = step[:, k]
+        return self._table(fields)
+
+    def rms(self):
+        """Return the root mean square over the steps of each case and
+        component."""
+        with np.errstate(invalid='ignore', divide='ignore'):
+            counts = np.sum(~np.isnan(self.values), axis=1)
+            rms = np.sqrt(np.nansum(self.values ** 2, axis=1) / counts)
+        return self._table({nm: rms[:, k] for k, nm in enumerate(self.components)})
+
+    def envelope(self):
+        """Return the signed envelope (<component>Max and <component>Min)
+        of each case and component over its steps."""
+        filled = np.where(np.isnan(self.values), -np.inf, self.values)
+        upper = filled.max(axis=1, initial=-np.inf)
+        filled = np.where(np.isnan(self.values), np.inf, self.values)
+        lower = filled.min(axis=1, initial=np.inf)
+        upper[np.isinf(upper)] = np.nan
+        lower[np.isinf(lower)] = np.nan
+        fields = {}
+        for k, nm in enumerate(self.components):
+            fields[nm + 'Max'] = upper[:, k]
+            fields[nm + 'Min'] = lower[:, k]
+        return self._table(fields)
@@ -0,0 +1,325 @@
+## Columnar Result Container
+# This module defines the result type returned by the extraction functions.
+# Numeric fields are held as contiguous float64 arrays and string fields are
+# held as integer codes into a shared dictionary of names.
+
+import sys
+import threading
+
+import numpy as np
+
+# Fields which are always stored as coded strings
+STRING_FIELDS = ('Obj', 'Elm', 'PointElm', 'LoadCase', 'StepType', 'Group',
+                 'Joint', 'OutputCase', 'FrameName', 'RatioType', 'ComboName',
+                 'ErrorSummary', 'WarningSummary')
+
+# Fields which hold a single value rather than one value per result
+SCALAR_FIELDS = ('NumberResults', 'NumberItems', 'ret', 'gx', 'gy', 'gz')
+
+
+class StringPool:
+    """Shared dictionary of interned names. Every ResultTable created in a
+    process encodes its string fields against the same pool, so the codes of
+    one table can be compared directly with the codes of another."""
+
+    def __init__(self):
+        self._index = {}
+        self._values = []
+        self._array = None
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._values)
+
+    def _add(self, values):
+        with self._lock:
+            for val in values:
+                if val not in self._index:
+                    val = sys.intern(val) if isinstance(val, str) else val
+                    self._index[val] = len(self._values)
+                    self._values.append(val)
+
+    def encode(self, values):
+        """Return the int32 codes of a sequence of names, adding any names
+        that are not yet in the pool."""
+        index = self._index
+        try:
+            return np.fromiter(map(index.__getitem__, values), dtype=np.int32,
+                               count=len(values))
+        except KeyError:
+            # New names are pooled in order of first appearance so codes
+            # do not depend on set ordering
+            self._add(dict.fromkeys(val for val in values if val not in index))
+            return np.fromiter(map(index.__getitem__, values), dtype=np.int32,
+                               count=len(values))
+
+    def code(self, value):
+        """Return the code of a single name, or -1 when it is not pooled."""
+        return self._index.get(value, -1)
+
+    @property
+    def array(self):
+        """Object array of all pooled names, indexed by code."""
+        if self._array is None or len(self._array) != len(self._values):
+            self._array = np.array(self._values + [None], dtype=object)[:-1]
+        return self._array
+
+    def decode(self, codes):
+        return self.array[codes]
+
+    def categorical(self, codes):
+        """pandas Categorical of coded names. The categories are only the
+        names used, sorted by code, so grouping on it yields no empty groups
+        for other names in the pool."""
+        import pandas as pd
+        used, inverse = np.unique(codes, return_inverse=True)
+        return pd.Categorical.from_codes(inverse.astype(np.int32), categories=self.decode(used),
+                                         validate=False)
+
+
+POOL = StringPool()
+
+
+def _rebuild_column(names, codes):
+    # Re-encode a pickled column against the pool of the current process
+    return CodedColumn(POOL.encode(names)[codes])
+
+
+class CodedColumn:
+    """A string field held as int32 codes into a StringPool. Iteration and
+    indexing return the names, and np.asarray() returns an object array, so
+    existing code which treats the field as a sequence of strings still
+    works."""
+
+    __slots__ = ('codes', 'pool')
+
+    def __init__(self, codes, pool=POOL):
+        self.codes = np.asarray(codes, dtype=np.int32)
+        self.pool = pool
+
+    def __len__(self):
+        return len(self.codes)
+
+    def __iter__(self):
+        return iter(self.pool.decode(self.codes))
+
+    def __getitem__(self, idx):
+        if isinstance(idx, (int, np.integer)):
+            return self.pool._values[self.codes[idx]]
+        return CodedColumn(self.codes[idx], self.pool)
+
+    def __array__(self, dtype=None, copy=None):
+        arr = self.pool.decode(self.codes)
+        return arr if dtype is None else arr.astype(dtype)
+
+    def __eq__(self, other):
+        if isinstance(other, str):
+            return self.codes == self.pool.code(other)
+        return np.asarray(self) == np.asarray(other)
+
+    def __ne__(self, other):
+        return ~self.__eq__(other)
+
+    def isin(self, names):
+        codes = [self.pool.code(nm) for nm in names]
+        return np.isin(self.codes, codes)
+
+    def unique(self):
+        return list(self.pool.decode(np.unique(self.codes)))
+
+    def __repr__(self):
+        return "CodedColumn({0})".format(list(self[:5]) + (['...'] if len(self) > 5 else []))
+
+    def __reduce__(self):
+        uniq, local = np.unique(self.codes, return_inverse=True)
+        return (_rebuild_column, (list(self.pool.decode(uniq)), local.astype(np.int32)))
+
+
+class ResultTable(dict):
+    """Columnar container for the results of an OAPI extraction.
+
+    The table is a dict keyed by the SAP2000 field names in the order they
+    were returned, so it can be used anywhere the previous dict of tuples
+    was used (including pandas.DataFrame(table)).
+
+      Numeric fields  = float64 arrays. Each array is a row of one contiguous
+                        block (see to_numpy()).
+      String fields   = CodedColumn, int32 codes into the shared StringPool
+      Scalar fields   = NumberResults / ret are kept as returned by SAP2000
+      Units           = SAP2000 unit code the values are reported in"""
+
+    def __init__(self, columns=None, Units=None, pool=POOL):
+        super().__init__()
+        self.pool = pool
+        self.Units = Units
+        self.block = np.empty((0, 0))
+        columns = {} if columns is None else columns
+        numeric = []
+        for fldnm, col in columns.items():
+            if fldnm in SCALAR_FIELDS or np.ndim(col) == 0:
+                dict.__setitem__(self, fldnm, col)
+            elif isinstance(col, CodedColumn):
+                dict.__setitem__(self, fldnm, col)
+            elif fldnm in STRING_FIELDS or _is_text(col):
+                dict.__setitem__(self, fldnm, CodedColumn(pool.encode(col), pool))
+            else:
+                dict.__setitem__(self, fldnm, None)
+                numeric.append((fldnm, col))
+        self._pack(numeric)
+
+    @classmethod
+    def from_output(cls, FldNms, output, Units=None, pool=POOL):
+        """Build a table from the tuple returned by an OAPI Results call."""
+        return cls(dict(zip(FldNms, output)), Units=Units, pool=pool)
+
+    @classmethod
+    def from_block(cls, fields, block, columns=None, Units=None, pool=POOL):
+        """Build a table on an existing (numeric fields x rows) float64 block
+        without copying it, e.g. a memory map. fields lists every field in
+        order, columns holds the values of the non-numeric ones."""
+        columns = {} if columns is None else columns
+        table = cls(Units=Units, pool=pool)
+        table.block = block
+        row = 0
+        for fldnm in fields:
+            if fldnm in columns:
+                dict.__setitem__(table, fldnm, columns[fldnm])
+            else:
+                dict.__setitem__(table, fldnm, block[row])
+                row += 1
+        return table
+
+    @classmethod
+    def concat(cls, tables):
+        """Stack tables with the same fields end to end."""
+        tables = [tbl for tbl in tables if tbl is not None]
+        if not tables:
+            return cls()
+        first = tables[0]
+        columns = {}
+        for fldnm, col in first.items():
+            if not isinstance(col, (np.ndarray, CodedColumn)):
+                columns[fldnm] = sum(tbl.nrows for tbl in tables) \
+                    if fldnm in ('NumberResults', 'NumberItems') else col
+            elif isinstance(col, CodedColumn):
+                columns[fldnm] = CodedColumn(np.concatenate([tbl[fldnm].codes for tbl in tables]),
+                                             first.pool)
+            else:
+                columns[fldnm] = np.concatenate([tbl[fldnm] for tbl in tables])
+        return cls(columns, Units=first.Units, pool=first.pool)
+
+    def _pack(self, numeric):
+        # Copy the numeric columns into one contiguous (fields x rows) block
+        nrows = len(numeric[0][1]) if numeric else self._string_rows()
+        self.block = np.empty((len(numeric), nrows), dtype=np.float64)
+        for i, (fldnm, col) in enumerate(numeric):
+            self.block[i] = col
+            dict.__setitem__(self, fldnm, self.block[i])
+
+    def _string_rows(self):
+        for col in self.values():
+            if isinstance(col, CodedColumn):
+                return len(col)
+        return 0
+
+    def __setitem__(self, fldnm, col):
+        current = self.get(fldnm)
+        if fldnm in SCALAR_FIELDS or np.ndim(col) == 0 or isinstance(col, CodedColumn) \
+                or fldnm in STRING_FIELDS or _is_text(col):
+            if not isinstance(col, CodedColumn) and np.ndim(col) and fldnm not in SCALAR_FIELDS:
+                col = CodedColumn(self.pool.encode(col), self.pool)
+            dict.__setitem__(self, fldnm, col)
+            if isinstance(current, np.ndarray):
+                # A numeric field was replaced, drop its row of the block
+                self._pack([(nm, val) for nm, val in self.items()
+                            if isinstance(val, np.ndarray)])
+        elif isinstance(current, np.ndarray) and self.block.flags.writeable:
+            # Overwrite the field's row of the block in place
+            current[...] = col
+        else:
+            # New numeric field (or a read-only block): repack the block
+            dict.__setitem__(self, fldnm, None)
+            self._pack([(nm, col if nm == fldnm else val) for nm, val in self.items()
+                        if nm == fldnm or isinstance(val, np.ndarray)])
+
+    def __reduce__(self):
+        return (self.__class__, (dict(self), self.Units))
+
+    @property
+    def nrows(self):
+        if self.block.shape[0]:
+            return self.block.shape[1]
+        return self._string_rows()
+
+    @property
+    def numeric_fields(self):
+        return [fldnm for fldnm, col in self.items() if isinstance(col, np.ndarray)]
+
+    @property
+    def string_fields(self):
+        return [fldnm for fldnm, col in self.items() if isinstance(col, CodedColumn)]
+
+    def codes(self, fldnm):
+        """int32 codes of a string field."""
+        return self[fldnm].codes
+
+    def to_numpy(self, fields=None):
+        """Return numeric data without copying.
+
+          fields = None        -> the (fields x rows) block of every numeric field
+                   field name  -> the float64 array of that field
+                   list        -> a stacked (fields x rows) array (copied)"""
+        if fields is None:
+            return self.block
+        if isinstance(fields, str):
+            return self[fields]
+        return np.stack([self[fldnm] for fldnm in fields])
+
+    def to_pandas(self):
+        """Return a DataFrame with one row per result. Numeric columns share
+        memory with the table where pandas allows it and string columns are
+        pandas Categoricals over the names they use (see
+        StringPool.categorical)."""
+        import pandas as pd
+        columns = {}
+        for fldnm, col in self.items():
+            if isinstance(col, CodedColumn):
+                columns[fldnm] = self.pool.categorical(col.codes)
+            elif isinstance(col, np.ndarray):
+                columns[fldnm] = col
+        return pd.DataFrame(columns, copy=False)
+
+    def to_units(self, Units, dims=None):
+        """Return the table converted to another unit system (see
+        functions.units.convert_units)."""
+        from .units import convert_units
+        return convert_units(self, Units, dims)
+
+    def take(self, idx):
+        """Return a new table holding the rows selected by an index array or
+        boolean mask."""
+        columns = {}
+        for fldnm, col in self.items():
+            if isinstance(col, (np.ndarray, CodedColumn)):
+                columns[fldnm] = col[idx]
+            else:
+                columns[fldnm] = col
+        table = self.__class__(columns, Units=self.Units, pool=self.pool)
+        if 'NumberResults' in table:
+            dict.__setitem__(table, 'NumberResults', table.nrows)
+        return table
+
+    def rename(self, mapping):
+        """Return a new table with fields renamed according to a dict."""
+        columns = {mapping.get(fldnm, fldnm): col for fldnm, col in self.items()}
+        return self.__class__(columns, Units=self.Units, pool=self.pool)
+
+    def with_columns(self, **new_cols):
+        """Return a new table with the given columns added or replaced."""
+        columns = dict(self)
+        columns.update(new_cols)
+        return self.__class__(columns, Units=self.Units, pool=self.pool)
+
+
+def _is_text(col):
+    return len(col) > 0 and isinstance(col[0], str)
@@ -0,0 +1,122 @@
+## Results Session
+# This module wraps a SapModel and remembers the output units, result
+# options, case selection and object selection it has set, so that
+# back-to-back extractions only issue the OAPI calls needed to change them.
+
+from .helpers import unit_code
+
+
+class ResultSession:
+    """
+    Stateful wrapper around a SapModel. Pass it to any extraction function
+    in place of the model. Attributes which are not defined here (Results,
+    SelectObj, PointElm, ...) are forwarded to the wrapped model.
+
+    The session assumes that it is the only thing changing the units,
+    result options and selections of the model. Call invalidate() after
+    changing them by other means.
+
+    Variable Definitions:
+      model       = SAP Model object (SapObject.SapModel)
+    """
+
+    def __init__(self, model):
+        self.model = model
+        self.invalidate()
+
+    def __getattr__(self, name):
+        return getattr(self.model, name)
+
+    def invalidate(self):
+        """Forget the tracked state so the next call sets everything again."""
+        self._units = None
+        self._options = {}
+        self._cases = None
+        self._kinds = {}
+        self._groups = None
+
+    def set_units(self, Units):
+        Units = unit_code(Units)
+        if Units != self._units:
+            self.model.SetPresentUnits(Units)
+            self._units = Units
+
+    def SetPresentUnits(self, Units):
+        self.set_units(Units)
+        return 0
+
+    def GetPresentUnits(self):
+        if self._units is None:
+            self._units = self.model.GetPresentUnits()
+        return self._units
+
+    def set_options(self, NLStatic=1, MSStatic=1, MVCombo=1, History=None):
+        """Set the result options which differ from the current ones. The
+        direct and modal history options are left as they are when History
+        is None, History may also be a (DirectHist, ModalHist) pair."""
+        setup = self.model.Results.Setup
+        options = [('NLStatic', NLStatic, setup.SetOptionNLStatic),
+                   ('MSStatic', MSStatic, setup.SetOptionMultiStepStatic),
+                   ('MVCombo', MVCombo, setup.SetOptionMultiValuedCombo)]
+        if History is not None:
+            DirectHist, ModalHist = History if isinstance(History, tuple) else (History, History)
+            options += [('DirectHist', DirectHist, setup.SetOptionDirectHist),
+                        ('ModalHist', ModalHist, setup.SetOptionModalHist)]
+        for option, value, setter in options:
+            if self._options.get(option) != value:
+                setter(value)
+                self._options[option] = value
+
+    def _select_case(self, name, Selected=True):
+        # Cases and combinations share one name space, remember which one
+        # each name turned out to be
+        setup = self.model.Results.Setup
+        if self._kinds.get(name) != 'combo':
+            ret = setup.SetCaseSelectedForOutput(name, Selected)
+            if ret == 0:
+                self._kinds[name] = 'case'
+                return ret
+        ret = setup.SetComboSelectedForOutput(name, Selected)
+        if ret == 0:
+            self._kinds[name] = 'combo'
+        return ret
+
+    def select_cases(self, load_cases):
+        """Select load cases and combinations for output, changing only the
+        ones which differ from the current selection."""
+        ret = 0
+        new_cases = set(load_cases)
+        if self._cases is None:
+            ret = self.model.Results.Setup.DeselectAllCasesAndCombosForOutput()
+            self._cases = set()
+        for name in self._cases - new_cases:
+            ret = self._select_case(name, False)
+        for name in new_cases - self._cases:
+            ret = self._select_case(name, True)
+        self._cases = new_cases
+        return ret
+
+    def select_groups(self, groups):
+        """Select the objects in the given groups. Groups are only added to
+        the selection when the new groups contain the current ones,
+        otherwise the selection is cleared first."""
+        ret = 0
+        from .spatial import Selection
+        if isinstance(groups, Selection):
+            if groups != self._groups:
+                ret = groups.select(self.model)
+                self._groups = groups
+            return ret
+        groups = list(groups)
+        if isinstance(self._groups, Selection):
+            self._groups = None
+        if self._groups is not None and set(groups) == set(self._groups):
+            return ret
+        if self._groups is None or not set(self._groups) <= set(groups):
+            ret = self.model.SelectObj.ClearSelection()
+            self._groups = []
+        for grp in groups:
+            if grp not in self._groups:
+                ret = self.model.SelectObj.Group(grp)
+        self._groups = groups
+        return ret
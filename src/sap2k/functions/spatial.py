@@ -0,0 +1,301 @@
+## Spatial Index
+# This module indexes the model's points on a uniform grid, together with
+# the connectivity of its frame and area objects, so that the objects in a
+# region can be found without extracting results for the whole model. Query
+# results are Selections, which the extraction functions accept in place of
+# Groups.
+
+from .helpers import model_fingerprint, model_key
+from .coords import point_coords
+from .tables import display_table
+
+import numpy as np
+
+# Object types which can be selected, each through its <type>Obj interface
+SELECT_TYPES = ('Point', 'Frame', 'Area')
+
+# Spatial indices keyed by (model file, units, elements)
+_spatial_cache = {}
+
+# Connectivity tables of the objects and of the analysis mesh elements:
+# (table, name column, joint columns of a frame, prefix of the joint columns
+# of an area)
+CONNECTIVITY_TABLES = {
+    False: (('Connectivity - Frame', 'Frame', ('JointI', 'JointJ')),
+            ('Connectivity - Area', 'Area', 'Joint')),
+    True: (('Objects And Elements - Frames', 'FrameElem', ('ElemJtI', 'ElemJtJ')),
+           ('Objects And Elements - Areas', 'AreaElem', 'ElemJt')),
+}
+
+
+def _connectivity(model, TableKey, name_field, joint_fields):
+    # [names, points of each object] read from a connectivity table in one
+    # call, or None when the table is not available. joint_fields is a tuple
+    # of columns, or the prefix of the numbered joint columns of an area.
+    table = display_table(model, TableKey)
+    if not table or name_field not in table:
+        return None
+    if isinstance(joint_fields, str):
+        numbered = [fld for fld in table if fld.startswith(joint_fields)
+                    and fld[len(joint_fields):].isdigit()]
+        joint_fields = sorted(numbered, key=lambda fld: int(fld[len(joint_fields):]))
+    if not joint_fields or any(fld not in table for fld in joint_fields):
+        return None
+    points = [[pt for pt in row if pt != ''] for row in zip(*(table[fld] for fld in joint_fields))]
+    return [list(table[name_field]), points]
+
+
+class Selection:
+    """
+    A set of objects to extract results for. Pass it to an extraction
+    function (AreaForceShell, JointReact, FrameJtForces, ...) in place of
+    Groups and only these objects are selected before the Results call.
+
+    Variable Definitions:
+      Point, Frame, Area = Names of the selected objects of each type
+
+    Selections can be combined with | (union), & (intersection) and
+    - (difference).
+    """
+
+    def __init__(self, Point=(), Frame=(), Area=()):
+        self.objects = {'Point': list(dict.fromkeys(Point)),
+                        'Frame': list(dict.fromkeys(Frame)),
+                        'Area': list(dict.fromkeys(Area))}
+
+    def names(self, ObjectType):
+        """Return the names of the selected objects of one type."""
+        return self.objects[ObjectType]
+
+    def __len__(self):
+        return sum(len(names) for names in self.objects.values())
+
+    def __iter__(self):
+        # "Type:Name" labels, so a Selection can be keyed like a list of groups
+        for typ in SELECT_TYPES:
+            for nm in self.objects[typ]:
+                yield typ + ':' + nm
+
+    def __eq__(self, other):
+        return isinstance(other, Selection) and all(
+            set(self.objects[typ]) == set(other.objects[typ]) for typ in SELECT_TYPES)
+
+    def _combine(self, other, op):
+        return Selection(**{typ: [nm for nm in dict.fromkeys(self.objects[typ] + other.objects[typ])
+                                  if op(nm in self.objects[typ], nm in other.objects[typ])]
+                            for typ in SELECT_TYPES})
+
+    def __or__(self, other):
+        return self._combine(other, lambda a, b: a or b)
+
+    def __and__(self, other):
+        return self._combine(other, lambda a, b: a and b)
+
+    def __sub__(self, other):
+        return self._combine(other, lambda a, b: a and not b)
+
+    def __repr__(self):
+        return "Selection({0})".format(", ".join(
+            "{0}={1}".format(typ, len(self.objects[typ])) for typ in SELECT_TYPES))
+
+    def select(self, model):
+        """Clear the model's selection and select these objects. The API
+        selects one object per SetSelected call, so the cost grows with the
+        size of the selection; for large regions which are extracted often,
+        assign the objects to a group once and pass the group instead."""
+        ret = model.SelectObj.ClearSelection()
+        for typ in SELECT_TYPES:
+            set_selected = getattr(model, typ + 'Obj').SetSelected
+            for nm in self.objects[typ]:
+                ret = set_selected(nm, True)
+        return ret
+
+
+class PointGrid:
+    """
+    Uniform grid over a set of points for box, radius and nearest queries.
+
+    Variable Definitions:
+      xyz         = (n x 3) point coordinates
+      cell        = Grid cell size (Default chosen for about one point per
+                    cell over the extent of the points)
+    """
+
+    def __init__(self, xyz, cell=None):
+        self.xyz = np.asarray(xyz, dtype=np.float64).reshape(-1, 3)
+        npts = len(self.xyz)
+        self.lo = self.xyz.min(axis=0) if npts else np.zeros(3)
+        span = (self.xyz.max(axis=0) if npts else np.zeros(3)) - self.lo
+        if cell is None:
+            dims = span > 1e-6 * span.max()
+            cell = (np.prod(span[dims]) / max(npts, 1)) ** (1 / dims.sum()) if dims.any() else 1.0
+        self.cell = float(cell)
+        ijk = np.floor((self.xyz - self.lo) / self.cell).astype(np.int64)
+        self.shape = ijk.max(axis=0) + 1 if npts else np.ones(3, dtype=np.int64)
+
+        # Points sorted by cell, with the first sorted point of every cell
+        cell_ids = np.ravel_multi_index(ijk.T, self.shape) if npts else np.empty(0, np.int64)
+        self.order = np.argsort(cell_ids, kind='stable')
+        self.starts = np.searchsorted(cell_ids[self.order], np.arange(np.prod(self.shape) + 1))
+
+    def _candidates(self, lo, hi):
+        # Indices of the points in the grid cells overlapping a box
+        first = np.clip(np.floor((np.asarray(lo) - self.lo) / self.cell).astype(np.int64),
+                        0, self.shape - 1)
+        last = np.clip(np.floor((np.asarray(hi) - self.lo) / self.cell).astype(np.int64),
+                       0, self.shape - 1)
+        if np.any(np.asarray(hi) < self.lo) or np.any(last < first):
+            return np.empty(0, dtype=np.int64)
+        ranges = [np.arange(a, b + 1) for a, b in zip(first, last)]
+        if np.prod([len(r) for r in ranges]) >= len(self.xyz):
+            return np.arange(len(self.xyz))
+        cells = np.ravel_multi_index(np.meshgrid(*ranges, indexing='ij'), self.shape).ravel()
+        starts, ends = self.starts[cells], self.starts[cells + 1]
+        lengths = ends - starts
+        offsets = np.repeat(starts - (np.cumsum(lengths) - lengths), lengths)
+        return self.order[np.arange(lengths.sum()) + offsets]
+
+    def box(self, lo, hi):
+        """Return the indices of the points inside a box."""
+        lo, hi = np.asarray(lo, dtype=np.float64), np.asarray(hi, dtype=np.float64)
+        idx = self._candidates(lo, hi)
+        inside = np.all((self.xyz[idx] >= lo) & (self.xyz[idx] <= hi), axis=1)
+        return np.sort(idx[inside])
+
+    def radius(self, center, r):
+        """Return the indices of the points within a distance of a point."""
+        center = np.asarray(center, dtype=np.float64)
+        idx = self._candidates(center - r, center + r)
+        inside = np.sum((self.xyz[idx] - center)**2, axis=1) <= r * r
+        return np.sort(idx[inside])
+
+    def nearest(self, point, k=1):
+        """Return the indices of the k nearest points, nearest first."""
+        point = np.asarray(point, dtype=np.float64)
+        k = min(k, len(self.xyz))
+        r = self.cell
+        limit = 2 * np.sqrt(np.sum((self.shape * self.cell)**2)) + np.abs(point - self.lo).sum()
+        while True:
+            idx = self.radius(point, r)
+            if len(idx) >= k or r > limit:
+                break
+            r *= 2
+        if len(idx) < k:
+            idx = np.arange(len(self.xyz))
+        dist = np.sum((self.xyz[idx] - point)**2, axis=1)
+        return idx[np.argsort(dist, kind='stable')[:k]]
+
+
+class SpatialIndex:
+    """
+    Point grid and object connectivity of a model.
+
+    Variable Definitions:
+      coords      = PointCoords of the model (see functions.coords)
+      frames      = [names, (n x 2) point rows of the I and J ends]
+      areas       = [names, point rows of all areas end to end, offset of
+                    each area's first point]
+      fingerprint = model_fingerprint() of the model when the index was built
+
+    Query methods return a Selection. Frames and areas are included when
+    any of their points is in the region (contain="any", Default) or only
+    when all of them are (contain="all").
+    """
+
+    def __init__(self, coords, frames, areas, fingerprint=None):
+        self.coords = coords
+        self.grid = PointGrid(coords.xyz)
+        self.frame_names, self.frame_points = frames[0], np.asarray(frames[1], np.int64).reshape(-1, 2)
+        self.area_names, self.area_points, self.area_offsets = areas[0], \
+            np.asarray(areas[1], np.int64), np.asarray(areas[2], np.int64)
+        self.fingerprint = fingerprint
+
+    @classmethod
+    def from_model(cls, model, Units=None, Elements=False):
+        """Read the frame and area connectivity of a model from its
+        connectivity tables, one call per table. When a table is not
+        available each object's points are read with GetPoints instead.
+        When Elements is True the analysis mesh (FrameElm / AreaElm) is read
+        instead of the objects."""
+        coords = point_coords(model, Units)
+        frame_table, area_table = CONNECTIVITY_TABLES[bool(Elements)]
+
+        frame_names, frame_points = _connectivity(model, *frame_table) or [[], None]
+        if frame_points is None:
+            frame_api = model.FrameElm if Elements else model.FrameObj
+            frame_names = list(frame_api.GetNameList()[1])
+            frame_points = [list(frame_api.GetPoints(nm)[:2]) for nm in frame_names]
+
+        area_names, area_points = _connectivity(model, *area_table) or [[], None]
+        if area_points is None:
+            area_api = model.AreaElm if Elements else model.AreaObj
+            area_names = list(area_api.GetNameList()[1])
+            area_points = [list(area_api.GetPoints(nm)[1]) for nm in area_names]
+        coords.add_points(model, [pt for points in frame_points + area_points for pt in points])
+
+        def rows(points):
+            return [coords.index[pt] for pt in points]
+
+        area_offsets = np.cumsum([0] + [len(points) for points in area_points])[:-1]
+        return cls(coords, [frame_names, [row for points in frame_points for row in rows(points)]],
+                   [area_names, [row for points in area_points for row in rows(points)],
+                    area_offsets], model_fingerprint(model))
+
+    def _selection(self, rows, contain='any'):
+        # Selection of the points at rows and the objects connected to them
+        mask = np.zeros(len(self.coords.names), dtype=bool)
+        mask[rows] = True
+        if contain not in ('any', 'all'):
+            raise ValueError("contain must be 'any' or 'all'.")
+        reduce = np.logical_or if contain == 'any' else np.logical_and
+
+        frames = reduce(mask[self.frame_points[:, 0]], mask[self.frame_points[:, 1]]) \
+            if len(self.frame_points) else np.empty(0, dtype=bool)
+        if len(self.area_offsets):
+            counts = np.add.reduceat(mask[self.area_points].astype(np.int64), self.area_offsets)
+            sizes = np.diff(np.append(self.area_offsets, len(self.area_points)))
+            areas = counts > 0 if contain == 'any' else counts == sizes
+        else:
+            areas = np.empty(0, dtype=bool)
+
+        return Selection(Point=[self.coords.names[k] for k in rows],
+                         Frame=[nm for nm, sel in zip(self.frame_names, frames) if sel],
+                         Area=[nm for nm, sel in zip(self.area_names, areas) if sel])
+
+    def box(self, lo, hi, contain='any'):
+        """Select the objects in the box between corners lo and hi (X, Y, Z)."""
+        return self._selection(self.grid.box(lo, hi), contain)
+
+    def radius(self, center, r, contain='any'):
+        """Select the objects within a distance r of a point (X, Y, Z)."""
+        return self._selection(self.grid.radius(center, r), contain)
+
+    def nearest(self, point, k=1):
+        """Select the k points nearest to a point (X, Y, Z)."""
+        rows = self.grid.nearest(point, k)
+        return Selection(Point=[self.coords.names[row] for row in rows])
+
+
+def spatial_index(model, Units=None, Elements=False):
+    """
+    This function returns the SpatialIndex of a model. The index is kept
+    between calls and rebuilt when the model file changes.
+
+    Variable Definitions:
+      model       = SAP Model object
+      Units       = Units of the coordinates (Default present units)
+      Elements    = Index the analysis mesh elements instead of the objects.
+                    Used for mesh geometry (e.g. section cuts), selections
+                    from an element index can not replace Groups.
+
+    Example:
+      deck = spatial_index(model).box((0, 0, -1), (120, 30, 1), contain='all')
+      AreaForceShell(model, LoadCases, deck)
+    """
+    fingerprint = model_fingerprint(model)
+    key = (model_key(model, fingerprint), Units, Elements)
+    index = _spatial_cache.get(key)
+    if index is None or index.fingerprint != fingerprint:
+        index = SpatialIndex.from_model(model, Units, Elements)
+        _spatial_cache[key] = index
+    return index
@@ -0,0 +1,201 @@
+## Out-of-Core Result Store
+# This module keeps extracted results on disk for analyses whose step-by-step
+# results do not fit in memory. Tables are appended chunk by chunk into
+# partitions by load case and step range. Each chunk is written once as a
+# (fields x rows) float64 block and read back as a memory map, so the
+# averaging, envelope and Wood-Armer routines work on views of the files.
+
+from .results import ResultTable, CodedColumn, POOL
+
+import json
+import os
+
+import numpy as np
+
+# Name of the index file of a store
+INDEX_FILE = 'store.json'
+
+
+class ResultStore:
+    """
+    Append-only on-disk store of ResultTables.
+
+    Variable Definitions:
+      directory        = Folder holding the store, created when missing
+      StepsPerPartition = Number of consecutive step numbers kept in one
+                         partition of a load case (Default 1000)
+
+    A store holds any number of datasets (e.g. one per output function),
+    each with the fields of the first table written to it. Rows of a
+    dataset are partitioned by load case and by StepNum // StepsPerPartition.
+    String fields are kept as int32 codes into a list of names shared by the
+    store and the NumberResults and ret outputs are not stored. Chunk files
+    are written before the index, so an interrupted write leaves the store
+    as it was.
+
+    Example:
+      store = ResultStore('th_results')
+      store.write(AreaForceShellIter(model, cases, groups, NLStatic=2), 'shells')
+      env = Envelope(['M11', 'M22', 'M12'], derive=wood_armer_fields())
+      for chunk in store.chunks('shells'):
+          env.add(chunk)
+    """
+
+    def __init__(self, directory, StepsPerPartition=1000):
+        self.directory = directory
+        self.StepsPerPartition = StepsPerPartition
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, INDEX_FILE)
+        if os.path.exists(path):
+            with open(path) as file:
+                self.index = json.load(file)
+        else:
+            self.index = {'names': [], 'datasets': {}}
+        self._codes = {nm: code for code, nm in enumerate(self.index['names'])}
+
+    def _save_index(self):
+        path = os.path.join(self.directory, INDEX_FILE)
+        with open(path + '.tmp', 'w') as file:
+            json.dump(self.index, file)
+        os.replace(path + '.tmp', path)
+
+    def _encode(self, col):
+        # Store codes of a CodedColumn, adding new names to the store
+        uniq, local = np.unique(col.codes, return_inverse=True)
+        names = col.pool.decode(uniq).tolist()
+        for nm in names:
+            if nm not in self._codes:
+                self._codes[nm] = len(self.index['names'])
+                self.index['names'].append(nm)
+        return np.array([self._codes[nm] for nm in names], dtype=np.int32)[local.ravel()]
+
+    def datasets(self):
+        """Return the names of the datasets in the store."""
+        return list(self.index['datasets'])
+
+    def write(self, tables, dataset):
+        """
+        Append tables to a dataset. tables may be one ResultTable or an
+        iterable of them (e.g. AreaForceShellIter), which is consumed one
+        table at a time. Returns the number of rows written.
+        """
+        if isinstance(tables, ResultTable):
+            tables = [tables]
+        nrows = 0
+        for table in tables:
+            nrows += self._append(table, dataset)
+        return nrows
+
+    def _append(self, table, dataset):
+        if table.nrows == 0:
+            return 0
+        meta = self.index['datasets'].get(dataset)
+        if meta is None:
+            fields = [[fldnm, 'string' if isinstance(col, CodedColumn) else
+                       'numeric' if isinstance(col, np.ndarray) else 'scalar']
+                      for fldnm, col in table.items() if fldnm not in ('NumberResults', 'ret')]
+            meta = self.index['datasets'][dataset] = {'fields': fields, 'Units': table.Units,
+                                                      'partitions': {}}
+            os.makedirs(os.path.join(self.directory, dataset), exist_ok=True)
+        elif meta['Units'] != table.Units:
+            raise ValueError("Dataset '{0}' is stored in units {1}, not {2}.".format(
+                dataset, meta['Units'], table.Units))
+
+        numeric = [fldnm for fldnm, kind in meta['fields'] if kind == 'numeric']
+        strings = [fldnm for fldnm, kind in meta['fields'] if kind == 'string']
+        scalars = {fldnm: meta.get('scalars', {}).get(fldnm)
+                   for fldnm, kind in meta['fields'] if kind == 'scalar'}
+        block = table.to_numpy(numeric) if numeric else np.empty((0, table.nrows))
+        codes = np.stack([self._encode(table[fldnm]) for fldnm in strings]) if strings \
+            else np.empty((0, table.nrows), dtype=np.int32)
+
+        # Partition ids: load case, then step range
+        cases = codes[strings.index('LoadCase')] if 'LoadCase' in strings \
+            else np.zeros(table.nrows, dtype=np.int32)
+        steps = np.asarray(table['StepNum']) if 'StepNum' in numeric else np.zeros(table.nrows)
+        ranges = np.floor(steps / self.StepsPerPartition).astype(np.int64)
+        keys, part_ids = np.unique(np.column_stack([cases, ranges]), axis=0, return_inverse=True)
+        part_ids = part_ids.ravel()
+
+        for k, (case, step_range) in enumerate(keys.tolist()):
+            rows = np.nonzero(part_ids == k)[0]
+            name = '{0}_{1}'.format(case, step_range)
+            part = meta['partitions'].setdefault(name, {
+                'LoadCase': self.index['names'][case] if 'LoadCase' in strings else '',
+                'Steps': [step_range * self.StepsPerPartition,
+                          (step_range + 1) * self.StepsPerPartition - 1],
+                'chunks': []})
+            chunk = '{0}_{1}'.format(name, len(part['chunks']))
+            base = os.path.join(self.directory, dataset, chunk)
+            np.save(base + '.npy', np.ascontiguousarray(block[:, rows]))
+            np.save(base + '.codes.npy', np.ascontiguousarray(codes[:, rows]))
+            part['chunks'].append([chunk, len(rows)])
+
+        # Scalars (numpy or Python) are kept in the index as Python values
+        meta.setdefault('scalars', {}).update(
+            {fldnm: np.asarray(table[fldnm]).item() for fldnm, kind in meta['fields']
+             if kind == 'scalar' and fldnm in table and np.ndim(table[fldnm]) == 0})
+        self._save_index()
+        return table.nrows
+
+    def partitions(self, dataset, LoadCases=None, Steps=None):
+        """Return [load case, (first step, last step), rows] of the
+        partitions of a dataset which may hold the given cases and steps."""
+        meta = self.index['datasets'][dataset]
+        if isinstance(LoadCases, str):
+            LoadCases = [LoadCases]
+        parts = []
+        for part in meta['partitions'].values():
+            if LoadCases is not None and part['LoadCase'] not in LoadCases:
+                continue
+            first, last = part['Steps']
+            if Steps is not None and (last < Steps[0] or first > Steps[1]):
+                continue
+            parts.append([part['LoadCase'], (first, last), sum(n for _, n in part['chunks'])])
+        return parts
+
+    def chunks(self, dataset, LoadCases=None, Steps=None):
+        """
+        Yield the stored chunks of a dataset as ResultTables whose numeric
+        fields are read-only views of memory mapped files.
+
+        Variable Definitions:
+          dataset     = Name of the dataset
+          LoadCases   = Only yield these load cases (Default all)
+          Steps       = Optional (first, last) range of StepNum values to
+                        keep, inclusive. Chunks in partitions outside the
+                        range are not opened, rows of partially covered
+                        chunks are selected (and copied).
+        """
+        meta = self.index['datasets'][dataset]
+        if isinstance(LoadCases, str):
+            LoadCases = [LoadCases]
+        fields = [fldnm for fldnm, kind in meta['fields']]
+        strings = [fldnm for fldnm, kind in meta['fields'] if kind == 'string']
+        scalars = {fldnm: meta.get('scalars', {}).get(fldnm)
+                   for fldnm, kind in meta['fields'] if kind == 'scalar'}
+        names = self.index['names']
+        to_pool = POOL.encode(names) if names else np.empty(0, dtype=np.int32)
+
+        for part in meta['partitions'].values():
+            first, last = part['Steps']
+            if LoadCases is not None and part['LoadCase'] not in LoadCases:
+                continue
+            if Steps is not None and (last < Steps[0] or first > Steps[1]):
+                continue
+            for chunk, nrows in part['chunks']:
+                base = os.path.join(self.directory, dataset, chunk)
+                block = np.load(base + '.npy', mmap_mode='r')
+                codes = np.load(base + '.codes.npy')
+                columns = {fldnm: CodedColumn(to_pool[codes[k]]) for k, fldnm in enumerate(strings)}
+                columns.update(scalars)
+                table = ResultTable.from_block(fields, block, columns, Units=meta['Units'])
+                if Steps is not None and 'StepNum' in table and \
+                        (first < Steps[0] or last > Steps[1]):
+                    table = table.take((table['StepNum'] >= Steps[0]) &
+                                       (table['StepNum'] <= Steps[1]))
+                yield table
+
+    def read(self, dataset, LoadCases=None, Steps=None):
+        """Return the selected rows of a dataset as one in-memory ResultTable."""
+        return ResultTable.concat(list(self.chunks(dataset, LoadCases, Steps)))
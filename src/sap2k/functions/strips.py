@@ -0,0 +1,270 @@
+## Section Cuts and Design Strips
+# This module integrates shell forces along cut lines across a deck. The
+# geometry of each cut (the elements it crosses, the Gauss points along it and
+# the shape function weights of each element node) is computed once per mesh
+# as a sparse set of weights, so every load case, combination and step is
+# integrated in one vectorized pass over the result rows.
+
+from .spatial import spatial_index
+from .averaging import as_table, LocationIndex
+from .results import ResultTable, CodedColumn, POOL
+
+import math
+
+import numpy as np
+
+# Shell force fields integrated by default
+CUT_FIELDS = ('F11', 'F22', 'F12', 'M11', 'M22', 'M12', 'V13', 'V23')
+
+# Dimensions of the integrated fields as (force exponent, length exponent),
+# for functions.units.convert_units
+CUT_DIMENSIONS = dict({fldnm: (1, 0) for fldnm in ('F11', 'F22', 'F12', 'V13', 'V23', 'Fn', 'Vn')},
+                      **{fldnm: (1, 1) for fldnm in ('M11', 'M22', 'M12', 'Mn')})
+
+# Gauss-Legendre points and weights on [-1, 1]
+GAUSS = {1: ([0.0], [2.0]),
+         2: ([-1 / math.sqrt(3), 1 / math.sqrt(3)], [1.0, 1.0]),
+         3: ([-math.sqrt(0.6), 0.0, math.sqrt(0.6)], [5 / 9, 8 / 9, 5 / 9])}
+
+
+def strip_cuts(name, start, end, width, spacing=None, stations=None):
+    """
+    This function returns the cut lines across a design strip.
+
+    Variable Definitions:
+      name        = Strip name. Cuts are named "<name>_<n>".
+      start, end  = (X, Y) of the ends of the strip centerline
+      width       = Strip width, the length of each cut
+      spacing     = Maximum distance between cuts along the strip. The
+                    cuts are spread evenly from start to end, so the actual
+                    spacing is length / ceil(length / spacing).
+      stations    = Distances of the cuts from start, in place of spacing
+      Returns     = List of (cut name, (X, Y) start, (X, Y) end)
+
+    One of spacing or stations must be given.
+    """
+    if spacing is None and stations is None:
+        raise ValueError("strip_cuts needs either spacing or stations.")
+    start = np.asarray(start[:2], dtype=np.float64)
+    end = np.asarray(end[:2], dtype=np.float64)
+    length = np.hypot(*(end - start))
+    axis = (end - start) / length
+    normal = np.array([-axis[1], axis[0]])
+    if stations is None:
+        stations = np.linspace(0, length, max(int(math.ceil(length / spacing)), 1) + 1)
+
+    cuts = []
+    for k, station in enumerate(stations):
+        center = start + axis * station
+        cuts.append(("{0}_{1}".format(name, k + 1), tuple((center - normal * width / 2).tolist()),
+                     tuple((center + normal * width / 2).tolist())))
+    return cuts
+
+
+def _clip(p0, p1, poly, tol):
+    # Parameter range [t0, t1] of the segment p0-p1 inside a convex polygon,
+    # and whether the segment runs along one of its edges
+    d = p1 - p0
+    x, y = poly[:, 0], poly[:, 1]
+    sign = 1.0 if np.dot(x, np.roll(y, -1)) - np.dot(np.roll(x, -1), y) >= 0 else -1.0
+    t0, t1, on_edge = 0.0, 1.0, False
+    for a, b in zip(poly, np.roll(poly, -1, axis=0)):
+        inward = sign * np.array([a[1] - b[1], b[0] - a[0]])
+        inward /= np.hypot(*inward)
+        num = np.dot(inward, p0 - a)
+        den = np.dot(inward, d)
+        if abs(den) <= tol * 1e-3:
+            if num < -tol:
+                return None
+            on_edge = on_edge or abs(num) <= tol
+            continue
+        t = -num / den
+        if den > 0:
+            t0 = max(t0, t)
+        else:
+            t1 = min(t1, t)
+    return (t0, t1, on_edge) if t1 > t0 else None
+
+
+def _shape_weights(poly, point):
+    # Shape function values of a 3 or 4 node element at a point in its plane
+    if len(poly) == 3:
+        mat = np.vstack([poly.T, np.ones(3)])
+        return np.linalg.solve(mat, np.append(point, 1.0))
+    if len(poly) != 4:
+        raise ValueError("Section cuts support 3 and 4 node shell elements only.")
+    xi = eta = 0.0
+    for _ in range(25):
+        N = 0.25 * np.array([(1 - xi) * (1 - eta), (1 + xi) * (1 - eta),
+                             (1 + xi) * (1 + eta), (1 - xi) * (1 + eta)])
+        dN = 0.25 * np.array([[-(1 - eta), (1 - eta), (1 + eta), -(1 + eta)],
+                              [-(1 - xi), -(1 + xi), (1 + xi), (1 - xi)]])
+        step = np.linalg.solve(dN @ poly, point - N @ poly)
+        xi, eta = xi + step[0], eta + step[1]
+        if abs(step).max() < 1e-12:
+            break
+    return 0.25 * np.array([(1 - xi) * (1 - eta), (1 + xi) * (1 - eta),
+                            (1 + xi) * (1 + eta), (1 - xi) * (1 + eta)])
+
+
+class SectionCuts:
+    """
+    Integration weights of a set of cut lines over a shell mesh.
+
+    Variable Definitions:
+      index       = SpatialIndex of the analysis mesh (spatial_index(model,
+                    Units, Elements=True))
+      cuts        = List of (cut name, (X, Y) start, (X, Y) end) in plan, e.g.
+                    from strip_cuts()
+      gauss       = Gauss points per element crossed (1 to 3, Default 2)
+
+    Cuts are taken in the global XY plane and elements are assumed to be
+    flat with local axes 1 and 2 along global X and Y, the default for
+    horizontal areas. A cut along an element edge is shared equally by the
+    elements on both sides.
+
+    The geometry does not depend on the results, build it once per mesh and
+    call integrate() for each set of results.
+    """
+
+    def __init__(self, index, cuts, gauss=2):
+        self.names = [str(cut[0]) for cut in cuts]
+        self.start = np.array([cut[1][:2] for cut in cuts], dtype=np.float64).reshape(-1, 2)
+        self.end = np.array([cut[2][:2] for cut in cuts], dtype=np.float64).reshape(-1, 2)
+        direction = self.end - self.start
+        self.normal = np.column_stack([-direction[:, 1], direction[:, 0]]) / \
+            np.hypot(direction[:, 0], direction[:, 1])[:, None]
+
+        xy = index.coords.xyz[:, :2]
+        nodes, offsets = index.area_points, index.area_offsets
+        if len(offsets):
+            lower = np.minimum.reduceat(xy[nodes], offsets)
+            upper = np.maximum.reduceat(xy[nodes], offsets)
+        else:
+            lower = upper = np.empty((0, 2))
+        bounds = np.append(offsets, len(nodes))
+        tol = 1e-9 * max(np.abs(xy).max(initial=0.0), 1.0)
+        points, weights = GAUSS[gauss]
+
+        cut_ids, elm_names, pt_names, entry_weights = [], [], [], []
+        self.length = np.zeros(len(cuts))
+        for c, (p0, p1) in enumerate(zip(self.start, self.end)):
+            lo, hi = np.minimum(p0, p1) - tol, np.maximum(p0, p1) + tol
+            crossed = np.nonzero(np.all(upper >= lo, axis=1) & np.all(lower <= hi, axis=1))[0]
+            pieces = []
+            for a in crossed:
+                clipped = _clip(p0, p1, xy[nodes[bounds[a]:bounds[a + 1]]], tol)
+                if clipped is not None:
+                    pieces.append((a,) + clipped)
+
+            # Pieces along an element edge are shared by the elements there
+            shared = {}
+            for a, t0, t1, on_edge in pieces:
+                if on_edge:
+                    span = (round(t0 * 1e9), round(t1 * 1e9))
+                    shared[span] = shared.get(span, 0) + 1
+
+            for a, t0, t1, on_edge in pieces:
+                elm_nodes = nodes[bounds[a]:bounds[a + 1]]
+                poly = xy[elm_nodes]
+                share = shared[(round(t0 * 1e9), round(t1 * 1e9))] if on_edge else 1
+                seg = np.hypot(*(p1 - p0)) * (t1 - t0) / share
+                self.length[c] += seg
+                for gp, gw in zip(points, weights):
+                    t = t0 + (t1 - t0) * (gp + 1) / 2
+                    shape = _shape_weights(poly, p0 + (p1 - p0) * t)
+                    cut_ids += [c] * len(elm_nodes)
+                    elm_names += [index.area_names[a]] * len(elm_nodes)
+                    pt_names += [index.coords.names[k] for k in elm_nodes]
+                    entry_weights += list(shape * gw * seg / 2)
+
+        # Sparse weights grouped by (element, joint) location key
+        keys = self._keys(POOL.encode(elm_names), POOL.encode(pt_names))
+        cut_ids = np.asarray(cut_ids, dtype=np.int64)
+        pair, inverse = np.unique(keys * len(cuts) + cut_ids, return_inverse=True)
+        self._entry_weight = np.bincount(inverse.ravel(), weights=entry_weights,
+                                         minlength=len(pair))
+        self._entry_cut = pair % max(len(cuts), 1)
+        pair_keys = pair // max(len(cuts), 1)
+        self._loc_keys, starts = np.unique(pair_keys, return_index=True)
+        self._loc_ptr = np.append(starts, len(pair_keys))
+
+    @staticmethod
+    def _keys(elm_codes, pt_codes):
+        return np.asarray(elm_codes, dtype=np.int64) << 32 | np.asarray(pt_codes, dtype=np.int64)
+
+    @classmethod
+    def from_model(cls, model, cuts, Units=None, gauss=2):
+        """Build the cut geometry from the model's analysis mesh. Units must
+        match the units the cut coordinates are given in."""
+        return cls(spatial_index(model, Units, Elements=True), cuts, gauss)
+
+    def integrate(self, RawResults, fields=None):
+        """
+        This function integrates shell forces along every cut for every load
+        case and step in the results.
+
+        Variable Definitions:
+          RawResults  = AreaForceShell ResultTable, or an iterable of tables
+                        (e.g. AreaForceShellIter) which is consumed chunk by
+                        chunk
+          fields      = Fields to integrate (Default CUT_FIELDS)
+          Returns     = ResultTable with one row per cut and step: Cut,
+                        LoadCase, StepType, StepNum, Length (length of the cut
+                        over the mesh), the integrated fields and, when their
+                        components are present, Fn, Mn and Vn, the force,
+                        moment and shear acting normal to the cut. Convert
+                        its units with dims=CUT_DIMENSIONS.
+        """
+        chunks = [RawResults] if isinstance(RawResults, (ResultTable, dict)) else RawResults
+        fields = list(CUT_FIELDS if fields is None else fields)
+        ncut = len(self.names)
+        steps = LocationIndex(['LoadCase', 'StepType', 'StepNum'])
+        sums = np.zeros((len(fields), 0))
+        first_row, nrows = np.empty(0, dtype=np.int64), 0
+
+        for chunk in chunks:
+            table = as_table(chunk)
+            if table.nrows == 0:
+                continue
+            step_ids = steps.add(table)
+            first_row = np.append(first_row, np.full(len(steps) - len(first_row), nrows + table.nrows))
+            np.minimum.at(first_row, step_ids, nrows + np.arange(table.nrows))
+            nrows += table.nrows
+
+            # Rows at (element, joint) locations used by a cut
+            keys = self._keys(table.codes('Elm'), table.codes('PointElm'))
+            pos = np.minimum(np.searchsorted(self._loc_keys, keys), max(len(self._loc_keys) - 1, 0))
+            rows = np.nonzero(self._loc_keys[pos] == keys)[0] if len(self._loc_keys) else \
+                np.empty(0, dtype=np.int64)
+            starts, ends = self._loc_ptr[pos[rows]], self._loc_ptr[pos[rows] + 1]
+            counts = ends - starts
+            entries = np.arange(counts.sum()) + np.repeat(starts - (np.cumsum(counts) - counts), counts)
+            rows = np.repeat(rows, counts)
+
+            size = len(steps) * ncut
+            sums = np.hstack([sums, np.zeros((len(fields), size - sums.shape[1]))])
+            target = step_ids[rows] * ncut + self._entry_cut[entries]
+            weight = self._entry_weight[entries]
+            for k, fldnm in enumerate(fields):
+                sums[k] += np.bincount(target, weights=table[fldnm][rows] * weight, minlength=size)
+
+        # Steps in the order they appear in the results
+        nstep = len(steps)
+        order = np.argsort(first_row, kind='stable')
+        columns = {'Cut': CodedColumn(np.tile(POOL.encode(self.names), nstep))}
+        for fldnm, col in steps.columns().items():
+            columns[fldnm] = col[np.repeat(order, ncut)]
+        columns['Length'] = np.tile(self.length, nstep)
+        for k, fldnm in enumerate(fields):
+            columns[fldnm] = sums[k].reshape(nstep, ncut)[order].ravel()
+
+        # Resultants normal to each cut
+        nx, ny = np.tile(self.normal[:, 0], nstep), np.tile(self.normal[:, 1], nstep)
+        for out, (c11, c22, c12) in (('Fn', ('F11', 'F22', 'F12')), ('Mn', ('M11', 'M22', 'M12'))):
+            if all(fldnm in columns for fldnm in (c11, c22, c12)):
+                columns[out] = columns[c11] * nx**2 + columns[c22] * ny**2 + \
+                    2 * columns[c12] * nx * ny
+        if 'V13' in columns and 'V23' in columns:
+            columns['Vn'] = columns['V13'] * nx + columns['V23'] * ny
+        return ResultTable(columns, Units=steps.Units)
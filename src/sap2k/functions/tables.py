@@ -0,0 +1,260 @@
+## Database Table Extraction Backend
+# This module extracts results through the DatabaseTables interface, which
+# returns a whole table as one flat array of strings, as an alternative to the
+# per-object Results calls. The tables are parsed into ResultTables with the
+# same field names as the Results methods. Timings of both backends are kept
+# so that the faster one can be chosen for the expected result size. Table
+# values are rounded to their display precision, so both backends are opt-in
+# (Backend="tables" or "auto"); the output functions use the Results methods
+# by default.
+
+from .helpers import unit_code
+from .results import ResultTable
+from .averaging import factorize
+
+import time
+
+import numpy as np
+
+# Database table and column holding each field of the Results methods
+TABLE_FIELDS = {
+    'AreaForceShell': ('Element Forces - Area Shells',
+                       {'Obj': 'Area', 'Elm': 'AreaElem', 'PointElm': 'Joint',
+                        'LoadCase': 'OutputCase', 'StepType': 'StepType', 'StepNum': 'StepNum',
+                        'F11': 'F11', 'F22': 'F22', 'F12': 'F12', 'FMax': 'FMax', 'FMin': 'FMin',
+                        'FAngle': 'FAngle', 'FVM': 'FVM', 'M11': 'M11', 'M22': 'M22',
+                        'M12': 'M12', 'MMax': 'MMax', 'MMin': 'MMin', 'MAngle': 'MAngle',
+                        'V13': 'V13', 'V23': 'V23', 'VMax': 'VMax', 'VAngle': 'VAngle'}),
+    'FrameForce': ('Element Forces - Frames',
+                   {'Obj': 'Frame', 'ObjSta': 'Station', 'Elm': 'FrameElem',
+                    'ElmSta': 'ElemStation', 'LoadCase': 'OutputCase', 'StepType': 'StepType',
+                    'StepNum': 'StepNum', 'P': 'P', 'V2': 'V2', 'V3': 'V3', 'T': 'T',
+                    'M2': 'M2', 'M3': 'M3'}),
+    'FrameJointForce': ('Element Joint Forces - Frames',
+                        {'Obj': 'Frame', 'Elm': 'FrameElem', 'PointElm': 'Joint',
+                         'LoadCase': 'OutputCase', 'StepType': 'StepType', 'StepNum': 'StepNum',
+                         'F1': 'F1', 'F2': 'F2', 'F3': 'F3', 'M1': 'M1', 'M2': 'M2', 'M3': 'M3'}),
+    'JointReact': ('Joint Reactions',
+                   {'Obj': 'Joint', 'Elm': 'Joint', 'LoadCase': 'OutputCase',
+                    'StepType': 'StepType', 'StepNum': 'StepNum', 'F1': 'F1', 'F2': 'F2',
+                    'F3': 'F3', 'M1': 'M1', 'M2': 'M2', 'M3': 'M3'}),
+    'BaseReact': ('Base Reactions',
+                  {'LoadCase': 'OutputCase', 'StepType': 'StepType', 'StepNum': 'StepNum',
+                   'Fx': 'GlobalFX', 'Fy': 'GlobalFY', 'Fz': 'GlobalFZ',
+                   'Mx': 'GlobalMX', 'My': 'GlobalMY', 'Mz': 'GlobalMZ',
+                   'gx': 'GlobalX', 'gy': 'GlobalY', 'gz': 'GlobalZ'}),
+}
+
+# Object type reported in the Obj field of each method
+OBJECT_TYPE = {'AreaForceShell': 'Area', 'FrameForce': 'Frame', 'FrameJointForce': 'Frame',
+               'JointReact': 'Point'}
+
+# Extraction backends
+BACKENDS = ('results', 'tables')
+
+# Fields of each method which hold names rather than numbers
+_TEXT_FIELDS = {'Obj', 'Elm', 'PointElm', 'LoadCase', 'StepType'}
+
+# Observed [rows, seconds] per (method, backend), newest last
+_timings = {}
+
+# Rows returned per load case by the last extraction of (method, groups)
+_rows_per_case = {}
+
+
+def display_table(model, TableKey, GroupName='All'):
+    """Return the columns of a database table as {column: list of strings},
+    read in one call, or None when the table is not available."""
+    output = model.DatabaseTables.GetTableForDisplayArray(TableKey, [], GroupName)
+    # Trailing outputs: FieldsKeysIncluded, NumberRecords, TableData, ret
+    fields, nrecords, data, ret = output[-4:]
+    if ret != 0:
+        return None
+    fields = list(fields)
+    records = np.asarray(data, dtype=object).reshape(nrecords, len(fields))
+    return {fld: records[:, k].tolist() for k, fld in enumerate(fields)}
+
+
+def parse_table(FldNms, fields, data, column_map, Units=None):
+    """
+    This function converts the flat string array returned by
+    GetTableForDisplayArray into a ResultTable.
+
+    Variable Definitions:
+      FldNms      = Field names of the equivalent Results method
+      fields      = Column names of the table (FieldsKeysIncluded)
+      data        = Flat table data, one record after another
+      column_map  = {field name: table column} (see TABLE_FIELDS)
+    """
+    fields = list(fields)
+    nrows = len(data) // len(fields) if fields else 0
+    records = np.asarray(data, dtype=object).reshape(nrows, len(fields))
+
+    columns = {}
+    for fldnm in FldNms:
+        column = column_map.get(fldnm)
+        if fldnm in ('NumberResults', 'ret'):
+            columns[fldnm] = nrows if fldnm == 'NumberResults' else 0
+        elif fldnm in ('gx', 'gy', 'gz'):
+            col = records[:, fields.index(column)] if column in fields else []
+            columns[fldnm] = float(col[0]) if len(col) and col[0] != '' else 0.0
+        elif fldnm in _TEXT_FIELDS:
+            if column in fields:
+                columns[fldnm] = list(records[:, fields.index(column)])
+            else:
+                columns[fldnm] = [''] * nrows
+        else:
+            if column in fields:
+                col = records[:, fields.index(column)].astype(str)
+                columns[fldnm] = np.where(col == '', 'nan', col).astype(np.float64)
+            else:
+                columns[fldnm] = np.zeros(nrows) if fldnm == 'StepNum' else np.full(nrows, np.nan)
+    return ResultTable(columns, Units=Units)
+
+
+def extract_table(model, method, FldNms, LoadCases, Groups=None, Units=4, NLStatic=1,
+                  MSStatic=1, MVCombo=1):
+    """
+    Database table version of helpers.extract_results. The equivalent table
+    of the Results method is read for each group in one call and parsed
+    into a ResultTable with the Results field names.
+
+    Rows of objects in more than one of the groups are only kept once, as
+    with the selection used by the Results backend.
+
+    Table values are returned as text at the display precision of the
+    model's table formatting, not at the full double precision of the
+    Results methods, and the OAPI has no option to change this. Use
+    Backend="results" where the extra digits matter.
+    """
+    table_key, column_map = TABLE_FIELDS[method]
+    tables = model.DatabaseTables
+
+    model.SetPresentUnits(unit_code(Units))
+    if not hasattr(LoadCases, '__iter__') or isinstance(LoadCases, str):
+        LoadCases = [LoadCases]
+    combos = set(model.RespCombo.GetNameList()[1])
+    tables.SetLoadCasesSelectedForDisplay([nm for nm in LoadCases if nm not in combos])
+    tables.SetLoadCombinationsSelectedForDisplay([nm for nm in LoadCases if nm in combos])
+    # Base reaction point, modes, multi-step static, nonlinear static, modal
+    # and direct history, combinations, steady state and PSD options. The
+    # history options are those of the Results methods (see
+    # helpers.result_setup), so both backends return the same steps.
+    ModalHist = model.Results.Setup.GetOptionModalHist()[0]
+    DirectHist = model.Results.Setup.GetOptionDirectHist()[0]
+    tables.SetTableOutputOptionsForDisplay(0.0, 0.0, 0.0, True, 1, 1, True, 1, 1,
+                                           MSStatic, NLStatic, ModalHist, DirectHist, MVCombo,
+                                           1, 1, 1, 1)
+
+    # A spatial Selection is read from the whole table and filtered
+    from .spatial import Selection
+    selection = Groups if isinstance(Groups, Selection) else None
+    if selection is not None:
+        Groups = None
+
+    parts = []
+    for grp in (["All"] if Groups is None else Groups):
+        output = tables.GetTableForDisplayArray(table_key, [], grp)
+        # Trailing outputs: FieldsKeysIncluded, NumberRecords, TableData, ret
+        fields, data = output[-4], output[-2]
+        parts.append(parse_table(FldNms, fields, data, column_map, Units=unit_code(Units)))
+    table = ResultTable.concat(parts) if len(parts) > 1 else parts[0]
+
+    if len(parts) > 1:
+        # Drop repeated rows of objects in several groups
+        keys = [fldnm for fldnm in FldNms
+                if fldnm in _TEXT_FIELDS or fldnm in ('StepNum', 'ObjSta', 'ElmSta')]
+        first_rows = np.sort(factorize(table, keys)[1])
+        if len(first_rows) < table.nrows:
+            table = table.take(first_rows)
+    if selection is not None and method in OBJECT_TYPE:
+        table = table.take(table['Obj'].isin(selection.names(OBJECT_TYPE[method])))
+    return table
+
+
+def record_timing(method, backend, rows, seconds, keep=20):
+    """Record the time taken by one extraction."""
+    obs = _timings.setdefault((method, backend), [])
+    obs.append([rows, seconds])
+    del obs[:-keep]
+
+
+def predict_time(method, backend, rows):
+    """
+    Predict the time an extraction of a number of rows takes with a backend
+    from the recorded timings, fitting a fixed cost plus a cost per row.
+    Returns None when the backend has not been timed.
+    """
+    obs = _timings.get((method, backend))
+    if not obs:
+        return None
+    obs = np.asarray(obs, dtype=np.float64)
+    if len(np.unique(obs[:, 0])) > 1:
+        per_row, fixed = np.polyfit(obs[:, 0], obs[:, 1], 1)
+        per_row, fixed = max(per_row, 0.0), max(fixed, 0.0)
+    else:
+        per_row, fixed = obs[:, 1].mean() / max(obs[:, 0].mean(), 1.0), 0.0
+    return fixed + per_row * rows
+
+
+def choose_backend(method, Groups, LoadCases):
+    """
+    Return the backend predicted to be faster for an extraction. Each
+    backend which has not been timed for the method yet is used once, in
+    the order of BACKENDS, so the first two extractions of a method time
+    both backends. After that the result size is estimated from the
+    previous extraction of the same groups and the faster backend is
+    chosen (see also benchmark_backends).
+    """
+    for backend in BACKENDS:
+        if not _timings.get((method, backend)):
+            return backend
+    ncases = 1 if isinstance(LoadCases, str) or not hasattr(LoadCases, '__iter__') \
+        else len(LoadCases)
+    per_case = _rows_per_case.get((method, _group_key(Groups)))
+    if per_case is None:
+        return 'results'
+    times = {backend: predict_time(method, backend, per_case * ncases) for backend in BACKENDS}
+    if None in times.values():
+        return 'results'
+    return min(BACKENDS, key=lambda backend: times[backend])
+
+
+def _group_key(Groups):
+    return None if Groups is None else tuple(sorted(Groups))
+
+
+def timed_extract(method, LoadCases, Groups, backend, extract):
+    """Run one extraction, a function returning a ResultTable, and record its
+    timing against the backend used."""
+    start = time.perf_counter()
+    table = extract()
+    seconds = time.perf_counter() - start
+
+    ncases = 1 if isinstance(LoadCases, str) or not hasattr(LoadCases, '__iter__') \
+        else max(len(LoadCases), 1)
+    record_timing(method, backend, table.nrows, seconds)
+    _rows_per_case[(method, _group_key(Groups))] = table.nrows / ncases
+    return table
+
+
+def benchmark_backends(func, model, *args, repeat=1, **kwargs):
+    """
+    Time an output function with both backends so that Backend="auto" can
+    choose between them. Returns {backend: seconds per call}.
+
+    Variable Definitions:
+      func        = Output function with a Backend argument (e.g. AreaForceShell)
+      repeat      = Number of calls per backend
+      args/kwargs = Arguments of func after the model
+
+    Example:
+      benchmark_backends(AreaForceShell, model, LoadCases, Groups)
+    """
+    times = {}
+    for backend in BACKENDS:
+        start = time.perf_counter()
+        for _ in range(repeat):
+            func(model, *args, Backend=backend, **kwargs)
+        times[backend] = (time.perf_counter() - start) / repeat
+    return times
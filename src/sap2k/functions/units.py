@@ -0,0 +1,108 @@
+## Result Unit Conversion
+# This module converts extracted results between the SAP2000 unit systems
+# locally. Each result field is tagged with its dimension as powers of force
+# and length, and a table is converted with one vectorized scale per field,
+# so results extracted once can be reported in any of the unit systems
+# without calling SetPresentUnits and extracting them again.
+
+from ..constants import units, unit_factors
+from .helpers import unit_code
+from .results import ResultTable
+
+import numpy as np
+
+# Dimension of each result field as (force exponent, length exponent)
+FORCE, LENGTH, MOMENT = (1, 0), (0, 1), (1, 1)
+FIELD_DIMENSIONS = {
+    # Shell forces per unit width and moments per unit width
+    'F11': (1, -1), 'F22': (1, -1), 'F12': (1, -1), 'FMax': (1, -1), 'FMin': (1, -1),
+    'FVM': (1, -1), 'V13': (1, -1), 'V23': (1, -1), 'VMax': (1, -1),
+    'M11': FORCE, 'M22': FORCE, 'M12': FORCE, 'MMax': FORCE, 'MMin': FORCE,
+    'MxPos': FORCE, 'MaPos': FORCE, 'MxNeg': FORCE, 'MaNeg': FORCE,
+    'M11Pos': FORCE, 'M11Neg': FORCE, 'M22Pos': FORCE, 'M22Neg': FORCE,
+    # Frame forces, joint forces and reactions
+    'P': FORCE, 'V2': FORCE, 'V3': FORCE, 'T': MOMENT, 'M2': MOMENT, 'M3': MOMENT,
+    'F1': FORCE, 'F2': FORCE, 'F3': FORCE, 'M1': MOMENT,
+    'Fx': FORCE, 'Fy': FORCE, 'Fz': FORCE, 'Mx': MOMENT, 'My': MOMENT, 'Mz': MOMENT,
+    # Positions
+    'ObjSta': LENGTH, 'ElmSta': LENGTH, 'Location': LENGTH, 'Length': LENGTH,
+    'Xcoord': LENGTH, 'Ycoord': LENGTH, 'Zcoord': LENGTH,
+    'gx': LENGTH, 'gy': LENGTH, 'gz': LENGTH,
+}
+
+# Suffixes of fields derived from a base field with the same dimension
+# (see functions.envelope.Envelope)
+_SUFFIXES = ('Max', 'Min')
+
+
+def unit_scales(From, To):
+    """
+    This function returns the factors converting forces and lengths from one
+    unit system to another.
+
+    Variable Definitions:
+      From, To    = Unit names (e.g. "kip, ft") or codes (see constants/units.json)
+      Returns     = (force factor, length factor)
+    """
+    names = {code: name for name, code in units.items()}
+    force = []
+    length = []
+    for code in (unit_code(From), unit_code(To)):
+        if code not in names:
+            raise ValueError("Unknown unit code {0}.".format(code))
+        force_name, length_name = names[code].split(', ')
+        force.append(unit_factors['force'][force_name])
+        length.append(unit_factors['length'][length_name])
+    return force[0] / force[1], length[0] / length[1]
+
+
+def field_dimension(fldnm, dims=None):
+    """Return the (force, length) exponents of a field, or None when the
+    field is dimensionless or unknown (step numbers, angles, ratios)."""
+    if dims is not None and fldnm in dims:
+        return dims[fldnm]
+    if fldnm in FIELD_DIMENSIONS:
+        return FIELD_DIMENSIONS[fldnm]
+    for suffix in _SUFFIXES:
+        if fldnm.endswith(suffix) and fldnm[:-len(suffix)] in FIELD_DIMENSIONS:
+            return FIELD_DIMENSIONS[fldnm[:-len(suffix)]]
+    return None
+
+
+def convert_units(RawResults, Units, dims=None):
+    """
+    This function converts a ResultTable to another unit system.
+
+    Variable Definitions:
+      RawResults  = ResultTable with its Units set (as returned by the
+                    extraction functions)
+      Units       = Unit name or code to convert to
+      dims        = Optional {field: (force exponent, length exponent)}
+                    adding to or overriding FIELD_DIMENSIONS, e.g. for
+                    fields of a custom table
+      Returns     = New ResultTable in Units. Fields without a dimension are
+                    copied unchanged.
+
+    Example:
+      kip_ft = AreaForceShell(model, LoadCases, Groups, Units=4)
+      kN_m = convert_units(kip_ft, "kN, m")
+    """
+    table = RawResults
+    if table.Units is None:
+        raise ValueError("The units of the results are not known.")
+    Units = unit_code(Units)
+    force, length = unit_scales(table.Units, Units)
+
+    columns = dict(table)
+    fields = table.numeric_fields
+    if fields:
+        exponents = np.array([field_dimension(fldnm, dims) or (0, 0) for fldnm in fields],
+                             dtype=np.float64).reshape(-1, 2)
+        scale = force ** exponents[:, 0] * length ** exponents[:, 1]
+        block = table.to_numpy() * scale[:, None]
+        columns.update(zip(fields, block))
+    for fldnm, col in table.items():
+        dim = field_dimension(fldnm, dims)
+        if dim is not None and fldnm not in fields and isinstance(col, (int, float)):
+            columns[fldnm] = col * force ** dim[0] * length ** dim[1]
+    return ResultTable(columns, Units=Units, pool=table.pool)
@@ -2,12 +2,14 @@
 import os
 import sys
 
-import comtypes.client
-
 
 
 
 def SAPModel(Version, AttachToInstance=False, Visible=True, Path=""):
+    # comtypes is only available on Windows, import it when an instance is
+    # requested so the rest of the package can be used elsewhere
+    import comtypes.client
+
     # This function will Find the installed versions of SAP
     installed_versions = {}
     for items in os.listdir("C:\\Program Files\\Computers and Structures\\"):
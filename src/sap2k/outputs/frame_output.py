@@ -3,12 +3,19 @@
 # SAP2000 Model
 
 from ..constants import units
-from ..functions.helpers import select_groups, result_setup
+from ..functions.helpers import select_groups, result_setup, extract_results, iter_results
+from ..functions.groups import group_index
+from ..functions.cache import FINISHED
+from ..functions.coords import point_coords
+from ..functions.averaging import nodal_average
+from ..functions.results import ResultTable
 from typing import Union
 
+import numpy as np
 import sys
 
-def FrameJtForces(model, LoadCases, Groups, Units=4, NLStatic=1, MSStatic=1, MVCombo=1):
+def FrameJtForces(model, LoadCases, Groups, Units=4, NLStatic=1, MSStatic=1, MVCombo=1, Cache=None,
+                  GroupLabels=False, Backend="results"):
     """This function will extract the Frame Joint Forces for the given load cases,
     and groups.
 
@@ -47,37 +54,36 @@ def FrameJtForces(model, LoadCases, Groups, Units=4, NLStatic=1, MSStatic=1, MVC
           13  = kN, cm, C
           14  = kgf, cm, C
           15  = N, cm, C
-          16  = Ton, cm, C """
+          16  = Ton, cm, C
+      Cache       = Optional ResultCache. When the model file and output
+                    settings are unchanged the results are read from the
+                    cache without querying SAP2000.
+      GroupLabels = When True add a 'Group' column naming the group of the
+                    object in each row (see functions.groups.GroupIndex)
+      Backend     = "results" (Default) for the Results methods, "tables" to
+                    read the equivalent database table in bulk, or "auto"
+                    to use the faster one (see functions.tables). Table
+                    values are rounded to their display precision.
+    """
 
     ret=0
     FldNms = ['NumberResults','Obj','Elm','PointElm','LoadCase','StepType','StepNum',
-              'F1','F2','F3','M1','M2','M3','Xcoord','Ycoord','Zcoord']
+              'F1','F2','F3','M1','M2','M3']
 
-    ret = result_setup(model=model,load_cases=LoadCases,Units=Units,
-                       NLStatic=NLStatic,MSStatic=MSStatic,MVCombo=MVCombo)
+    output_dict = extract_results(model, "FrameJointForce", FldNms, LoadCases, Groups,
+                                  Units, NLStatic, MSStatic, MVCombo, Cache, Backend)
 
-    # Select all objects in specified groups
-    ret = select_groups(model=model,groups=Groups)
-    
-    output = model.Results.FrameJointForce("",3)
-    output_dict = {}
-
-    for i, fldnm in enumerate(FldNms):
-        output_dict[fldnm] = output[i]
-    
-    output_dict["Xcoord"] = []
-    output_dict["Ycoord"] = []
-    output_dict["Zcoord"] = []
-
-    for elem in output_dict["PointElem"]:
-        [X,Y,Z,T] = model.PointElm.GetCoordCartesian(elem)
-        output_dict["Xcoord"].append(X)
-        output_dict["Ycoord"].append(Y)
-        output_dict["Zcoord"].append(Z)
+    # Join the joint coordinates from the model's coordinate index
+    coords = point_coords(model, output_dict.Units)
+    output_dict = coords.join(output_dict, on='PointElm', model=model)
+
+    if GroupLabels:
+        output_dict = group_index(model, Groups).tag(output_dict, Groups, ObjectType='Frame')
 
     return output_dict
 
-def FrameForces(Model, LoadCases, Groups, Units=4, NLStatic=1, MSStatic=1, MVCombo=3):
+def FrameForces(Model, LoadCases, Groups, Units=4, NLStatic=1, MSStatic=1, MVCombo=3, Cache=None,
+                GroupLabels=False, Backend="results"):
     """
     This function will extract the Area Joint Forces for the given load cases,
     and groups. output is a list of tuples of the resulting forces.
@@ -117,221 +123,201 @@ def FrameForces(Model, LoadCases, Groups, Units=4, NLStatic=1, MSStatic=1, MVCom
           13  = kN, cm, C
           14  = kgf, cm, C
           15  = N, cm, C
-          16  = Ton, cm, C 
+          16  = Ton, cm, C
+      Cache       = Optional ResultCache. When the model file and output
+                    settings are unchanged the results are read from the
+                    cache without querying SAP2000.
+      GroupLabels = When True add a 'Group' column naming the group of the
+                    object in each row (see functions.groups.GroupIndex)
+      Backend     = "results" (Default) for the Results methods, "tables" to
+                    read the equivalent database table in bulk, or "auto"
+                    to use the faster one (see functions.tables). Table
+                    values are rounded to their display precision.
     """
 
     FldNms = ['NumberResults','Obj','ObjSta','Elm','ElmSta','LoadCase','StepType','StepNum',
               'P','V2','V3','T','M2','M3']
 
-    ret = result_setup(model=Model,load_cases=LoadCases,Units=Units,
-                       NLStatic=NLStatic,MSStatic=MSStatic,MVCombo=MVCombo)
+    output_dict = extract_results(Model, "FrameForce", FldNms, LoadCases, Groups,
+                                  Units, NLStatic, MSStatic, MVCombo, Cache, Backend)
 
-    # Select all objects in specified groups
-    ret = select_groups(model=Model,groups=Groups)
-
-    grp_assign_dict = dict(zip(['Group','ObjectType','ObjectName'],[[],[],[]]))
-    for grp in Groups:
-        grp_assign = Model.GroupDef.GetAssignments(grp)
-        grp_assign_dict['Group'].append([grp]*grp_assign[0])
-        grp_assign_dict['ObjectType'].append(grp_assign[1])
-        grp_assign_dict['ObjectName'].append(grp_assign[2])
-       
-    output = Model.Results.FrameForce("",3)
-    output_dict = dict(zip(FldNms,output))
+    if GroupLabels:
+        output_dict = group_index(Model, Groups).tag(output_dict, Groups, ObjectType='Frame')
 
     return output_dict
 
-def FrameElmSort(Model,Groups):
-    ret=0
-    NumberResults = 0
-    Obj = []
-    Elm = []
-    PointElm =[]
-    LoadCase = []
-    StepType = []
-    StepNum = []
-    F1 = []
-    F2 = []
-    F3 = []
-    M1 = []
-    M2 = []
-    M3 = []
-    Xcoord = []
-    Ycoord = []
-    Zcoord = []
-    Results = []
-    ElmJtChk = []
-    FldNms = ['Obj','Elm','PointElm']
-    Result = []
+def FrameForcesIter(Model, LoadCases, Groups, Units=4, NLStatic=1, MSStatic=1, MVCombo=3,
+                    Steps=None, ChunkRows=100000):
+    """
+    Streaming version of FrameForces. Yields ResultTables of at most
+    ChunkRows rows, extracting one load case at a time so that memory use
+    does not grow with the number of cases or steps.
 
+    Variable Definitions:
+      Steps       = Optional (first, last) range of step numbers to keep
+      ChunkRows   = Maximum rows per yielded table (Default 100000)
 
-    # Select all objects in specified groups
-    for i, item in enumerate(Groups):
+    Other variables are as for FrameForces.
+    """
 
-        #Loop through each selection group
-        [NumberResults,Obj,Elm,PointElm,LoadCase,StepType,StepNum,F1,F2,F3,M1,M2,M3,ret] = Model.Results.FrameJointForce(item,2)
+    FldNms = ['NumberResults','Obj','ObjSta','Elm','ElmSta','LoadCase','StepType','StepNum',
+              'P','V2','V3','T','M2','M3']
 
-        dElm = {}
-        dPointElm = {}
+    yield from iter_results(Model, "FrameForce", FldNms, LoadCases, Groups, Units,
+                            NLStatic, MSStatic, MVCombo, Steps, ChunkRows)
 
-        for i in range(NumberResults):
-            dPointElm.setdefault(Elm[i],[]).append(PointElm[i])
+def chain_elements(Elm, PointI, PointJ):
+    """
+    This function orders frame elements into continuous chains by following
+    the joints they share. Runs in linear time using a joint adjacency map.
 
-        Unique = list(set(Elm))
-        ctr = 0
+    Variable Definitions:
+      Elm         = Element names
+      PointI      = Joint at the I-end of each element
+      PointJ      = Joint at the J-end of each element
+      Returns     = [Chains, Branches, Components]
+          Chains      = List of chains, each a list of [Elm, PointI, PointJ]
+                        in connection order. Elements keep their own I-J
+                        orientation.
+          Branches    = Joints shared by more than two elements. Chains are
+                        split at these joints.
+          Components  = Number of disconnected pieces. Components - 1 is the
+                        number of gaps in the group.
+    """
+    ends = dict(zip(Elm, zip(PointI, PointJ)))
+
+    # Joint adjacency map
+    adjacent = {}
+    for elm, (pt_i, pt_j) in ends.items():
+        adjacent.setdefault(pt_i, []).append(elm)
+        adjacent.setdefault(pt_j, []).append(elm)
+
+    Branches = [pt for pt, elms in adjacent.items() if len(elms) > 2]
+
+    # Chains start at free ends and branch joints, preferring I-ends so that
+    # chains run in the direction of the elements
+    starts = [pt for pt, elms in adjacent.items() if len(elms) != 2]
+    starts.sort(key=lambda pt: ends[adjacent[pt][0]][0] != pt)
+
+    Chains = []
+    used = set()
+    for start in starts + list(adjacent):
+        for elm in adjacent[start]:
+            if elm in used:
+                continue
+            chain = []
+            pt = start
+            while elm is not None:
+                used.add(elm)
+                chain.append([elm, ends[elm][0], ends[elm][1]])
+                pt = ends[elm][1] if ends[elm][0] == pt else ends[elm][0]
+                elm = None
+                if len(adjacent[pt]) == 2:
+                    for nxt in adjacent[pt]:
+                        if nxt not in used:
+                            elm = nxt
+            Chains.append(chain)
+
+    # Count connected components, joining chains which meet at a joint
+    parent = list(range(len(Chains)))
+    def find(k):
+        while parent[k] != k:
+            parent[k] = parent[parent[k]]
+            k = parent[k]
+        return k
+    joint_chain = {}
+    for k, chain in enumerate(Chains):
+        for pt in (chain[0][1], chain[0][2], chain[-1][1], chain[-1][2]):
+            if pt in joint_chain:
+                parent[find(k)] = find(joint_chain[pt])
+            else:
+                joint_chain[pt] = k
+    Components = len({find(k) for k in range(len(Chains))})
+
+    return [Chains, Branches, Components]
+
+def FrameElmSort(Model, Groups, Report=False, LoadCase=None):
+    """
+    This function orders the frame elements of each group into a continuous
+    chain (e.g. the segments of a meshed pile from head to tip). The joint
+    forces of all groups are read in one FrameJointForce call.
 
-        loc_Result = [[Unique[0],dPointElm[Unique[0]][0],dPointElm[Unique[0]][1]]]
-        currkey = Unique[0]
-        for j, jkey in enumerate(Unique):
-            for k, kkey in enumerate(Unique):
-                if (dPointElm[currkey][1] == dPointElm[kkey][0]) and (currkey != kkey):
-                    loc_Result.append([kkey,dPointElm[kkey][0],dPointElm[kkey][1]])
-                    currkey = kkey
+    Variable Definitions:
+      Model       = SAP Model object defined initialized using SAP2000v22 (Object)
+      Groups      = List of selection groups (Strings)
+      Report      = When True also return a dict per group with the keys
+                    'Chains', 'Branches' and 'Gaps' (see chain_elements)
+      LoadCase    = Load case selected for the FrameJointForce call, whose
+                    rows give the element ends (Default the first load case
+                    of the model which has finished running)
+      Result      = List with one entry per group of [Elm, PointI, PointJ]
+                    rows in connection order. Groups with gaps return their
+                    chains one after another.
+    """
+    FldNms = ['NumberResults','Obj','Elm','PointElm','LoadCase','StepType','StepNum',
+              'F1','F2','F3','M1','M2','M3']
 
-                elif (loc_Result[0][1] == dPointElm[kkey][1]) and (currkey != kkey):
-                    loc_Result.insert(0,[kkey,dPointElm[kkey][0],dPointElm[kkey][1]])
-                    currkey = kkey
+    # One load case with one row per element end and step, in the present
+    # units. The case selected for output is changed as by any extraction.
+    if LoadCase is None:
+        NumberItems, CaseName, Status, ret = Model.Analyze.GetCaseStatus()
+        finished = [nm for nm, status in zip(CaseName, Status) if status == FINISHED]
+        if not finished:
+            raise ValueError("FrameElmSort needs a load case which has finished running.")
+        LoadCase = finished[0]
+    result_setup(Model, [LoadCase], Units=Model.GetPresentUnits(), NLStatic=1, MSStatic=1,
+                 MVCombo=1)
 
+    # Select all objects in specified groups
+    select_groups(Model, Groups)
+    output = ResultTable.from_output(FldNms, Model.Results.FrameJointForce("",3))
+
+    # The first two joints reported for each element are its I and J ends
+    elm_codes = output.codes('Elm')
+    pt_codes = output.codes('PointElm')
+    elms, first = np.unique(elm_codes, return_index=True)
+    elm_ids = np.searchsorted(elms, elm_codes)
+    other = np.nonzero(pt_codes != pt_codes[first][elm_ids])[0]
+    second = np.full(len(elms), -1)
+    other_elms, other_first = np.unique(elm_ids[other], return_index=True)
+    second[other_elms] = other[other_first]
+
+    pt_i = output['PointElm'][first]
+    pt_j = output['PointElm'][second]
+    elm_obj = dict(zip(output['Elm'][first], output['Obj'][first]))
+    connectivity = [[elm, i, j] for elm, i, j, k in zip(output['Elm'][first], pt_i, pt_j, second)
+                    if k >= 0]
+
+    # Rows of each group, from one map of object -> groups
+    groups = group_index(Model, Groups)
+    obj_groups = {}
+    for grp in Groups:
+        for obj in groups.names(grp, 'Frame'):
+            obj_groups.setdefault(obj, []).append(grp)
+    group_conn = {grp: [] for grp in Groups}
+    for row in connectivity:
+        for grp in obj_groups.get(elm_obj[row[0]], ()):
+            group_conn[grp].append(row)
 
-        Result.append(loc_Result)
+    Result = []
+    report = {}
+    for grp in Groups:
+        grp_conn = group_conn[grp]
+        Chains, Branches, Components = chain_elements(*zip(*grp_conn)) if grp_conn else [[], [], 0]
+        Result.append([row for chain in Chains for row in chain])
+        report[grp] = {'Chains': Chains, 'Branches': Branches, 'Gaps': max(Components - 1, 0)}
 
+    if Report:
+        return Result, report
     return Result
 
 def Frame_Stress_Avg(RawResults):
     # This module will take an array of results and average the forces over
     # common area joints.
 
-    FldNms = ['Joint','OutputCase','StepType','StepNum','Xcoord','Ycoord','Zcoord',
-              'F1','F2','F3','M1','M2','M3']
+    averaged = nodal_average(RawResults, fields=['F1','F2','F3','M1','M2','M3'],
+                             carry=['Xcoord','Ycoord','Zcoord'])
 
-    ret=0
-    NumberResults = 0
-    JtCaseStep_Chk = []
-    Obj = []
-    Elm = []
-    PointElm =[]
-    LoadCase = []
-    StepType = []
-    StepNum = []
-    F1 = []
-    F2 = []
-    F3 = []
-    M1 = []
-    M2 = []
-    M3 = []
-    Xcoord = []
-    Ycoord = []
-    Zcoord = []
-
-    # Assign Result Indicies
-    for i, item in enumerate(RawResults[0]):
-        match item:
-            case 'NumberResults':
-                NumberResults = RawResults[i]
-            case 'Obj':
-                Obj = list(RawResults[i])
-            case 'Elm':
-                Elm = list(RawResults[i])
-            case 'PointElm':
-                PointElm = list(RawResults[i])
-            case 'LoadCase':
-                LoadCase = list(RawResults[i])
-            case 'StepType':
-                StepType = list(RawResults[i])
-            case 'StepNum':
-                StepNum = list(RawResults[i])
-            case 'F1':
-                F1 = list(RawResults[i])
-            case 'F2':
-                F2 = list(RawResults[i])
-            case 'F3':
-                F3 = list(RawResults[i])
-            case 'M1':
-                M1 = list(RawResults[i])
-            case 'M2':
-                M2 = list(RawResults[i])
-            case 'M3':
-                M3 = list(RawResults[i])
-            case 'Xcoord':
-                Xcoord = list(RawResults[i])
-            case 'Ycoord':
-                Ycoord = list(RawResults[i])
-            case 'Zcoord':
-                Zcoord = list(RawResults[i])
-
-    # Create list of unique Joints
-    for i in range(NumberResults):
-        JtCaseStep_Chk.append(str(PointElm[i])+str(LoadCase[i])+str(StepType[i])+str(StepNum[i]))
-
-    #Define Dictionaries
-    print("Assigning result arrays to Dictionaries...")
-    dF1 = {}
-    dF2 = {}
-    dF3 = {}
-    dM1 = {}
-    dM2 = {}
-    dM3 = {}
-    dPointElm = dict(zip(JtCaseStep_Chk,PointElm))
-    dLoadCase = dict(zip(JtCaseStep_Chk,LoadCase))
-    dStepType = dict(zip(JtCaseStep_Chk,StepType))
-    dStepNum = dict(zip(JtCaseStep_Chk,StepNum))
-    dXcoord = dict(zip(JtCaseStep_Chk,Xcoord))
-    dYcoord = dict(zip(JtCaseStep_Chk,Ycoord))
-    dZcoord = dict(zip(JtCaseStep_Chk,Zcoord))
-
-    # Assign Dictionaries
-    for i in range(NumberResults):
-
-        dF1.setdefault(JtCaseStep_Chk[i],[]).append(F1[i])
-        dF2.setdefault(JtCaseStep_Chk[i],[]).append(F2[i])
-        dF3.setdefault(JtCaseStep_Chk[i],[]).append(F3[i])
-        dM1.setdefault(JtCaseStep_Chk[i],[]).append(M1[i])
-        dM2.setdefault(JtCaseStep_Chk[i],[]).append(M2[i])
-        dM3.setdefault(JtCaseStep_Chk[i],[]).append(M3[i])
-
-    # Define the Unique Keys
-    UniqueSets = list(set(JtCaseStep_Chk))
-
-    R_Joint = []
-    R_Case = []
-    R_StepType = []
-    R_StepNum = []
-    R_F1 = []
-    R_F2 = []
-    R_F3 = []
-    R_M1 = []
-    R_M2 = []
-    R_M3 = []
-    R_Xcoord = []
-    R_Ycoord = []
-    R_Zcoord = []
-
-    Prev_Chk = []
-
-    for i, key in enumerate(UniqueSets):
-
-        R_Joint.append(dPointElm[key])
-        R_Case.append(dLoadCase[key])
-        R_StepType.append(dStepType[key])
-        R_StepNum.append(dStepNum[key])
-        R_F1.append(sum(dF1[key])/len(dF1[key]))
-        R_F2.append(sum(dF2[key])/len(dF2[key]))
-        R_F3.append(sum(dF3[key])/len(dF3[key]))
-        R_M1.append(sum(dM1[key])/len(dM1[key]))
-        R_M2.append(sum(dM2[key])/len(dM2[key]))
-        R_M3.append(sum(dM3[key])/len(dM3[key]))
-        R_Xcoord.append(dXcoord[key])
-        R_Ycoord.append(dYcoord[key])
-        R_Zcoord.append(dZcoord[key])
-
-        sys.stdout.write('\n')
-        if i%1000 == 0:
-            sys.stdout.write('\r')
-            sys.stdout.write('{0} of {1} items processed | {2:.2%} Complete'.format(i,len(UniqueSets),i/len(UniqueSets)))
-        elif i == len(UniqueSets)-1:
-            sys.stdout.write('\r')
-            sys.stdout.write('{0} of {1} items processed | {2:.2%} Complete'.format(i,len(UniqueSets),i/len(UniqueSets)))
-
-    Results = [FldNms, R_Joint, R_Case, R_StepType, R_StepNum, R_Xcoord, R_Ycoord, R_Zcoord, R_F1, R_F2, R_F3, R_M1, R_M2, R_M3]
+    Results = averaged.rename({'PointElm':'Joint','LoadCase':'OutputCase'})
 
     return Results
@@ -3,10 +3,12 @@
 # SAP2000 Model
 
 from ..constants import units
-from ..functions.helpers import result_setup, select_groups
+from ..functions.helpers import result_setup, select_groups, extract_results
+from ..functions.groups import group_index
 
 
-def JointReact(Model, LoadCases, Groups, Units=4, NLStatic=1, MSStatic=1, MVCombo=1):
+def JointReact(Model, LoadCases, Groups, Units=4, NLStatic=1, MSStatic=1, MVCombo=1, Cache=None,
+               GroupLabels=False, Backend="results"):
     """This function will extract the Joint Reactions for the given load cases,
     and groups.
 
@@ -45,23 +47,26 @@ def JointReact(Model, LoadCases, Groups, Units=4, NLStatic=1, MSStatic=1, MVComb
           13  = kN, cm, C
           14  = kgf, cm, C
           15  = N, cm, C
-          16  = Ton, cm, C """
+          16  = Ton, cm, C
+      Cache       = Optional ResultCache. When the model file and output
+                    settings are unchanged the results are read from the
+                    cache without querying SAP2000.
+      GroupLabels = When True add a 'Group' column naming the group of the
+                    object in each row (see functions.groups.GroupIndex)
+      Backend     = "results" (Default) for the Results methods, "tables" to
+                    read the equivalent database table in bulk, or "auto"
+                    to use the faster one (see functions.tables). Table
+                    values are rounded to their display precision.
+    """
 
     FldNms = ['NumberResults','Obj', 'Elm', 'LoadCase','StepType','StepNum', 'F1','F2','F3',
               'M1','M2','M3']
-    
-    #Prepare the Model for Output
-    result_setup(Model, LoadCases, Units, NLStatic, MSStatic, MVCombo)
 
-    # Select elements in groups
-    select_groups(Model, Groups)
-    
     # Retrieve Joint Reactions
-    output = Model.Results.JointReact("",3)
-    
-    # Convert output into a dictionary
-    output_dict = {}
-    for i, fldnm in enumerate(FldNms):
-        output_dict[fldnm] = output[i]
+    output_dict = extract_results(Model, "JointReact", FldNms, LoadCases, Groups,
+                                  Units, NLStatic, MSStatic, MVCombo, Cache, Backend)
 
-    return output_dict
\ No newline at end of file
+    if GroupLabels:
+        output_dict = group_index(Model, Groups).tag(output_dict, Groups, ObjectType='Point')
+
+    return output_dict
@@ -2,8 +2,12 @@
 # This module performs various processing tasks on the output generated by SAP 2000
 
 from ..constants import units, sap_paths
-from ..functions.helpers import select_groups, result_setup
-from pandas import DataFrame, merge
+from ..functions.helpers import select_groups, result_setup, extract_results, iter_results
+from ..functions.groups import group_index
+from ..functions.averaging import nodal_average, as_table, factorize
+from ..functions.results import ResultTable
+from ..functions.strips import SectionCuts
+import numpy as np
 import math
 import sys
 
@@ -21,50 +25,108 @@ def W_A_Eq(M11, M22, M12, alpha=90):
     #   Mx_neg  = Combined Negative Moment in x-dir (kip-ft)
     #   Ma_neg  = Combined Negative Moment in α-dir (kip-ft)
 
-    # Initialize Results List
-    result = list(range(4))
+    # Scalar entry point kept for existing scripts, see W_A_Eq_Array. All four
+    # results are floats (a zero demand is 0.0 rather than the integer 0) and
+    # degenerate inputs return inf or nan instead of raising.
+    return [float(val) for val in W_A_Eq_Array(M11, M22, M12, alpha)]
 
-    alpha = math.radians(alpha)     # Convert to Radians
+def W_A_Eq_Array(M11, M22, M12, alpha=90):
+    """Array version of W_A_Eq. Computes the Wood-Armer design moments for
+    every node of a mesh in one call.
 
-    # Calculation of Positive Moment Demand
-    Mx_pos = M11 + 2 * M12 * (1/math.tan(alpha)) + M22 * (1/math.tan(alpha)**2) + abs((M12 + M22 / math.tan(alpha)) / math.sin(alpha))
-    Ma_pos = (M22 / math.sin(alpha)**2) + abs((M12 + M22 / math.tan(alpha)) / math.sin(alpha))
-
-    if Mx_pos < 0:
-        Mx_pos = 0
-        Ma_pos = (M22 + abs((M12 + M22 / (math.tan(alpha))**2) / (M11 + 2 * M12 / math.tan(alpha) + M22 / (math.tan(alpha)**2)))) / (math.sin(alpha)**2)
-
-    elif Ma_pos < 0:
-        Ma_pos = 0
-        Mx_pos = (M11 + 2 * M12 / math.tan(alpha) + M22 / (math.tan(alpha)**2)) + abs((M12 + M22 / (math.tan(alpha)))**2 / M22)
-
-    if (Mx_pos <= 0) and (Ma_pos <= 0):
-        Ma_pos = 0
-        Mx_pos = 0
-
-    Mx_neg = M11 + 2 * M12 * (1/math.tan(alpha)) + M22 * (1/math.tan(alpha)**2) - abs((M12 + M22 / math.tan(alpha)) / math.sin(alpha))
-    Ma_neg = (M22 / math.sin(alpha)**2) - abs((M12 + M22 / math.tan(alpha)) / math.sin(alpha))
-
-    if Mx_neg > 0:
-        Mx_neg = 0
-        Ma_neg = (M22 - abs((M12 + M22 / (math.tan(alpha))**2) / (M11 + 2 * M12 / math.tan(alpha) + M22 / (math.tan(alpha)**2)))) / (math.sin(alpha)**2)
-
-    elif Ma_neg > 0:
-        Ma_neg = 0
-        Mx_neg = (M11 + 2 * M12 / math.tan(alpha) + M22 / (math.tan(alpha)**2)) - abs((M12 + M22 / (math.tan(alpha)))**2 / M22)
-
-    if (Mx_neg >= 0) and (Ma_neg >= 0):
-        Ma_neg = 0
-        Mx_neg = 0
+    Variable Definitions:
+      M11     = Moments in the 1-1 direction (array, DataFrame column or scalar)
+      M22     = Moments in the 2-2 direction (array, DataFrame column or scalar)
+      M12     = Twisting moments (array, DataFrame column or scalar)
+     [alpha]  = Angle to secondary axis measured CW from x-dir (Degrees).
+                Either a scalar or one value per element.
+      Returns = [Mx_pos, Ma_pos, Mx_neg, Ma_neg] as float64 arrays
+
+    The branch cases of the scalar routine are evaluated as masks. When alpha
+    is a scalar the trigonometric terms are taken from the math module so that
+    W_A_Eq, which passes its scalars through this function, reproduces its
+    previous results.
+
+    Degenerate inputs (e.g. alpha = 0, or M22 = 0 in the alternate
+    expressions) give inf or nan in the affected results instead of raising
+    ZeroDivisionError; the numpy warnings are suppressed."""
+
+    M11 = np.asarray(M11, dtype=np.float64)
+    M22 = np.asarray(M22, dtype=np.float64)
+    M12 = np.asarray(M12, dtype=np.float64)
+
+    if np.ndim(alpha) == 0:
+        alpha = math.radians(alpha)     # Convert to Radians
+        tan_a = np.float64(math.tan(alpha))
+        sin_a = np.float64(math.sin(alpha))
+    else:
+        alpha = np.radians(np.asarray(alpha, dtype=np.float64))
+        tan_a = np.tan(alpha)
+        sin_a = np.sin(alpha)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        # Terms shared by the top and bottom moments
+        M_x = M11 + 2 * M12 * (1/tan_a) + M22 * (1/tan_a**2)
+        M_a = M22 / sin_a**2
+        M_tw = abs((M12 + M22 / tan_a) / sin_a)
+
+        # Alternate expressions when one direction needs no reinforcement
+        M_base = M11 + 2 * M12 / tan_a + M22 / (tan_a**2)
+        M_a_alt = abs((M12 + M22 / (tan_a)**2) / M_base)
+        M_x_alt = abs((M12 + M22 / (tan_a))**2 / M22)
+
+        # Calculation of Positive Moment Demand
+        Mx_pos = M_x + M_tw
+        Ma_pos = M_a + M_tw
+
+        mask_x = Mx_pos < 0
+        mask_a = ~mask_x & (Ma_pos < 0)
+        Ma_pos = np.where(mask_x, (M22 + M_a_alt) / (sin_a**2), Ma_pos)
+        Mx_pos = np.where(mask_x, 0.0, Mx_pos)
+        Mx_pos = np.where(mask_a, M_base + M_x_alt, Mx_pos)
+        Ma_pos = np.where(mask_a, 0.0, Ma_pos)
+
+        mask_0 = (Mx_pos <= 0) & (Ma_pos <= 0)
+        Mx_pos = np.where(mask_0, 0.0, Mx_pos)
+        Ma_pos = np.where(mask_0, 0.0, Ma_pos)
+
+        # Calculation of Negative Moment Demand
+        Mx_neg = M_x - M_tw
+        Ma_neg = M_a - M_tw
+
+        mask_x = Mx_neg > 0
+        mask_a = ~mask_x & (Ma_neg > 0)
+        Ma_neg = np.where(mask_x, (M22 - M_a_alt) / (sin_a**2), Ma_neg)
+        Mx_neg = np.where(mask_x, 0.0, Mx_neg)
+        Mx_neg = np.where(mask_a, M_base - M_x_alt, Mx_neg)
+        Ma_neg = np.where(mask_a, 0.0, Ma_neg)
+
+        mask_0 = (Mx_neg >= 0) & (Ma_neg >= 0)
+        Mx_neg = np.where(mask_0, 0.0, Mx_neg)
+        Ma_neg = np.where(mask_0, 0.0, Ma_neg)
+
+    return [Mx_pos, Ma_pos, Mx_neg, Ma_neg]
+units
 
-    result[0] = Mx_pos
-    result[1] = Ma_pos
-    result[2] = Mx_neg
-    result[3] = Ma_neg
+def wood_armer_fields(alpha=90):
+    """Return a function calculating the Wood-Armer design moments of every
+    row of a shell force table, for use as the derive argument of
+    functions.envelope.Envelope. The moments are found from the concurrent
+    M11, M22 and M12 of each row before enveloping.
 
-    return result
-units
-def AreaForceShell(model, LoadCases, Groups, Units=4, NLStatic=1, MSStatic=1, MVCombo=1):
+    Variable Definitions:
+     [alpha]  = Angle to secondary axis measured CW from x-dir (Degrees)
+      Returns = Function of a ResultTable returning {'MxPos', 'MaPos',
+                'MxNeg', 'MaNeg'} arrays"""
+
+    def derive(table):
+        Mx_pos, Ma_pos, Mx_neg, Ma_neg = W_A_Eq_Array(table['M11'], table['M22'], table['M12'],
+                                                      alpha)
+        return {'MxPos': Mx_pos, 'MaPos': Ma_pos, 'MxNeg': Mx_neg, 'MaNeg': Ma_neg}
+    return derive
+
+def AreaForceShell(model, LoadCases, Groups, Units=4, NLStatic=1, MSStatic=1, MVCombo=1, Cache=None,
+                   GroupLabels=False, Backend="results"):
     """This function will extract the Area shell Forces at each node for the given load cases,
     and groups.
 
@@ -104,226 +166,123 @@ def AreaForceShell(model, LoadCases, Groups, Units=4, NLStatic=1, MSStatic=1, MV
           14  = kgf, cm, C
           15  = N, cm, C
           16  = Ton, cm, C
-          """
+      Cache       = Optional ResultCache. When the model file and output
+                    settings are unchanged the results are read from the
+                    cache without querying SAP2000.
+      GroupLabels = When True add a 'Group' column naming the group of the
+                    object in each row (see functions.groups.GroupIndex)
+      Backend     = "results" (Default) for the Results methods, "tables" to
+                    read the equivalent database table in bulk, or "auto"
+                    to use the faster one (see functions.tables). Table
+                    values are rounded to their display precision.
+    """
     
     FldNms = ['NumberResults','Obj','Elm','PointElm','LoadCase','StepType','StepNum',
               'F11','F22','F12','FMax','FMin','FAngle','FVM',
               'M11','M22','M12','MMax','MMin','MAngle',
               'V13','V23','VMax','VAngle','ret']
-    
-    ret = result_setup(model=model,load_cases=LoadCases,Units=Units,
-                       NLStatic=NLStatic,MSStatic=MSStatic,MVCombo=MVCombo)
 
-    # Select all objects in specified groups
-    ret = select_groups(model=model,groups=Groups)
-    
-    output = model.Results.AreaForceShell("",3)
-    output_dict = {}
+    output_dict = extract_results(model, "AreaForceShell", FldNms, LoadCases, Groups,
+                                  Units, NLStatic, MSStatic, MVCombo, Cache, Backend)
+
+    if GroupLabels:
+        output_dict = group_index(model, Groups).tag(output_dict, Groups, ObjectType='Area')
 
-    for i, fldnm in enumerate(FldNms):
-        output_dict[fldnm] = output[i]
     return output_dict
 
-def Shell_Stress_Avg(rawResults,grp_by,data_val):
-    df_averaged = rawResults.groupby(grp_by)[[data_val]].mean().reset_indx()
-    df_averaged = merge(df_averaged,rawResults[["PointElm",
-                                                         "Elm"]],on="PointElm")
+def AreaForceShellIter(model, LoadCases, Groups, Units=4, NLStatic=1, MSStatic=1, MVCombo=1,
+                       Steps=None, ChunkRows=100000):
+    """Streaming version of AreaForceShell. Yields ResultTables of at most
+    ChunkRows rows, extracting one load case at a time so that memory use
+    does not grow with the number of cases or steps.
 
-    return df_averaged
+    Variable Definitions:
+      Steps       = Optional (first, last) range of step numbers to keep
+      ChunkRows   = Maximum rows per yielded table (Default 100000)
+
+    Other variables are as for AreaForceShell. The chunks can be passed
+    straight to nodal_average, e.g.
+      nodal_average(AreaForceShellIter(model, cases, groups), ['M11','M22'])
+    """
+
+    FldNms = ['NumberResults','Obj','Elm','PointElm','LoadCase','StepType','StepNum',
+              'F11','F22','F12','FMax','FMin','FAngle','FVM',
+              'M11','M22','M12','MMax','MMin','MAngle',
+              'V13','V23','VMax','VAngle','ret']
+
+    yield from iter_results(model, "AreaForceShell", FldNms, LoadCases, Groups, Units,
+                            NLStatic, MSStatic, MVCombo, Steps, ChunkRows)
+
+def SectionCutForces(model, LoadCases, Groups, Cuts, Units=4, NLStatic=1, MSStatic=1, MVCombo=1,
+                     ChunkRows=100000):
+    """Integrated shell forces along section cuts or across design strips
+    for every load case and step.
+
+    Variable Definitions:
+      Groups      = Groups holding the shells crossed by the cuts
+      Cuts        = SectionCuts, or a list of (cut name, (X, Y) start,
+                    (X, Y) end) in Units (see functions.strips.strip_cuts).
+                    Pass a SectionCuts to reuse its geometry between calls.
+
+    Other variables are as for AreaForceShell. Results are streamed one load
+    case at a time, see SectionCuts.integrate for the returned fields.
+    """
+    if not isinstance(Cuts, SectionCuts):
+        Cuts = SectionCuts.from_model(model, Cuts, Units)
+    return Cuts.integrate(AreaForceShellIter(model, LoadCases, Groups, Units, NLStatic, MSStatic,
+                                             MVCombo, ChunkRows=ChunkRows))
+
+def Shell_Stress_Avg(rawResults, grp_by, data_val, Operator=None):
+    """Average shell results over the rows sharing the grp_by fields and
+    return them at the element corners.
+
+    Variable Definitions:
+      rawResults  = AreaForceShell ResultTable, or a DataFrame of it
+      grp_by      = Fields identifying a nodal result, e.g. ['PointElm',
+                    'LoadCase','StepType','StepNum']
+      data_val    = Field, or list of fields, to average
+      Operator    = Optional functions.averaging.IncidenceOperator of the
+                    mesh. The results are then averaged by joint, load case
+                    and step with its weights (e.g. element area) and
+                    grp_by is only used to choose the returned fields.
+      Returns     = The grp_by fields, Elm and the averaged data_val fields
+                    for every row of rawResults, as a DataFrame when
+                    rawResults is one and a ResultTable otherwise
+    """
+    frame = not isinstance(rawResults, (ResultTable, dict, list, tuple))
+    if frame:
+        table = ResultTable({fldnm: rawResults[fldnm].to_numpy() for fldnm in rawResults.columns})
+    else:
+        table = as_table(rawResults)
+    grp_by = [grp_by] if isinstance(grp_by, str) else list(grp_by)
+    fields = [data_val] if isinstance(data_val, str) else list(data_val)
+
+    if Operator is None:
+        group_ids, first_rows = factorize(table, grp_by)
+        counts = np.bincount(group_ids, minlength=len(first_rows))
+        smoothed = table.with_columns(**{fldnm: (np.bincount(group_ids, weights=table[fldnm],
+                                                             minlength=len(first_rows))
+                                                 / counts)[group_ids] for fldnm in fields})
+    else:
+        smoothed = Operator.smooth(table, fields)
+
+    keep = list(dict.fromkeys(grp_by + ['Elm'] + fields))
+    df_averaged = ResultTable({fldnm: smoothed[fldnm] for fldnm in keep}, Units=table.Units)
+    return df_averaged.to_pandas() if frame else df_averaged
 
 def Shell_Stress_Avg_old(RawResults):
     # This module will take an array of results and average the forces over
     # common area joints.
 
-    FldNms = ['Joint','OutputCase','StepType','StepNum','Xcoord','Ycoord','Zcoord',
-              'F11','F22','F12','V13','V23','M11','M22','M12','M11Pos','M11Neg','M22Pos','M22Neg']
-
-    ret=0
-    NumberResults = 0
-    JtCaseStep_Chk = []
-    Obj = []
-    Elm = []
-    PointElm =[]
-    LoadCase = []
-    StepType = []
-    StepNum = []
-    F11 = []
-    F22 = []
-    F12 = []
-    FMax = []
-    FMin = []
-    FAngle = []
-    FVM = []
-    M11 = []
-    M22 = []
-    M12 = []
-    MMax = []
-    MMin = []
-    MAngle = []
-    V13 = []
-    V23 = []
-    VMax = []
-    VAngle = []
-    Xcoord = []
-    Ycoord = []
-    Zcoord = []
-
-    # Assign Result Indicies
-    for i, item in enumerate(RawResults[0]):
-        match item:
-            case 'NumberResults':
-                NumberResults = RawResults[i]
-            case 'Obj':
-                Obj = list(RawResults[i])
-            case 'Elm':
-                Elm = list(RawResults[i])
-            case 'PointElm':
-                PointElm = list(RawResults[i])
-            case 'LoadCase':
-                LoadCase = list(RawResults[i])
-            case 'StepType':
-                StepType = list(RawResults[i])
-            case 'StepNum':
-                StepNum = list(RawResults[i])
-            case 'F11':
-                F11 = list(RawResults[i])
-            case 'F22':
-                F22 = list(RawResults[i])
-            case 'F12':
-                F12 = list(RawResults[i])
-            case 'FMax':
-                FMax = list(RawResults[i])
-            case 'FMin':
-                FMin = list(RawResults[i])
-            case 'FVM':
-                FVM = list(RawResults[i])
-            case 'M11':
-                M11 = list(RawResults[i])
-            case 'M22':
-                M22 = list(RawResults[i])
-            case 'M12':
-                M12 = list(RawResults[i])
-            case 'MMax':
-                MMax = list(RawResults[i])
-            case 'MMin':
-                MMin = list(RawResults[i])
-            case 'MAngle':
-                MAngle = list(RawResults[i])
-            case 'V13':
-                V13 = list(RawResults[i])
-            case 'V23':
-                V23 = list(RawResults[i])
-            case 'VMax':
-                VMax = list(RawResults[i])
-            case 'VAngle':
-                VAngle = list(RawResults[i])
-            case 'Xcoord':
-                Xcoord = list(RawResults[i])
-            case 'Ycoord':
-                Ycoord = list(RawResults[i])
-            case 'Zcoord':
-                Zcoord = list(RawResults[i])
-
-    # Create list of unique Joints
-    for i in range(NumberResults):
-        JtCaseStep_Chk.append(str(PointElm[i])+str(LoadCase[i])+str(StepType[i])+str(StepNum[i]))
-
-    #Define Dictionaries
-    print("Assigning result arrays to Dictionaries...")
-    dF11 = {}
-    dF22 = {}
-    dF12 = {}
-    dM11 = {}
-    dM22 = {}
-    dM12 = {}
-    dV13 = {}
-    dV23 = {}
-    dPointElm = dict(zip(JtCaseStep_Chk,PointElm))
-    dLoadCase = dict(zip(JtCaseStep_Chk,LoadCase))
-    dStepType = dict(zip(JtCaseStep_Chk,StepType))
-    dStepNum = dict(zip(JtCaseStep_Chk,StepNum))
-    dXcoord = dict(zip(JtCaseStep_Chk,Xcoord))
-    dYcoord = dict(zip(JtCaseStep_Chk,Ycoord))
-    dZcoord = dict(zip(JtCaseStep_Chk,Zcoord))
-
-    # Assign Dictionaries
-    for i in range(NumberResults):
-
-        dF11.setdefault(JtCaseStep_Chk[i],[]).append(F11[i])
-        dF22.setdefault(JtCaseStep_Chk[i],[]).append(F22[i])
-        dF12.setdefault(JtCaseStep_Chk[i],[]).append(F12[i])
-        dM11.setdefault(JtCaseStep_Chk[i],[]).append(M11[i])
-        dM22.setdefault(JtCaseStep_Chk[i],[]).append(M22[i])
-        dM12.setdefault(JtCaseStep_Chk[i],[]).append(M12[i])
-        dV13.setdefault(JtCaseStep_Chk[i],[]).append(V13[i])
-        dV23.setdefault(JtCaseStep_Chk[i],[]).append(V23[i])
-
-    # Define the Unique Keys
-    UniqueSets = list(set(JtCaseStep_Chk))
-
-    R_Joint = []
-    R_Case = []
-    R_StepType = []
-    R_StepNum = []
-    R_F11 = []
-    R_F22 = []
-    R_F12 = []
-    R_M11 = []
-    R_M11Pos = []
-    R_M11Neg = []
-    R_M22 = []
-    R_M22Pos = []
-    R_M22Neg = []
-    R_M12 = []
-    R_V13 = []
-    R_V23 = []
-    R_Xcoord = []
-    R_Ycoord = []
-    R_Zcoord = []
-
-    Prev_Chk = []
-
-    for i, key in enumerate(UniqueSets):
-
-        R_Joint.append(dPointElm[key])
-        R_Case.append(dLoadCase[key])
-        R_StepType.append(dStepType[key])
-        R_StepNum.append(dStepNum[key])
-        R_F11.append(sum(dF11[key])/len(dF11[key]))
-        R_F22.append(sum(dF22[key])/len(dF22[key]))
-        R_F12.append(sum(dF12[key])/len(dF12[key]))
-        R_M11.append(sum(dM11[key])/len(dM11[key]))
-        R_M22.append(sum(dM22[key])/len(dM22[key]))
-        R_M12.append(sum(dM12[key])/len(dM12[key]))
-        R_V13.append(sum(dV13[key])/len(dV13[key]))
-        R_V23.append(sum(dV23[key])/len(dV23[key]))
-        R_Xcoord.append(dXcoord[key])
-        R_Ycoord.append(dYcoord[key])
-        R_Zcoord.append(dZcoord[key])
-
-        if R_M11[i] > 0:
-            R_M11Pos.append(R_M11[i] + abs(R_M12[i]))
-            R_M11Neg.append(0)
-        else:
-            R_M11Neg.append(R_M11[i] - abs(R_M12[i]))
-            R_M11Pos.append(0)
-
-        if R_M22[i] > 0:
-            R_M22Pos.append(R_M22[i] + abs(R_M12[i]))
-            R_M22Neg.append(0)
-        else:
-            R_M22Neg.append(R_M22[i] - abs(R_M12[i]))
-            R_M22Pos.append(0)
-        Prev_Chk.append(item)
-
-
-        if i%1000 == 0:
-            sys.stdout.write('\r')
-            sys.stdout.write('{0} of {1} items processed | {2:.2%} Complete'.format(i,len(UniqueSets),i/len(UniqueSets)))
-        elif i == len(UniqueSets)-1:
-            sys.stdout.write('\r')
-            sys.stdout.write('{0} of {1} items processed | {2:.2%} Complete'.format(i,len(UniqueSets),i/len(UniqueSets)))
-
-    Results = [FldNms, R_Joint, R_Case, R_StepType, R_StepNum, R_Xcoord, R_Ycoord, R_Zcoord, R_F11, R_F22, R_F12, R_V13, R_V23, R_M11, R_M22, R_M12, R_M11Pos, R_M11Neg, R_M22Pos, R_M22Neg]
+    averaged = nodal_average(RawResults, fields=['F11','F22','F12','V13','V23','M11','M22','M12'],
+                             carry=['Xcoord','Ycoord','Zcoord'])
+
+    # Add the twisting moment to the averaged bending moments
+    M11, M22, M12 = averaged['M11'], averaged['M22'], averaged['M12']
+    Results = averaged.rename({'PointElm':'Joint','LoadCase':'OutputCase'}).with_columns(
+        M11Pos=np.where(M11 > 0, M11 + abs(M12), 0.0),
+        M11Neg=np.where(M11 > 0, 0.0, M11 - abs(M12)),
+        M22Pos=np.where(M22 > 0, M22 + abs(M12), 0.0),
+        M22Neg=np.where(M22 > 0, 0.0, M22 - abs(M12)))
 
     return Results
@@ -1,11 +1,11 @@
 ## Global Structural Outputs
 
 from ..constants import units, sap_paths
-from ..functions.helpers import result_setup
+from ..functions.helpers import result_setup, extract_results
+from ..functions.reactions import ReactionTensor
 
-import pandas as pd
-
-def base_reactions(Model, LoadCases, Units=4, NLStatic=1, MSStatic=1, MVCombo=1):
+def base_reactions(Model, LoadCases, Units=4, NLStatic=1, MSStatic=1, MVCombo=1, Cache=None,
+                   Backend="results"):
 
     """This function will extract the base reactions of the structure for the
     given load cases.
@@ -45,26 +45,58 @@ def base_reactions(Model, LoadCases, Units=4, NLStatic=1, MSStatic=1, MVCombo=1)
           13  = kN, cm, C
           14  = kgf, cm, C
           15  = N, cm, C
-          16  = Ton, cm, C """
+          16  = Ton, cm, C
+      Cache       = Optional ResultCache. When the model file and output
+                    settings are unchanged the results are read from the
+                    cache without querying SAP2000.
+      Backend     = "results" (Default) for the Results methods, "tables" to
+                    read the equivalent database table in bulk, or "auto"
+                    to use the faster one (see functions.tables). Table
+                    values are rounded to their display precision.
+    """
 
     FldNms = ['NumberResults','LoadCase','StepType','StepNum', 'Fx','Fy','Fz',
               'Mx','My','Mz','gx','gy','gz']
-    
-    if isinstance(Units, str):
-        Units = units[Units]
-    elif isinstance(Units, int):
-        Units = Units
-    else:
-        raise TypeError("Value of Units variable must be string or integer. \
-Reference the Units.json file in the constants directory for list \
-of valid units.")
-    
-    result_setup(Model, LoadCases, Units, NLStatic, MSStatic, MVCombo)
 
-    output = Model.Results.BaseReact()
-    output_dict = {}
+    output_dict = extract_results(Model, "BaseReact", FldNms, LoadCases, None,
+                                  Units, NLStatic, MSStatic, MVCombo, Cache, Backend)
+
+    return output_dict
+
+def BaseReactionTensor(Model, LoadCases, Units=4, NLStatic=2, MSStatic=2, MVCombo=1, History=2):
+
+    """This function will extract the base reactions of the structure for the
+    given load cases as a (case x step x component) ReactionTensor.
+
+    Variable Definitions:
+      Model       = SAP Model object defined initialized using SAP2000v22 (Object)
+      LoadCases   = List of load cases for inclusion in output (Strings)
+      History     = Set output type for modal and direct integration time
+                    history results:
+          1   = Envelopes
+          2   = Step-by-Step (Default)
+          3   = Last Step
+      NLStatic, MSStatic, MVCombo and Units are as for base_reactions, with
+      step-by-step nonlinear and multi-step static output by default.
+
+    All load cases are read with a single BaseReact call and arranged along
+    the first axis in the order of LoadCases. The model's direct and modal
+    history options are restored afterwards. See
+    functions.reactions.ReactionTensor for the peak, rms and envelope
+    summaries.
+    """
 
-    for i, fldnm in enumerate(FldNms):
-        output_dict[fldnm] = output[i]
+    if not hasattr(LoadCases, '__iter__') or isinstance(LoadCases, str):
+        LoadCases = [LoadCases]
+    # The history options go through result_setup so a ResultSession
+    # tracks them with its other options
+    previous = (Model.Results.Setup.GetOptionDirectHist()[0],
+                Model.Results.Setup.GetOptionModalHist()[0])
+    result_setup(Model, LoadCases, Units, NLStatic, MSStatic, MVCombo, History)
+    try:
+        output_dict = base_reactions(Model, LoadCases, Units, NLStatic, MSStatic, MVCombo,
+                                     Backend="results")
+    finally:
+        result_setup(Model, LoadCases, Units, NLStatic, MSStatic, MVCombo, previous)
 
-    return output_dict
\ No newline at end of file
+    return ReactionTensor.from_table(output_dict, LoadCases)
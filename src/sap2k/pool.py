@@ -0,0 +1,178 @@
+## SAP2000 Instance Pool
+# This module runs extraction jobs on several SAP2000 instances at once. Each
+# worker is a separate process (and so has its own COM apartment) which
+# starts one instance and keeps it open between model files.
+
+import multiprocessing
+import queue
+import time
+import traceback
+from collections import namedtuple
+
+# Result of one job
+PoolResult = namedtuple('PoolResult', ['job_id', 'path', 'value', 'error'])
+
+# Message sent by a worker when it stops
+_WORKER_EXIT = '__worker_exit__'
+
+# Seconds between checks that the workers are still running while waiting
+_POLL = 0.2
+
+
+class SAPFactory:
+    """Picklable factory which starts a new SAP2000 instance in a worker
+    process using initialize.SAPModel."""
+
+    def __init__(self, Version, Visible=False):
+        self.Version = Version
+        self.Visible = Visible
+
+    def __call__(self):
+        from .initialize import SAPModel
+        return SAPModel(self.Version, AttachToInstance=False, Visible=self.Visible)
+
+
+def _worker(factory, jobs, results, worker_id, running):
+    # Worker process loop: start an instance, then open and process model
+    # files until a None job is received. running[worker_id] holds the id of
+    # the job being processed, so the job can be failed if the process dies.
+    sap_object = None
+    try:
+        sap_object = factory()
+        model = sap_object.SapModel
+        while True:
+            job = jobs.get()
+            if job is None:
+                break
+            job_id, path, func, args, kwargs = job
+            running[worker_id] = job_id
+            try:
+                model.File.OpenFile(path)
+                value = func(model, *args, **kwargs)
+                results.put(PoolResult(job_id, path, value, None))
+            except Exception:
+                results.put(PoolResult(job_id, path, None, traceback.format_exc()))
+            running[worker_id] = -1
+    except Exception:
+        results.put(PoolResult(None, None, None, traceback.format_exc()))
+    finally:
+        if sap_object is not None:
+            try:
+                sap_object.ApplicationExit(False)
+            except Exception:
+                pass
+        results.put(PoolResult(_WORKER_EXIT, worker_id, None, None))
+
+
+class InstancePool:
+    """
+    Pool of SAP2000 instances which process model files from a job queue.
+
+    Variable Definitions:
+      factory     = Picklable callable returning a SapObject (the object
+                    returned by initialize.SAPModel). Use SAPFactory for real
+                    instances or a fake factory for testing.
+      workers     = Number of worker processes / SAP2000 instances
+      context     = multiprocessing start method ("spawn", "fork", ...).
+                    Default is the platform default.
+
+    Jobs are functions called as func(model, *args, **kwargs) after the model
+    file has been opened. Functions and their return values must be
+    picklable, e.g. a module level function returning a ResultTable.
+    When a worker process dies (e.g. SAP2000 crashes) the job it was
+    processing is returned with an error and the other workers carry on.
+
+    Example:
+      with InstancePool(SAPFactory('24'), workers=3) as pool:
+          for res in pool.map(extract_deck, model_paths):
+              ...
+    """
+
+    def __init__(self, factory, workers=2, context=None):
+        ctx = multiprocessing.get_context(context)
+        self._jobs = ctx.Queue()
+        self._results = ctx.Queue()
+        self._running = ctx.Array('q', [-1] * workers)
+        self._next_id = 0
+        self._pending = {}
+        self._processes = []
+        self._stopped = set()
+        self.errors = []
+        for worker_id in range(workers):
+            proc = ctx.Process(target=_worker, args=(factory, self._jobs, self._results, worker_id,
+                                                     self._running),
+                               daemon=True)
+            proc.start()
+            self._processes.append(proc)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.shutdown()
+
+    def submit(self, path, func, *args, **kwargs):
+        """Queue one model file and return its job id."""
+        job_id = self._next_id
+        self._next_id += 1
+        self._pending[job_id] = path
+        self._jobs.put((job_id, path, func, args, kwargs))
+        return job_id
+
+    def results(self, timeout=None):
+        """Yield a PoolResult for every outstanding job as it completes."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while self._pending:
+            if len(self._stopped) == len(self._processes):
+                raise RuntimeError("All SAP2000 workers have stopped with {0} jobs "
+                                   "outstanding.\n{1}".format(len(self._pending),
+                                                               "\n".join(self.errors)))
+            wait = _POLL if deadline is None else min(_POLL, deadline - time.monotonic())
+            try:
+                res = self._results.get(timeout=max(wait, 0.0))
+            except queue.Empty:
+                if deadline is not None and time.monotonic() >= deadline:
+                    raise TimeoutError("No result received within {0} s.".format(timeout))
+                yield from self._check_workers()
+                continue
+            if res.job_id == _WORKER_EXIT:
+                self._stopped.add(res.path)
+                continue
+            if res.job_id is None:
+                # Worker failed to start its instance, the others carry on
+                self.errors.append(res.error)
+                continue
+            if res.job_id in self._pending:
+                del self._pending[res.job_id]
+                yield res
+
+    def _check_workers(self):
+        # Fail the job of every worker process which died without stopping
+        for worker_id, proc in enumerate(self._processes):
+            if worker_id in self._stopped or proc.is_alive():
+                continue
+            self._stopped.add(worker_id)
+            job_id = self._running[worker_id]
+            error = "SAP2000 worker {0} exited with code {1}.".format(worker_id, proc.exitcode)
+            self.errors.append(error)
+            if job_id in self._pending:
+                yield PoolResult(job_id, self._pending.pop(job_id), None, error)
+
+    def map(self, func, paths, *args, **kwargs):
+        """Queue every path and yield results in completion order."""
+        for path in paths:
+            self.submit(path, func, *args, **kwargs)
+        yield from self.results()
+
+    def shutdown(self, timeout=60):
+        """Stop the workers, closing their SAP2000 instances."""
+        # Count first: any worker may take a stop message and exit at once
+        alive = sum(proc.is_alive() for proc in self._processes)
+        for _ in range(alive):
+            self._jobs.put(None)
+        for proc in self._processes:
+            proc.join(timeout)
+            if proc.is_alive():
+                proc.terminate()
+        self._processes = []
+        self._stopped = set()
@@ -0,0 +1 @@
+from .fake_model import FakeSapModel, FakeSapObject
@@ -0,0 +1,917 @@
+## In-Memory SAP2000 Stand-In
+# This module implements the subset of the SAP2000 OAPI used by the package
+# on a synthetic wharf model (a shell deck on vertical piles), so that the
+# extraction and post-processing functions can be exercised, tested and
+# benchmarked without SAP2000. Every OAPI call is counted and can be given a
+# simulated latency.
+
+from collections import Counter
+from functools import wraps
+import os
+import time
+
+import numpy as np
+
+# Default load cases: name -> (case type, number of steps)
+DEFAULT_CASES = {'DEAD': ('LinStatic', 1),
+                 'LIVE': ('LinStatic', 1),
+                 'WIND': ('LinStatic', 1)}
+
+# Default combinations: name -> (combo type, [(case or combo, scale factor)])
+#   combo type 0 = Linear Additive, 1 = Envelope
+DEFAULT_COMBOS = {'LC1': (0, [('DEAD', 1.2), ('LIVE', 1.6)]),
+                  'LC2': (0, [('DEAD', 0.9), ('WIND', 1.0)]),
+                  'ENV': (1, [('LC1', 1.0), ('LC2', 1.0)])}
+
+# Case types and the result option which controls their output
+STEP_OPTIONS = {'NonlinStatic': 'NLStatic',
+                'LinMultiStep': 'MSStatic',
+                'LinDirHist': 'DirectHist',
+                'NonlinDirHist': 'DirectHist',
+                'LinModHist': 'ModalHist',
+                'NonlinModHist': 'ModalHist'}
+
+# eCase and sub type codes of the case types, as returned by
+# LoadCases.GetTypeOAPI_1, and the LoadCases interface defining their loads
+CASE_TYPES = {'LinStatic': (1, 0, 'StaticLinear'),
+              'NonlinStatic': (2, 0, 'StaticNonlinear'),
+              'LinModHist': (5, 1, 'ModHistLinear'),
+              'LinDirHist': (5, 2, 'DirHistLinear'),
+              'NonlinModHist': (6, 1, 'ModHistNonlinear'),
+              'NonlinDirHist': (6, 2, 'DirHistNonlinear'),
+              'LinMultiStep': (13, 0, 'StaticLinearMultistep')}
+
+# Analysis status codes of Analyze.GetCaseStatus
+NOT_RUN, FINISHED = 1, 4
+
+# Relative capacity of the frame sections used by the steel design ratios
+SECTION_CAPACITY = {'PIPE24': 1.0, 'PIPE30': 1.5, 'PIPE36': 2.2}
+
+# SAP2000 object type codes used by GroupDef.GetAssignments
+POINT, FRAME, AREA = 1, 2, 5
+
+# Database tables: key -> (Results method, [(column, position in the Results
+# output or a constant column name)])
+TABLES = {
+    'Element Forces - Area Shells':
+        ('AreaForceShell', [('Area', 1), ('AreaElem', 2), ('ShellType', 'Shell-Thin'),
+                            ('Joint', 3), ('OutputCase', 4), ('CaseType', None),
+                            ('StepType', 5), ('StepNum', 6)]
+         + list(zip(['F11', 'F22', 'F12', 'FMax', 'FMin', 'FAngle', 'FVM', 'M11', 'M22',
+                     'M12', 'MMax', 'MMin', 'MAngle', 'V13', 'V23', 'VMax', 'VAngle'],
+                    range(7, 24)))),
+    'Element Forces - Frames':
+        ('FrameForce', [('Frame', 1), ('Station', 2), ('OutputCase', 5), ('CaseType', None),
+                        ('StepType', 6), ('StepNum', 7)]
+         + list(zip(['P', 'V2', 'V3', 'T', 'M2', 'M3'], range(8, 14)))
+         + [('FrameElem', 3), ('ElemStation', 4)]),
+    'Element Joint Forces - Frames':
+        ('FrameJointForce', [('Frame', 1), ('Joint', 3), ('OutputCase', 4), ('CaseType', None),
+                             ('StepType', 5), ('StepNum', 6)]
+         + list(zip(['F1', 'F2', 'F3', 'M1', 'M2', 'M3'], range(7, 13)))
+         + [('FrameElem', 2)]),
+    'Joint Reactions':
+        ('JointReact', [('Joint', 1), ('OutputCase', 3), ('CaseType', None), ('StepType', 4),
+                        ('StepNum', 5)]
+         + list(zip(['F1', 'F2', 'F3', 'M1', 'M2', 'M3'], range(6, 12)))),
+    'Base Reactions':
+        ('BaseReact', [('OutputCase', 1), ('CaseType', None), ('StepType', 2), ('StepNum', 3)]
+         + list(zip(['GlobalFX', 'GlobalFY', 'GlobalFZ', 'GlobalMX', 'GlobalMY', 'GlobalMZ',
+                     'GlobalX', 'GlobalY', 'GlobalZ'], range(4, 13)))),
+}
+
+
+def oapi(func):
+    """Count the calls to an OAPI method and apply its simulated latency."""
+    @wraps(func)
+    def wrapper(self, *args, **kwargs):
+        model = self._model
+        name = self._path + func.__name__
+        model.calls[name] += 1
+        start = time.perf_counter()
+        delay = model.latency.get(name, model.default_latency)
+        if delay:
+            time.sleep(delay)
+        try:
+            return func(self, *args, **kwargs)
+        finally:
+            model.call_time[name] += time.perf_counter() - start
+    return wrapper
+
+
+def _tuple(values):
+    return tuple(np.asarray(values).tolist())
+
+
+class _Component:
+    _path = ''
+
+    def __init__(self, model):
+        self._model = model
+
+
+class _File(_Component):
+    _path = 'File.'
+
+    @oapi
+    def OpenFile(self, FileName):
+        self._model.file_name = FileName
+        return 0
+
+    @oapi
+    def Save(self, FileName=""):
+        if FileName:
+            self._model.file_name = FileName
+        return 0
+
+
+class _Setup(_Component):
+    _path = 'Results.Setup.'
+
+    @oapi
+    def DeselectAllCasesAndCombosForOutput(self):
+        self._model.output_cases.clear()
+        return 0
+
+    @oapi
+    def SetCaseSelectedForOutput(self, Name, Selected=True):
+        return self._model._select_output(Name, Selected, self._model.cases)
+
+    @oapi
+    def SetComboSelectedForOutput(self, Name, Selected=True):
+        return self._model._select_output(Name, Selected, self._model.combos)
+
+    @oapi
+    def SetOptionNLStatic(self, Value):
+        self._model.options['NLStatic'] = Value
+        return 0
+
+    @oapi
+    def SetOptionMultiStepStatic(self, Value):
+        self._model.options['MSStatic'] = Value
+        return 0
+
+    @oapi
+    def SetOptionMultiValuedCombo(self, Value):
+        self._model.options['MVCombo'] = Value
+        return 0
+
+    @oapi
+    def SetOptionDirectHist(self, Value):
+        self._model.options['DirectHist'] = Value
+        return 0
+
+    @oapi
+    def SetOptionModalHist(self, Value):
+        self._model.options['ModalHist'] = Value
+        return 0
+
+    @oapi
+    def GetOptionDirectHist(self):
+        return (self._model.options['DirectHist'], 0)
+
+    @oapi
+    def GetOptionModalHist(self):
+        return (self._model.options['ModalHist'], 0)
+
+
+class _Results(_Component):
+    _path = 'Results.'
+
+    def __init__(self, model):
+        super().__init__(model)
+        self.Setup = _Setup(model)
+
+    @oapi
+    def AreaForceShell(self, Name, ItemTypeElm=0):
+        model = self._model
+        areas = model._items(AREA, Name, ItemTypeElm)
+        corners = model.area_points[areas].ravel()
+        nodes = model.area_points.shape[1]
+        ids = np.repeat(areas, nodes) * nodes + np.tile(np.arange(nodes), len(areas))
+        names = model.area_names[np.repeat(areas, nodes)]
+        case, step_type, step_num, values, loc = model._results(ids, 17, AREA)
+        return ((len(case), _tuple(names[loc]), _tuple(names[loc]),
+                 _tuple(model.point_names[corners][loc]), _tuple(case), _tuple(step_type),
+                 _tuple(step_num)) + tuple(_tuple(col) for col in values.T) + (0,))
+
+    @oapi
+    def FrameForce(self, Name, ItemTypeElm=0):
+        model = self._model
+        frames = np.repeat(model._items(FRAME, Name, ItemTypeElm), 3)
+        names = model.frame_names[frames]
+        station = np.tile([0.0, 0.5, 1.0], len(frames) // 3) * model.frame_length[frames]
+        ids = frames * 3 + np.tile([0, 1, 2], len(frames) // 3)
+        case, step_type, step_num, values, loc = model._results(ids, 6, FRAME)
+        return ((len(case), _tuple(names[loc]), _tuple(station[loc]), _tuple(names[loc]),
+                 _tuple(station[loc]), _tuple(case), _tuple(step_type), _tuple(step_num))
+                + tuple(_tuple(col) for col in values.T) + (0,))
+
+    @oapi
+    def FrameJointForce(self, Name, ItemTypeElm=0):
+        model = self._model
+        frames = model._items(FRAME, Name, ItemTypeElm)
+        joints = model.frame_points[frames].ravel()
+        frames = np.repeat(frames, 2)
+        names = model.frame_names[frames]
+        ids = frames * 2 + np.tile([0, 1], len(frames) // 2)
+        case, step_type, step_num, values, loc = model._results(ids, 6, FRAME + 10)
+        return ((len(case), _tuple(names[loc]), _tuple(names[loc]),
+                 _tuple(model.point_names[joints][loc]), _tuple(case), _tuple(step_type),
+                 _tuple(step_num)) + tuple(_tuple(col) for col in values.T) + (0,))
+
+    @oapi
+    def JointReact(self, Name, ItemTypeElm=0):
+        model = self._model
+        points = model._items(POINT, Name, ItemTypeElm)
+        points = points[model.restrained[points]]
+        names = model.point_names[points]
+        case, step_type, step_num, values, loc = model._results(points, 6, POINT)
+        return ((len(case), _tuple(names[loc]), _tuple(names[loc]), _tuple(case),
+                 _tuple(step_type), _tuple(step_num))
+                + tuple(_tuple(col) for col in values.T) + (0,))
+
+    @oapi
+    def BaseReact(self):
+        case, step_type, step_num, values, loc = self._model._results([0], 6, 0)
+        return ((len(case), _tuple(case), _tuple(step_type), _tuple(step_num))
+                + tuple(_tuple(col) for col in values.T) + (0.0, 0.0, 0.0, 0))
+
+
+class _SelectObj(_Component):
+    _path = 'SelectObj.'
+
+    @oapi
+    def ClearSelection(self):
+        for selected in self._model.selected.values():
+            selected[:] = False
+        return 0
+
+    @oapi
+    def All(self, DeSelect=False):
+        for selected in self._model.selected.values():
+            selected[:] = not DeSelect
+        return 0
+
+    @oapi
+    def Group(self, Name, DeSelect=False):
+        model = self._model
+        if Name not in model.groups:
+            return 1
+        for obj_type, idx in model.groups[Name].items():
+            model.selected[obj_type][idx] = not DeSelect
+        return 0
+
+
+class _GroupDef(_Component):
+    _path = 'GroupDef.'
+
+    @oapi
+    def GetNameList(self):
+        names = list(self._model.groups)
+        return (len(names), tuple(names), 0)
+
+    @oapi
+    def GetAssignments(self, Name):
+        model = self._model
+        types = []
+        names = []
+        for obj_type, idx in model.groups[Name].items():
+            types += [obj_type] * len(idx)
+            names += model._names(obj_type)[idx].tolist()
+        return (len(names), tuple(types), tuple(names), 0)
+
+
+class _PointObj(_Component):
+    _path = 'PointObj.'
+
+    @oapi
+    def SetSelected(self, Name, Selected=True, ItemType=0):
+        model = self._model
+        if Name not in model.point_index:
+            return 1
+        model.selected[POINT][model.point_index[Name]] = Selected
+        return 0
+
+    @oapi
+    def GetAllPoints(self, CSys="Global"):
+        model = self._model
+        xyz = model.point_xyz
+        return (len(xyz), _tuple(model.point_names), _tuple(xyz[:, 0]), _tuple(xyz[:, 1]),
+                _tuple(xyz[:, 2]), 0)
+
+    @oapi
+    def GetNameList(self):
+        return (len(self._model.point_names), _tuple(self._model.point_names), 0)
+
+    @oapi
+    def GetCoordCartesian(self, Name, CSys="Global"):
+        if Name not in self._model.point_index:
+            return (0.0, 0.0, 0.0, 1)
+        x, y, z = self._model.point_xyz[self._model.point_index[Name]].tolist()
+        return (x, y, z, 0)
+
+
+class _PointElm(_PointObj):
+    _path = 'PointElm.'
+
+
+class _FrameObj(_Component):
+    _path = 'FrameObj.'
+
+    @oapi
+    def SetSelected(self, Name, Selected=True, ItemType=0):
+        model = self._model
+        if Name not in model.frame_index:
+            return 1
+        model.selected[FRAME][model.frame_index[Name]] = Selected
+        return 0
+
+    @oapi
+    def GetNameList(self):
+        return (len(self._model.frame_names), _tuple(self._model.frame_names), 0)
+
+    @oapi
+    def GetPoints(self, Name):
+        model = self._model
+        pt_i, pt_j = model.point_names[model.frame_points[model.frame_index[Name]]].tolist()
+        return (pt_i, pt_j, 0)
+
+
+    # Object methods address items with ItemType 0 = object, 1 = group,
+    # 2 = selection
+    @oapi
+    def GetSection(self, Name):
+        return (self._model.frame_sections[self._model.frame_index[Name]], '', 0)
+
+    @oapi
+    def SetSection(self, Name, PropName, ItemType=0):
+        model = self._model
+        for idx in model._items(FRAME, Name, (0, 2, 3)[ItemType]):
+            model.frame_sections[idx] = PropName
+        model._unlock()
+        return 0
+
+    @oapi
+    def SetLoadDistributed(self, Name, LoadPat, MyType, Dir, Dist1, Dist2, Val1, Val2,
+                           CSys='Global', RelDist=True, Replace=True, ItemType=0):
+        model = self._model
+        for idx in model._items(FRAME, Name, (0, 2, 3)[ItemType]):
+            loads = model.frame_loads.setdefault(idx, [])
+            if Replace:
+                loads[:] = [load for load in loads if load[0] != LoadPat]
+            loads.append((LoadPat, MyType, CSys, Dir, Dist1, Dist2, Val1, Val2))
+        model._unlock()
+        return 0
+
+    @oapi
+    def GetLoadDistributed(self, Name, ItemType=0):
+        model = self._model
+        frames = sorted(model._items(FRAME, Name, (0, 2, 3)[ItemType]))
+        rows = [(model.frame_names[idx],) + load for idx in frames
+                for load in model.frame_loads.get(idx, ())]
+        cols = list(zip(*rows)) if rows else [()] * 9
+        # FrameName, LoadPat, MyType, CSys, Dir, RD1, RD2, Dist1, Dist2, Val1, Val2
+        return (len(rows), cols[0], cols[1], cols[2], cols[3], cols[4], cols[5], cols[6],
+                cols[5], cols[6], cols[7], cols[8], 0)
+
+    @oapi
+    def GetLoadPoint(self, Name, ItemType=0):
+        return (0, (), (), (), (), (), (), (), (), 0)
+
+
+class _FrameElm(_FrameObj):
+    _path = 'FrameElm.'
+
+
+class _AreaObj(_Component):
+    _path = 'AreaObj.'
+
+    @oapi
+    def SetSelected(self, Name, Selected=True, ItemType=0):
+        model = self._model
+        if Name not in model.area_index:
+            return 1
+        model.selected[AREA][model.area_index[Name]] = Selected
+        return 0
+
+    @oapi
+    def GetNameList(self):
+        return (len(self._model.area_names), _tuple(self._model.area_names), 0)
+
+    @oapi
+    def GetPoints(self, Name):
+        model = self._model
+        points = model.point_names[model.area_points[model.area_index[Name]]]
+        return (len(points), _tuple(points), 0)
+
+
+class _AreaElm(_AreaObj):
+    _path = 'AreaElm.'
+
+
+class _RespCombo(_Component):
+    _path = 'RespCombo.'
+
+    @oapi
+    def GetNameList(self):
+        names = list(self._model.combos)
+        return (len(names), tuple(names), 0)
+
+    @oapi
+    def GetTypeOAPI(self, Name):
+        return (self._model.combos[Name][0], 0)
+
+    @oapi
+    def GetCaseList(self, Name):
+        items = self._model.combos[Name][1]
+        types = tuple(1 if nm in self._model.combos else 0 for nm, sf in items)
+        return (len(items), types, tuple(nm for nm, sf in items),
+                tuple(float(sf) for nm, sf in items), 0)
+
+
+class _CaseLoads(_Component):
+    # LoadCases.StaticLinear, LoadCases.StaticNonlinear, ...
+
+    def __init__(self, model, interface):
+        super().__init__(model)
+        self._path = 'LoadCases.' + interface + '.'
+
+    @oapi
+    def GetLoads(self, Name):
+        loads = self._model.case_loads[Name]
+        return (len(loads), ('Load',) * len(loads), tuple(nm for nm, sf in loads),
+                tuple(float(sf) for nm, sf in loads), 0)
+
+    @oapi
+    def SetLoads(self, Name, NumberLoads, LoadType, LoadName, SF):
+        # Changing a case deletes its results
+        model = self._model
+        model.case_loads[Name] = list(zip(LoadName[:NumberLoads], SF[:NumberLoads]))
+        model.case_status[Name] = NOT_RUN
+        return 0
+
+
+class _LoadCases(_Component):
+    _path = 'LoadCases.'
+
+    def __init__(self, model):
+        super().__init__(model)
+        for case_type, sub_type, interface in CASE_TYPES.values():
+            setattr(self, interface, _CaseLoads(model, interface))
+
+    @oapi
+    def GetNameList(self):
+        names = list(self._model.cases)
+        return (len(names), tuple(names), 0)
+
+    @oapi
+    def GetTypeOAPI_1(self, Name):
+        case_type, sub_type, interface = CASE_TYPES[self._model.cases[Name][0]]
+        return (case_type, sub_type, 1, 0, 0, 0)
+
+
+class _Analyze(_Component):
+    _path = 'Analyze.'
+
+    @oapi
+    def GetCaseStatus(self):
+        names = list(self._model.cases)
+        return (len(names), tuple(names), tuple(self._model.case_status[nm] for nm in names), 0)
+
+    @oapi
+    def RunAnalysis(self):
+        model = self._model
+        model.case_status.update({nm: FINISHED for nm in model.cases})
+        # SAP2000 saves the model before running it
+        if model.file_name and os.path.exists(model.file_name):
+            stat = os.stat(model.file_name)
+            os.utime(model.file_name, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1000000))
+        return 0
+
+
+class _DatabaseTables(_Component):
+    _path = 'DatabaseTables.'
+
+    def __init__(self, model):
+        super().__init__(model)
+        self.cases = []
+        self.combos = []
+        self.options = {}
+
+    @oapi
+    def SetLoadCasesSelectedForDisplay(self, Names):
+        self.cases = [nm for nm in Names if nm in self._model.cases]
+        return 0
+
+    @oapi
+    def SetLoadCombinationsSelectedForDisplay(self, Names):
+        self.combos = [nm for nm in Names if nm in self._model.combos]
+        return 0
+
+    @oapi
+    def SetTableOutputOptionsForDisplay(self, BaseReactionGX, BaseReactionGY, BaseReactionGZ,
+                                        IsAllModes, StartMode, EndMode, IsAllBucklingModes,
+                                        StartBucklingMode, EndBucklingMode, MultistepStatic,
+                                        NonlinearStatic, ModalHistory, DirectHistory, Combo,
+                                        *args):
+        self.options = {'MSStatic': MultistepStatic, 'NLStatic': NonlinearStatic,
+                        'ModalHist': ModalHistory, 'DirectHist': DirectHistory,
+                        'MVCombo': Combo}
+        return 0
+
+    @oapi
+    def GetTableForDisplayArray(self, TableKey, FieldKeyList, GroupName):
+        model = self._model
+        if TableKey == 'Objects And Elements - Joints':
+            fields = ('ElmJt', 'ObjType', 'ObjName', 'GlobalX', 'GlobalY', 'GlobalZ')
+            names = model.point_names.tolist()
+            data = [names, ['Joint'] * len(names), names] + \
+                [[repr(val) for val in col] for col in model.point_xyz.T.tolist()]
+            records = [val for row in zip(*data) for val in row]
+            return (FieldKeyList, 1, fields, len(names), tuple(records), 0)
+        if TableKey in ('Connectivity - Frame', 'Objects And Elements - Frames'):
+            # Frame objects are not meshed, each is a single element
+            names = model.frame_names.tolist()
+            joints = model.point_names[model.frame_points].T.tolist()
+            if TableKey == 'Connectivity - Frame':
+                fields = ('Frame', 'JointI', 'JointJ', 'Length')
+                data = [names] + joints + [[repr(val) for val in model.frame_length.tolist()]]
+            else:
+                fields = ('FrameElem', 'FrameObj', 'ElemJtI', 'ElemJtJ')
+                data = [names, names] + joints
+            records = [val for row in zip(*data) for val in row]
+            return (FieldKeyList, 1, fields, len(names), tuple(records), 0)
+        if TableKey in ('Connectivity - Area', 'Objects And Elements - Areas'):
+            names = model.area_names.tolist()
+            nodes = model.area_points.shape[1]
+            joints = model.point_names[model.area_points].T.tolist()
+            if TableKey == 'Connectivity - Area':
+                fields = ('Area', 'NumJoints') + tuple('Joint%d' % (k + 1) for k in range(nodes))
+                data = [names, [str(nodes)] * len(names)] + joints
+            else:
+                fields = ('AreaElem', 'AreaObj') + tuple('ElemJt%d' % (k + 1) for k in range(nodes))
+                data = [names, names] + joints
+            records = [val for row in zip(*data) for val in row]
+            return (FieldKeyList, 1, fields, len(names), tuple(records), 0)
+        if TableKey == 'Frame Section Assignments':
+            fields = ('Frame', 'SectionType', 'AutoSelect', 'AnalSect', 'MatProp')
+            names = model.frame_names.tolist()
+            data = [names, ['Pipe'] * len(names), ['N.A.'] * len(names),
+                    model.frame_sections.tolist(), ['A992Fy50'] * len(names)]
+            records = [val for row in zip(*data) for val in row]
+            return (FieldKeyList, 1, fields, len(names), tuple(records), 0)
+        if TableKey not in TABLES:
+            return (FieldKeyList, 1, (), 0, (), 1)
+        method, columns = TABLES[TableKey]
+        results = getattr(_Results, method).__wrapped__
+
+        # Evaluate the Results method with the display cases and options
+        saved = (model.output_cases, model.options)
+        model.output_cases = self.cases + self.combos
+        model.options = dict(model.options, **self.options)
+        try:
+            if method == 'BaseReact':
+                output = results(model.Results)
+            else:
+                output = results(model.Results, 'ALL' if GroupName == 'All' else GroupName, 2)
+        finally:
+            model.output_cases, model.options = saved
+
+        nrows = output[0]
+        case_pos = dict(columns)['OutputCase']
+        data = []
+        for column, pos in columns:
+            if column == 'CaseType':
+                values = ['Combination' if nm in model.combos else model.cases[nm][0]
+                          for nm in output[case_pos]]
+            elif isinstance(pos, str):
+                values = [pos] * nrows
+            elif np.ndim(output[pos]) == 0:
+                values = [repr(output[pos])] * nrows
+            else:
+                values = [val if isinstance(val, str) else repr(val) for val in output[pos]]
+            data.append(values)
+
+        # Step columns are only included when a case reports steps
+        fields = [column for column, pos in columns]
+        if not any(val for val in data[fields.index('StepType')]):
+            keep = [k for k, column in enumerate(fields) if column not in ('StepType', 'StepNum')]
+            fields = [fields[k] for k in keep]
+            data = [data[k] for k in keep]
+
+        records = [val for row in zip(*data) for val in row]
+        return (FieldKeyList, 1, tuple(fields), nrows, tuple(records), 0)
+
+
+class _DesignSteel(_Component):
+    _path = 'DesignSteel.'
+
+    @oapi
+    def GetResultsAvailable(self):
+        return self._model.design_available
+
+    @oapi
+    def StartDesign(self):
+        # Only the selected frames are designed when any are selected
+        model = self._model
+        selected = model.selected[FRAME]
+        model.designed |= selected if selected.any() else True
+        model.design_available = True
+        return 0
+
+    @oapi
+    def GetComboStrength(self):
+        names = list(self._model.design_combos)
+        return (len(names), tuple(names), 0)
+
+    @oapi
+    def GetSummaryResults(self, Name="", ItemType=0):
+        model = self._model
+        if not model.design_available:
+            return (0, (), (), (), (), (), (), (), 1)
+        if ItemType == 2:
+            frames = np.nonzero(model.selected[FRAME])[0]
+        elif ItemType == 1:
+            frames = model.groups[Name].get(FRAME, np.empty(0, np.int64))
+        else:
+            frames = np.array([model.frame_index[Name]])
+        frames = frames[model.designed[frames]]
+        load = np.array([sum(abs(load[-1]) for load in model.frame_loads.get(idx, ()))
+                         for idx in frames])
+        capacity = np.array([SECTION_CAPACITY.get(prop, 1.0) for prop in model.frame_sections[frames]])
+        ratio = (0.5 + 0.45 * np.sin(1.7 * frames + 0.3)) * (1 + 0.1 * load) / capacity
+        n = len(frames)
+        return (n, _tuple(model.frame_names[frames]), _tuple(ratio), (1,) * n,
+                _tuple(model.frame_length[frames] / 2), ('LC1',) * n, ('',) * n, ('',) * n, 0)
+
+
+class FakeSapModel:
+    """
+    In-memory stand-in for the SapModel object of the SAP2000 OAPI.
+
+    The model is a rectangular shell deck of nx x ny area objects in the XY
+    plane with piles hanging below some of its joints. Each pile is a chain
+    of frame objects restrained at the tip. Object and element names are
+    the same, as for a model without automatic meshing.
+
+    Variable Definitions:
+      nx, ny          = Number of deck areas in the X and Y directions
+      piles           = Number of piles (spread over the deck joints)
+      pile_segments   = Number of frame objects per pile
+      spacing         = Deck joint spacing
+      segment_length  = Length of each pile segment
+      cases           = {name: (case type, number of steps)}. Case types in
+                        STEP_OPTIONS report their steps according to the
+                        matching result option (1 envelope, 2 step-by-step,
+                        3 last step). Default DEFAULT_CASES.
+      combos          = {name: (combo type, [(case or combo, factor)])}.
+                        Type 0 is linear additive and type 1 is an
+                        envelope. Combinations with multi-valued members
+                        report Max and Min rows. Default DEFAULT_COMBOS.
+      latency         = {"Results.AreaForceShell": seconds, ...} simulated
+                        delay per OAPI method
+      default_latency = Simulated delay of every other OAPI method
+      file_name       = Path returned by GetModelFileName
+
+    Results are smooth deterministic functions of the element, node, field
+    and case, independent of which other objects are selected, so linear
+    combinations of cases match combo results exactly.
+    Each case applies the load pattern of the same name with a scale factor
+    of 1 and its results scale with the total factor of its loads. Setting
+    the loads of a case (LoadCases.StaticLinear.SetLoads, ...) marks it as
+    not run until Analyze.RunAnalysis is called, and editing objects
+    (FrameObj.SetSection, ...) marks every case as not run. RunAnalysis
+    updates the modification time of a saved model file, as SAP2000 saves
+    the model before running it.
+    Call counts and cumulative times per method are kept in calls and
+    call_time.
+    """
+
+    def __init__(self, nx=10, ny=10, piles=4, pile_segments=4, spacing=10.0,
+                 segment_length=5.0, cases=None, combos=None, latency=None,
+                 default_latency=0.0, file_name=""):
+        self.calls = Counter()
+        self.call_time = Counter()
+        self.latency = dict(latency or {})
+        self.default_latency = default_latency
+        self.file_name = file_name
+        self.units = 4
+        self.options = {'NLStatic': 1, 'MSStatic': 1, 'MVCombo': 1,
+                        'DirectHist': 1, 'ModalHist': 1}
+        self.cases = dict(DEFAULT_CASES if cases is None else cases)
+        self.combos = dict(DEFAULT_COMBOS if combos is None else combos)
+        self.output_cases = []
+        self.case_loads = {nm: [(nm, 1.0)] for nm in self.cases}
+        self.case_status = {nm: FINISHED for nm in self.cases}
+        self.design_available = False
+        self.design_combos = [nm for nm, (typ, items) in self.combos.items() if typ == 0]
+        self._case_ids = {nm: i for i, nm in enumerate(list(self.cases) + list(self.combos))}
+        self._build_mesh(nx, ny, piles, pile_segments, spacing, segment_length)
+
+        self.File = _File(self)
+        self.Results = _Results(self)
+        self.SelectObj = _SelectObj(self)
+        self.GroupDef = _GroupDef(self)
+        self.PointObj = _PointObj(self)
+        self.PointElm = _PointElm(self)
+        self.FrameObj = _FrameObj(self)
+        self.FrameElm = _FrameElm(self)
+        self.AreaObj = _AreaObj(self)
+        self.AreaElm = _AreaElm(self)
+        self.RespCombo = _RespCombo(self)
+        self.LoadCases = _LoadCases(self)
+        self.Analyze = _Analyze(self)
+        self.DesignSteel = _DesignSteel(self)
+        self.DatabaseTables = _DatabaseTables(self)
+
+    # ---- OAPI methods of SapModel ----
+
+    def GetModelFileName(self, IncludePath=True):
+        self.calls['GetModelFileName'] += 1
+        return self.file_name
+
+    def SetPresentUnits(self, Units):
+        self.calls['SetPresentUnits'] += 1
+        self.units = Units
+        return 0
+
+    def GetPresentUnits(self):
+        self.calls['GetPresentUnits'] += 1
+        return self.units
+
+    # ---- Synthetic model ----
+
+    def _build_mesh(self, nx, ny, piles, pile_segments, spacing, segment_length):
+        # Deck joints, numbered row by row
+        ix, iy = np.meshgrid(np.arange(nx + 1), np.arange(ny + 1), indexing='ij')
+        deck_xyz = np.column_stack([ix.ravel() * spacing, iy.ravel() * spacing,
+                                    np.zeros(ix.size)])
+        jt = lambda i, j: i * (ny + 1) + j
+
+        # Deck areas, corners counter-clockwise
+        ax, ay = np.meshgrid(np.arange(nx), np.arange(ny), indexing='ij')
+        ax, ay = ax.ravel(), ay.ravel()
+        self.area_points = np.column_stack([jt(ax, ay), jt(ax + 1, ay),
+                                            jt(ax + 1, ay + 1), jt(ax, ay + 1)])
+
+        # Piles under evenly spread deck joints
+        heads = np.linspace(0, len(deck_xyz) - 1, piles).astype(np.int64) if piles else []
+        pile_xyz = []
+        frame_points = []
+        tips = []
+        next_jt = len(deck_xyz)
+        for head in heads:
+            top = head
+            for seg in range(1, pile_segments + 1):
+                pile_xyz.append(deck_xyz[head] - [0.0, 0.0, seg * segment_length])
+                frame_points.append([top, next_jt])
+                top = next_jt
+                next_jt += 1
+            tips.append(top)
+
+        self.point_xyz = np.vstack([deck_xyz] + ([np.array(pile_xyz)] if pile_xyz else []))
+        self.frame_points = np.array(frame_points, dtype=np.int64).reshape(-1, 2)
+        self.frame_length = np.full(len(self.frame_points), float(segment_length))
+        self.frame_sections = np.full(len(self.frame_points), 'PIPE24', dtype=object)
+        self.frame_loads = {}
+        self.designed = np.zeros(len(self.frame_points), dtype=bool)
+        self.restrained = np.zeros(len(self.point_xyz), dtype=bool)
+        self.restrained[tips] = True
+
+        self.point_names = np.array([str(i + 1) for i in range(len(self.point_xyz))], dtype=object)
+        self.frame_names = np.array([str(i + 1) for i in range(len(self.frame_points))], dtype=object)
+        self.area_names = np.array([str(i + 1) for i in range(len(self.area_points))], dtype=object)
+        self.point_index = {nm: i for i, nm in enumerate(self.point_names)}
+        self.frame_index = {nm: i for i, nm in enumerate(self.frame_names)}
+        self.area_index = {nm: i for i, nm in enumerate(self.area_names)}
+
+        self.selected = {POINT: np.zeros(len(self.point_names), dtype=bool),
+                         FRAME: np.zeros(len(self.frame_names), dtype=bool),
+                         AREA: np.zeros(len(self.area_names), dtype=bool)}
+        self.groups = {'ALL': {POINT: np.arange(len(self.point_names)),
+                               FRAME: np.arange(len(self.frame_names)),
+                               AREA: np.arange(len(self.area_names))},
+                       'Wharf Deck': {AREA: np.arange(len(self.area_names))},
+                       'Piles': {FRAME: np.arange(len(self.frame_names))},
+                       'Pile Tips': {POINT: np.nonzero(self.restrained)[0]}}
+
+    def _unlock(self):
+        # Editing the model deletes its analysis and design results
+        self.case_status = {nm: NOT_RUN for nm in self.cases}
+        self.design_available = False
+        self.designed[:] = False
+
+    def _names(self, obj_type):
+        return {POINT: self.point_names, FRAME: self.frame_names, AREA: self.area_names}[obj_type]
+
+    def _index(self, obj_type):
+        return {POINT: self.point_index, FRAME: self.frame_index, AREA: self.area_index}[obj_type]
+
+    def _items(self, obj_type, Name, ItemTypeElm):
+        # Indices of the objects addressed by a Results call
+        #   ItemTypeElm 0 = object, 1 = element, 2 = group, 3 = selection
+        if ItemTypeElm in (0, 1):
+            return np.array([self._index(obj_type)[Name]], dtype=np.int64)
+        if ItemTypeElm == 2:
+            return np.asarray(self.groups[Name].get(obj_type, []), dtype=np.int64)
+        return np.nonzero(self.selected[obj_type])[0]
+
+    def _select_output(self, Name, Selected, definitions):
+        if Name not in definitions:
+            return 1
+        if Selected and Name not in self.output_cases:
+            self.output_cases.append(Name)
+        elif not Selected and Name in self.output_cases:
+            self.output_cases.remove(Name)
+        return 0
+
+    # ---- Synthetic results ----
+
+    def _values(self, ids, nfields, kind, name):
+        # Unit results of a single step load case at each location id,
+        # scaled by the total scale factor of the loads of the case
+        loc = np.asarray(ids, dtype=np.float64)[:, None]
+        fld = np.arange(nfields, dtype=np.float64)[None, :]
+        case = self._case_ids[name]
+        scale = sum(sf for nm, sf in self.case_loads[name])
+        return 10.0 * scale * np.sin(0.37 * loc + 2.1 * fld + 0.9 * case + 0.7 * kind + 0.5)
+
+    def _combo_range(self, ids, nfields, kind, name):
+        # (max, min, multi-valued) results of a case or combination
+        if name not in self.combos:
+            rows = self._case_rows(ids, nfields, kind, name)
+            if len(rows) == 1:
+                return rows[0][2], rows[0][2], False
+            return (np.max([vals for typ, num, vals in rows], axis=0),
+                    np.min([vals for typ, num, vals in rows], axis=0), True)
+        combo_type, items = self.combos[name]
+        upper, lower, multi = [], [], combo_type != 0
+        for item, sf in items:
+            item_max, item_min, item_multi = self._combo_range(ids, nfields, kind, item)
+            upper.append(np.maximum(sf * item_max, sf * item_min))
+            lower.append(np.minimum(sf * item_max, sf * item_min))
+            multi = multi or item_multi
+        if combo_type == 1:
+            return np.max(upper, axis=0), np.min(lower, axis=0), True
+        return np.sum(upper, axis=0), np.sum(lower, axis=0), multi
+
+    def _case_rows(self, ids, nfields, kind, name):
+        # [(StepType, StepNum, values)] reported for one case or combination
+        if name in self.combos:
+            upper, lower, multi = self._combo_range(ids, nfields, kind, name)
+            if multi:
+                return [('Max', 0.0, upper), ('Min', 0.0, lower)]
+            return [('', 0.0, upper)]
+
+        case_type, steps = self.cases[name]
+        values = self._values(ids, nfields, kind, name)
+        if case_type not in STEP_OPTIONS or steps <= 1:
+            return [('', 0.0, values)]
+
+        step = np.arange(1, steps + 1)
+        if case_type.endswith('Hist'):
+            factors = np.sin(2 * np.pi * step / steps * 3)
+        else:
+            factors = step / steps
+        option = self.options[STEP_OPTIONS[case_type]]
+        if option == 2:
+            return [('Step By Step', float(s), f * values) for s, f in zip(step, factors)]
+        if option == 3:
+            return [('Last Step', float(steps), factors[-1] * values)]
+        return [('Max', 0.0, np.maximum(factors.max() * values, factors.min() * values)),
+                ('Min', 0.0, np.minimum(factors.max() * values, factors.min() * values))]
+
+    def _results(self, ids, nfields, kind):
+        # Rows for every case selected for output, one row per location id
+        # and step
+        nloc = len(ids)
+        case, step_type, step_num, values, loc = [], [], [], [], []
+        for name in self.output_cases:
+            for typ, num, vals in self._case_rows(ids, nfields, kind, name):
+                case += [name] * nloc
+                step_type += [typ] * nloc
+                step_num.append(np.full(nloc, num))
+                values.append(vals)
+                loc.append(np.arange(nloc))
+        if not values:
+            return [], [], np.empty(0), np.empty((0, nfields)), np.empty(0, np.int64)
+        return (case, step_type, np.concatenate(step_num), np.vstack(values),
+                np.concatenate(loc))
+
+
+class FakeSapObject:
+    """Stand-in for the SapObject returned by initialize.SAPModel. Keyword
+    arguments are passed to FakeSapModel."""
+
+    def __init__(self, **kwargs):
+        self.SapModel = FakeSapModel(**kwargs)
+        self.running = True
+
+    def ApplicationStart(self, Units=4, Visible=True, FileName=""):
+        self.running = True
+        return 0
+
+    def ApplicationExit(self, FileSave=False):
+        self.running = False
+        return 0
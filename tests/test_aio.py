@@ -0,0 +1,62 @@
+import asyncio
+import contextlib
+import threading
+import time
+
+import numpy as np
+
+from sap2k import AreaForceShell, AsyncSession
+from sap2k.testing import FakeSapModel
+
+
+def test_calls_run_in_order_on_one_worker_thread():
+    model = FakeSapModel(nx=4, ny=4)
+
+    async def main():
+        async with AsyncSession(model=model) as session:
+            threads = await asyncio.gather(*[session.call(lambda m: threading.get_ident())
+                                             for _ in range(5)])
+            shells, react = await asyncio.gather(session.area_force_shell('DEAD', ['Wharf Deck']),
+                                                 session.joint_react('DEAD', ['Pile Tips']))
+            return set(threads), session.thread_id, shells, react
+
+    threads, worker, shells, react = asyncio.run(main())
+    assert threads == {worker} and worker != threading.get_ident()
+    np.testing.assert_array_equal(shells['M11'], AreaForceShell(model, 'DEAD', ['Wharf Deck'])['M11'])
+    assert react.nrows == 4
+
+
+def test_processing_overlaps_extraction():
+    model = FakeSapModel(nx=4, ny=4, latency={'Results.AreaForceShell': 0.1})
+    cases = ['DEAD', 'LIVE', 'WIND']
+
+    async def main():
+        seen = []
+        async with AsyncSession(model=model) as session:
+            start = time.perf_counter()
+            async for case, table in session.iter_cases(AreaForceShell, cases, ['Wharf Deck']):
+                time.sleep(0.1)     # post-processing of this case
+                seen.append(case)
+            return seen, time.perf_counter() - start
+
+    seen, elapsed = asyncio.run(main())
+    assert seen == cases
+    # Serial extraction and processing would take 0.6 s
+    assert elapsed < 0.5
+
+
+def test_breaking_out_cancels_queued_cases():
+    model = FakeSapModel(nx=2, ny=2, latency={'Results.AreaForceShell': 0.05})
+    cases = ['DEAD', 'LIVE', 'WIND', 'DEAD', 'LIVE']
+
+    async def main():
+        async with AsyncSession(model=model) as session:
+            async with contextlib.aclosing(session.iter_cases(AreaForceShell, cases, ['Wharf Deck'],
+                                                              prefetch=3)) as tables:
+                async for case, table in tables:
+                    break
+            await session.call(lambda m: None)
+        return model.calls['Results.AreaForceShell']
+
+    # The first case and the one running when the loop was left, not all five
+    assert asyncio.run(main()) <= 2
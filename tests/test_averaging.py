@@ -0,0 +1,97 @@
+import tracemalloc
+
+import numpy as np
+
+from sap2k import AreaForceShell, AreaForceShellIter, IncidenceOperator, Shell_Stress_Avg
+from sap2k.functions.averaging import nodal_average
+from sap2k.functions.coords import PointCoords
+from sap2k.functions.results import ResultTable
+from sap2k.functions.spatial import SpatialIndex
+from sap2k.testing import FakeSapModel
+
+KEYS = ['PointElm', 'LoadCase', 'StepType', 'StepNum']
+
+
+def rows(table):
+    return sorted(zip(table['PointElm'], table['LoadCase'], table['StepType'], table['StepNum'],
+                      table['M11']))
+
+
+def test_unweighted_operator_matches_nodal_average():
+    model = FakeSapModel(nx=3, ny=2, cases={'NL': ('NonlinStatic', 4), 'DEAD': ('LinStatic', 1)},
+                         combos={})
+    table = AreaForceShell(model, ['NL', 'DEAD'], ['Wharf Deck'], NLStatic=2)
+    op = IncidenceOperator.from_model(model, Weights=None)
+    assert op.shape == (12, 24)
+
+    averaged = op.average(table, ['M11', 'M22'])
+    expected = nodal_average(table, ['M11', 'M22'])
+    assert [row[:4] for row in rows(averaged)] == [row[:4] for row in rows(expected)]
+    np.testing.assert_allclose([row[4] for row in rows(averaged)],
+                               [row[4] for row in rows(expected)])
+
+    streamed = op.average(AreaForceShellIter(model, ['NL', 'DEAD'], ['Wharf Deck'], NLStatic=2,
+                                             ChunkRows=10), ['M11'])
+    np.testing.assert_allclose([row[4] for row in rows(streamed)],
+                               [row[4] for row in rows(expected)])
+
+
+def test_area_weights_at_mesh_transition():
+    # A 2 x 1 element next to a 1 x 1 element, sharing joints 2 and 5
+    xyz = [(0, 0, 0), (2, 0, 0), (3, 0, 0), (0, 1, 0), (2, 1, 0), (3, 1, 0)]
+    coords = PointCoords(['1', '2', '3', '4', '5', '6'], np.array(xyz, dtype=float))
+    index = SpatialIndex(coords, [[], []], [['A', 'B'], [0, 1, 4, 3, 1, 2, 5, 4], [0, 4]])
+    np.testing.assert_allclose(IncidenceOperator.element_areas(index), [2.0, 1.0])
+
+    table = ResultTable({'Elm': ['A'] * 4 + ['B'] * 4,
+                         'PointElm': ['1', '2', '5', '4', '2', '3', '6', '5'],
+                         'LoadCase': ['DEAD'] * 8, 'StepType': [''] * 8,
+                         'StepNum': np.zeros(8), 'M11': [3.0] * 4 + [6.0] * 4})
+    weighted = IncidenceOperator(index).average(table, ['M11'])
+    plain = IncidenceOperator(index, Weights=None).average(table, ['M11'])
+    at = lambda tbl, jt: tbl['M11'][tbl['PointElm'] == jt][0]
+    assert at(weighted, '2') == 4.0 and at(plain, '2') == 4.5
+    assert at(weighted, '1') == 3.0 and at(weighted, '6') == 6.0
+
+    # Joint values returned at the element corners, elements outside the mesh NaN
+    outside = table.with_columns(Elm=['A'] * 4 + ['C'] * 4)
+    smoothed = IncidenceOperator(index).smooth(outside, ['M11'])
+    np.testing.assert_array_equal(smoothed['M11'][:4], [3.0] * 4)
+    assert np.isnan(smoothed['M11'][4:]).all()
+
+
+def test_shell_stress_avg():
+    model = FakeSapModel(nx=2, ny=2)
+    table = AreaForceShell(model, ['DEAD', 'LC1'], ['Wharf Deck'])
+    averaged = Shell_Stress_Avg(table, KEYS, ['M11', 'M22'])
+    assert list(averaged) == KEYS + ['Elm', 'M11', 'M22']
+    assert averaged.nrows == table.nrows
+    with_operator = Shell_Stress_Avg(table, KEYS, 'M11',
+                                     Operator=IncidenceOperator.from_model(model))
+    np.testing.assert_allclose(with_operator['M11'], averaged['M11'])
+
+    frame = Shell_Stress_Avg(table.to_pandas(), KEYS, 'M11')
+    np.testing.assert_allclose(frame['M11'].to_numpy(), averaged['M11'])
+
+
+def test_partial_group_with_many_steps():
+    model = FakeSapModel(nx=30, ny=20, cases={'NL': ('NonlinStatic', 500)}, combos={})
+    model.groups['Strip'] = {5: np.arange(6)}
+    table = AreaForceShell(model, 'NL', ['Strip'], NLStatic=2, Backend='results')
+    op = IncidenceOperator.from_model(model, Weights=None)
+    assert table.nrows == 6 * 4 * 500
+
+    # Memory follows the rows present, not every corner of the mesh for
+    # every step (2400 corners x 500 steps x 3 values = 29 MB)
+    tracemalloc.start()
+    averaged = op.average(table, ['M11', 'M22'])
+    smoothed = op.smooth(table, ['M11'])
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    assert peak < 5e6
+
+    expected = nodal_average(table, ['M11', 'M22'])
+    assert averaged.nrows == expected.nrows
+    np.testing.assert_allclose([row[4] for row in rows(averaged)],
+                               [row[4] for row in rows(expected)])
+    np.testing.assert_allclose(smoothed['M11'], Shell_Stress_Avg(table, KEYS, 'M11')['M11'])
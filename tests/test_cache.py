@@ -0,0 +1,111 @@
+import numpy as np
+
+from sap2k import AreaForceShell, ResultCache, base_reactions
+from sap2k.functions.cache import model_state
+from sap2k.testing import FakeSapModel
+
+CASES = ['DEAD', 'LIVE', 'WIND', 'LC1']
+
+
+def saved_model(tmp_path):
+    path = tmp_path / 'wharf.sdb'
+    path.write_bytes(b'model')
+    return FakeSapModel(nx=3, ny=2, file_name=str(path))
+
+
+def test_only_changed_cases_are_extracted(tmp_path):
+    model = saved_model(tmp_path)
+    cache = ResultCache(str(tmp_path / 'cache'), PerCase=True)
+    first = AreaForceShell(model, CASES, ['Wharf Deck'], Cache=cache, Backend='results')
+    assert model.calls['Results.AreaForceShell'] == 1
+
+    # Unchanged cases are read from the cache
+    again = AreaForceShell(model, CASES, ['Wharf Deck'], Cache=cache, Backend='results')
+    assert model.calls['Results.AreaForceShell'] == 1
+    np.testing.assert_array_equal(again['M11'], first['M11'])
+    assert list(again['LoadCase'].unique()) == CASES
+
+    # Doubling WIND invalidates it and LC2, which uses it, but not LC1
+    model.LoadCases.StaticLinear.SetLoads('WIND', 1, ['Load'], ['WIND'], [2.0])
+    model.Analyze.RunAnalysis()
+    model.Results.Setup.DeselectAllCasesAndCombosForOutput()
+    after = AreaForceShell(model, CASES + ['LC2'], ['Wharf Deck'], Cache=cache,
+                           Backend='results')
+    assert model.calls['Results.AreaForceShell'] == 2
+    assert model.output_cases == ['WIND', 'LC2']
+    wind = lambda tbl: tbl['M11'][tbl['LoadCase'] == 'WIND']
+    np.testing.assert_allclose(wind(after), 2 * wind(first))
+    lc1 = lambda tbl: tbl['M11'][tbl['LoadCase'] == 'LC1']
+    np.testing.assert_array_equal(lc1(after), lc1(first))
+    assert after['NumberResults'] == after.nrows
+
+
+def test_cases_without_results_are_not_cached(tmp_path):
+    model = saved_model(tmp_path)
+    cache = ResultCache(str(tmp_path / 'cache'), PerCase=True)
+    model.case_status['LIVE'] = 1
+    keys = cache.case_keys(model, 'BaseReact', ['DEAD', 'LIVE', 'LC1'])
+    assert keys['DEAD'] is not None and keys['LIVE'] is None and keys['LC1'] is None
+
+    base_reactions(model, ['DEAD', 'LIVE'], Cache=cache, Backend='results')
+    base_reactions(model, ['DEAD', 'LIVE'], Cache=cache, Backend='results')
+    assert model.calls['Results.BaseReact'] == 2
+    assert model.output_cases == ['LIVE']
+
+
+def test_model_edits_invalidate_every_case(tmp_path):
+    model = saved_model(tmp_path)
+    cache = ResultCache(str(tmp_path / 'cache'), PerCase=True)
+    AreaForceShell(model, CASES, ['Wharf Deck'], Cache=cache, Backend='results')
+    AreaForceShell(model, CASES, ['Wharf Deck'], Cache=cache, Backend='results')
+    assert model.calls['Results.AreaForceShell'] == 1
+
+    # A section edit deletes the results of every case, which are then run
+    # again with unchanged case definitions
+    model.FrameObj.SetSection(model.frame_names[0], 'PIPE36')
+    model.Analyze.RunAnalysis()
+    model.Results.Setup.DeselectAllCasesAndCombosForOutput()
+    AreaForceShell(model, CASES, ['Wharf Deck'], Cache=cache, Backend='results')
+    assert model.calls['Results.AreaForceShell'] == 2
+    assert sorted(model.output_cases) == sorted(CASES)
+
+    # The model state is read once per model file
+    tables = model.calls['DatabaseTables.GetTableForDisplayArray']
+    AreaForceShell(model, CASES, ['Wharf Deck'], Cache=cache, Backend='results')
+    assert model.calls['Results.AreaForceShell'] == 2
+    assert model.calls['DatabaseTables.GetTableForDisplayArray'] == tables
+
+
+def test_unsaved_model_state_is_not_kept():
+    model = FakeSapModel(nx=2, ny=2)
+    model.SetPresentUnits(6)
+    before = model_state(model)
+    assert model.units == 6
+    model.FrameObj.SetSection(model.frame_names[0], 'PIPE36')
+    assert model_state(model) != before
+
+
+def test_table_results_are_not_cached(tmp_path):
+    model = saved_model(tmp_path)
+    cache = ResultCache(str(tmp_path / 'cache'))
+    base_reactions(model, ['DEAD'], Cache=cache, Backend='tables')
+    assert cache.entries() == []
+    exact = base_reactions(model, ['DEAD'], Cache=cache, Backend='results')
+    assert model.calls['Results.BaseReact'] == 1
+
+    # Full precision results serve any backend
+    tables = model.calls['DatabaseTables.GetTableForDisplayArray']
+    again = base_reactions(model, ['DEAD'], Cache=cache, Backend='tables')
+    assert model.calls['DatabaseTables.GetTableForDisplayArray'] == tables
+    np.testing.assert_array_equal(again['Fx'], exact['Fx'])
+
+
+def test_truncated_entry_is_a_miss(tmp_path):
+    model = saved_model(tmp_path)
+    cache = ResultCache(str(tmp_path / 'cache'))
+    base_reactions(model, ['DEAD'], Cache=cache)
+    path = cache.entries()[0][0]
+    with open(path, 'r+b') as file:
+        file.truncate(40)
+    base_reactions(model, ['DEAD'], Cache=cache)
+    assert model.calls['Results.BaseReact'] == 2
@@ -0,0 +1,31 @@
+import numpy as np
+import pytest
+
+from sap2k import AreaForceShell, JointReact, LocalCombos
+from sap2k.functions.combos import read_combos, evaluate_combos
+from sap2k.testing import FakeSapModel
+
+COMBOS = {'LC1': (0, [('DEAD', 1.2), ('LIVE', 1.6)]),
+          'LC2': (0, [('LC1', 1.0), ('WIND', -0.5)]),
+          'ENV': (1, [('LC1', 1.0), ('LC2', 1.0), ('DEAD', 1.0)]),
+          'LIN_ENV': (0, [('ENV', 2.0), ('WIND', 1.0)])}
+
+
+def test_local_combos_match_model():
+    model = FakeSapModel(nx=3, ny=3, combos=COMBOS)
+    local = LocalCombos(AreaForceShell, model, list(COMBOS), ['Wharf Deck'])
+    sap = AreaForceShell(model, list(COMBOS), ['Wharf Deck'])
+    assert list(local['LoadCase']) == list(sap['LoadCase'])
+    assert list(local['StepType']) == list(sap['StepType'])
+    assert list(local['PointElm']) == list(sap['PointElm'])
+    for fldnm in ('F11', 'M22', 'V13'):
+        np.testing.assert_allclose(local[fldnm], sap[fldnm], atol=1e-12)
+    assert 'FMax' not in local
+
+
+def test_step_by_step_cases_rejected():
+    model = FakeSapModel(nx=1, ny=1, cases={'NL': ('NonlinStatic', 3)},
+                         combos={'C': (0, [('NL', 1.0)])})
+    table = JointReact(model, 'NL', ['Pile Tips'], NLStatic=2)
+    with pytest.raises(ValueError):
+        evaluate_combos(table, read_combos(model))
@@ -0,0 +1,37 @@
+import numpy as np
+
+from sap2k import FrameJtForces
+from sap2k.functions.coords import PointCoords, clear_coord_cache, point_coords
+from sap2k.functions.results import ResultTable
+from sap2k.testing import FakeSapModel
+
+
+def test_point_coords_cached_and_units_restored():
+    clear_coord_cache()
+    model = FakeSapModel(nx=2, ny=2)
+    model.SetPresentUnits(6)
+    coords = point_coords(model, 4)
+    assert model.units == 6 and coords.Units == 4
+    assert point_coords(model, 4) is coords
+    assert model.calls['PointObj.GetAllPoints'] == 1
+    np.testing.assert_array_equal(coords.xyz, model.point_xyz)
+
+
+def test_join_and_bulk_read_of_mesh_joints():
+    model = FakeSapModel(nx=2, ny=2)
+    # Index holding only the first four points, the others are read in bulk
+    coords = PointCoords(model.point_names[:4], model.point_xyz[:4], Units=4)
+    table = ResultTable({'PointElm': ['5', '1', '9', 'missing'], 'F1': [1.0, 2.0, 3.0, 4.0]})
+    joined = coords.join(table, model=model)
+    np.testing.assert_array_equal(joined['Xcoord'][:3], model.point_xyz[[4, 0, 8], 0])
+    assert np.isnan(joined['Zcoord'][3])
+    assert model.calls['DatabaseTables.GetTableForDisplayArray'] == 1
+    assert model.calls['PointElm.GetCoordCartesian'] == 1
+
+
+def test_frame_joint_forces_coordinates():
+    clear_coord_cache()
+    model = FakeSapModel(nx=2, ny=2)
+    forces = FrameJtForces(model, 'DEAD', ['Piles'], Backend='results')
+    rows = [model.point_index[nm] for nm in forces['PointElm']]
+    np.testing.assert_array_equal(forces['Zcoord'], model.point_xyz[rows, 2])
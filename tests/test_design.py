@@ -0,0 +1,70 @@
+import numpy as np
+
+from sap2k import ResultCache, ResultSession
+from sap2k.functions.helpers import select_groups
+from sap2k.design.steel import StartDesign, GetSummaryResults, DesignSummary, WorstMembers
+from sap2k.testing import FakeSapModel
+
+
+def test_only_edited_groups_are_redesigned(tmp_path):
+    path = tmp_path / 'wharf.sdb'
+    path.write_text('v1')
+    model = FakeSapModel(nx=4, ny=4, piles=4, pile_segments=3, file_name=str(path))
+    model.groups['Bent 1'] = {2: np.arange(0, 6)}
+    model.groups['Bent 2'] = {2: np.arange(6, 12)}
+    groups = ['Bent 1', 'Bent 2']
+    cache = ResultCache(str(tmp_path / 'cache'))
+
+    assert StartDesign(model, groups, cache) == groups
+    before = GetSummaryResults(model, groups, Cache=cache, GroupLabels=True)
+
+    # Edit one group: the model is unlocked and only that group is designed
+    model.FrameObj.SetSection('3', 'PIPE36')
+    path.write_text('v2')
+    assert StartDesign(model, groups, cache) == ['Bent 1']
+    assert model.designed.tolist() == [True] * 6 + [False] * 6
+
+    after = GetSummaryResults(model, groups, Cache=cache, GroupLabels=True)
+    assert list(after['FrameName']) == list(before['FrameName'])
+    changed = after['Ratio'] != before['Ratio']
+    assert list(after['FrameName'][changed]) == ['3']
+
+    summary = DesignSummary(after, Threshold=0.8)
+    assert list(summary['Group']) == groups
+    assert summary['NumberFrames'].tolist() == [6, 6]
+    for k, grp in enumerate(groups):
+        rows = after['Group'] == grp
+        assert summary['Ratio'][k] == after['Ratio'][rows].max()
+        assert summary['NumberOver'][k] == (after['Ratio'][rows] > 0.8).sum()
+    assert WorstMembers(after, 1)['Ratio'][0] == after['Ratio'].max()
+
+
+def test_dirty_groups_designed_when_results_exist(tmp_path):
+    path = tmp_path / 'wharf.sdb'
+    path.write_text('v1')
+    model = FakeSapModel(nx=2, ny=2, piles=2, pile_segments=2, file_name=str(path))
+    StartDesign(model)
+    assert model.calls['DesignSteel.StartDesign'] == 1
+
+    # Design results exist, but none are cached for the group yet
+    cache = ResultCache(str(tmp_path / 'cache'))
+    assert StartDesign(model, ['Piles'], cache) == ['Piles']
+    assert model.calls['DesignSteel.StartDesign'] == 2
+    assert StartDesign(model, ['Piles'], cache) == []
+    assert model.calls['DesignSteel.StartDesign'] == 2
+
+    # Sections are read with one table call per StartDesign
+    assert model.calls['FrameObj.GetSection'] == 0
+    assert model.calls['DatabaseTables.GetTableForDisplayArray'] == 2
+
+
+def test_design_selection_kept_in_session(tmp_path):
+    path = tmp_path / 'wharf.sdb'
+    path.write_text('v1')
+    model = FakeSapModel(nx=2, ny=2, piles=2, pile_segments=2, file_name=str(path))
+    session = ResultSession(model)
+    StartDesign(session, ['Piles'], ResultCache(str(tmp_path / 'cache')))
+
+    # The selection cleared after the design is known to the session
+    select_groups(session, ['Piles'])
+    assert model.calls['SelectObj.Group'] == 2
@@ -0,0 +1,34 @@
+import numpy as np
+
+from sap2k import AreaForceShell, AreaForceShellIter, Envelope, JointReact, wood_armer_fields
+from sap2k.testing import FakeSapModel
+
+CASES = {'NL': ('NonlinStatic', 4), 'DEAD': ('LinStatic', 1), 'LIVE': ('LinStatic', 1)}
+
+
+def test_streamed_envelope_matches_full_table():
+    model = FakeSapModel(nx=2, ny=2, cases=CASES, combos={})
+    env = Envelope(['F3'])
+    for case in ['NL', 'DEAD', 'LIVE']:
+        env.add(JointReact(model, case, ['Pile Tips'], NLStatic=2))
+    res = env.result()
+
+    full = JointReact(model, ['NL', 'DEAD', 'LIVE'], ['Pile Tips'], NLStatic=2)
+    for k, joint in enumerate(res['Obj']):
+        rows = np.nonzero(full['Obj'] == joint)[0]
+        best = rows[np.argmax(full['F3'][rows])]
+        assert res['F3Max'][k] == full['F3'][best]
+        assert res['F3MaxCase'][k] == full['LoadCase'][best]
+        assert res['F3MaxStep'][k] == full['StepNum'][best]
+        assert res['F3Min'][k] == full['F3'][rows].min()
+
+
+def test_wood_armer_envelope():
+    model = FakeSapModel(nx=2, ny=2, cases=CASES, combos={})
+    env = Envelope(['M11'], derive=wood_armer_fields())
+    for chunk in AreaForceShellIter(model, ['NL', 'DEAD'], ['Wharf Deck'], NLStatic=2,
+                                    ChunkRows=10):
+        env.add(chunk)
+    res = env.result()
+    assert res.nrows == 16
+    assert np.all(res['MxPosMax'] >= 0) and np.all(res['MxNegMin'] <= 0)
@@ -0,0 +1,38 @@
+import numpy as np
+
+from sap2k import AreaForceShell, FrameJtForces, JointReact, base_reactions
+from sap2k.testing import FakeSapModel
+
+
+def test_area_forces_shape():
+    model = FakeSapModel(nx=4, ny=3)
+    res = AreaForceShell(model, ['DEAD', 'LIVE'], ['Wharf Deck'])
+    assert res.nrows == 4 * 3 * 4 * 2
+    assert model.calls['Results.AreaForceShell'] == 1
+
+
+def test_linear_combo_matches_cases():
+    model = FakeSapModel(nx=2, ny=2)
+    dead = JointReact(model, 'DEAD', ['Pile Tips'])
+    live = JointReact(model, 'LIVE', ['Pile Tips'])
+    combo = JointReact(model, 'LC1', ['Pile Tips'])
+    np.testing.assert_allclose(combo['F3'], 1.2 * dead['F3'] + 1.6 * live['F3'])
+
+
+def test_envelope_combo_rows():
+    model = FakeSapModel(nx=2, ny=2)
+    res = base_reactions(model, 'ENV')
+    assert list(res['StepType']) == ['Max', 'Min']
+    assert np.all(res['Fx'][0] >= res['Fx'][1])
+
+
+def test_frame_joint_coords():
+    model = FakeSapModel(nx=2, ny=2, piles=1, pile_segments=2, segment_length=5.0)
+    res = FrameJtForces(model, 'DEAD', ['Piles'])
+    assert list(res['Zcoord']) == [0.0, -5.0, -5.0, -10.0]
+
+
+def test_latency_is_recorded():
+    model = FakeSapModel(nx=1, ny=1, latency={'Results.BaseReact': 0.01})
+    base_reactions(model, 'DEAD')
+    assert model.call_time['Results.BaseReact'] >= 0.01
@@ -0,0 +1,48 @@
+import pytest
+
+from sap2k import FrameElmSort
+from sap2k.outputs.frame_output import chain_elements
+from sap2k.testing import FakeSapModel
+
+
+def test_chain_branches_and_components():
+    # Y junction at joint 2 and a separate two element piece
+    Chains, Branches, Components = chain_elements(
+        ['a', 'b', 'c', 'd', 'e', 'f'],
+        ['1', '2', '2', '4', '10', '11'],
+        ['2', '3', '4', '5', '11', '12'])
+    assert Branches == ['2']
+    assert Components == 2
+    assert sorted(len(chain) for chain in Chains) == [1, 1, 2, 2]
+    assert [row[0] for row in max(Chains, key=lambda chain: 'e' in [r[0] for r in chain])] == \
+        ['e', 'f']
+    assert sorted(row[0] for chain in Chains for row in chain) == ['a', 'b', 'c', 'd', 'e', 'f']
+
+
+def test_chain_follows_joints_regardless_of_input_order():
+    Chains, Branches, Components = chain_elements(['c', 'a', 'b'], ['3', '1', '2'],
+                                                  ['4', '2', '3'])
+    assert [[row[0] for row in chain] for chain in Chains] == [['a', 'b', 'c']]
+    assert Branches == [] and Components == 1
+
+
+def test_frame_elm_sort_sets_up_output():
+    model = FakeSapModel(nx=2, ny=2, piles=2, pile_segments=3)
+    model.Results.Setup.DeselectAllCasesAndCombosForOutput()
+    model.SetPresentUnits(6)
+    model.case_status['DEAD'] = 1
+    Result, report = FrameElmSort(model, ['Piles', 'ALL'], Report=True)
+    # The first finished case, in the caller's units
+    assert model.output_cases == ['LIVE']
+    assert model.units == 6
+    assert [len(rows) for rows in Result] == [6, 6]
+    assert report['Piles']['Gaps'] == 1
+    assert sorted([row[0] for row in chain] for chain in report['Piles']['Chains']) == \
+        [['1', '2', '3'], ['4', '5', '6']]
+
+
+def test_frame_elm_sort_needs_a_finished_case():
+    model = FakeSapModel(nx=2, ny=2, piles=2, pile_segments=3)
+    model.case_status = {nm: 1 for nm in model.case_status}
+    with pytest.raises(ValueError, match='finished running'):
+        FrameElmSort(model, ['Piles'])
@@ -0,0 +1,55 @@
+import os
+
+import numpy as np
+
+from sap2k.functions.groups import GroupIndex, group_index
+from sap2k.functions.results import ResultTable
+from sap2k.testing import FakeSapModel
+
+
+def test_load_reads_each_group_once():
+    model = FakeSapModel(nx=2, ny=2, piles=2, pile_segments=2)
+    index = GroupIndex()
+    index.load(model, ['ALL', 'Piles'])
+    index.load(model, ['Piles', 'Wharf Deck'])
+    assert model.calls['GroupDef.GetAssignments'] == 3
+
+    assert index.names('Piles') == list(model.frame_names)
+    assert index.names('Wharf Deck', 'Area') == list(model.area_names)
+    assert index.names('ALL', 5) == list(model.area_names)
+    assert index.names('Piles', 'Area') == []
+    assert len(index.names('ALL')) == len(model.point_names) + len(model.frame_names) \
+        + len(model.area_names)
+
+
+def test_group_index_kept_until_file_changes(tmp_path):
+    path = tmp_path / 'wharf.sdb'
+    path.write_text('v1')
+    model = FakeSapModel(nx=2, ny=2, file_name=str(path))
+    first = group_index(model, ['Wharf Deck'])
+    assert group_index(model, ['Wharf Deck']) is first
+    assert model.calls['GroupDef.GetAssignments'] == 1
+
+    path.write_text('v2')
+    os.utime(path, (1, 1))
+    assert group_index(model, ['Wharf Deck']) is not first
+    assert model.calls['GroupDef.GetAssignments'] == 2
+
+
+def test_tag_repeats_objects_in_several_groups():
+    model = FakeSapModel(nx=3, ny=1)
+    areas = list(model.area_names)
+    model.groups['West'] = {5: np.array([0, 1])}
+    model.groups['East'] = {5: np.array([1, 2])}
+    index = GroupIndex()
+    index.load(model, ['West', 'East'])
+
+    table = ResultTable({'Obj': [areas[2], areas[1], areas[0], 'other'],
+                         'F11': np.arange(4.0)})
+    tagged = index.tag(table, ['West', 'East'], 'Area')
+    # Rows keep their order, the shared area is repeated once per group and
+    # objects in neither group are dropped
+    assert list(tagged['Obj']) == [areas[2], areas[1], areas[1], areas[0]]
+    assert list(tagged['Group']) == ['East', 'West', 'East', 'West']
+    np.testing.assert_array_equal(tagged['F11'], [0.0, 1.0, 1.0, 2.0])
+    assert index.tag(table, ['East'], 'Frame').nrows == 0
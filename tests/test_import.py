@@ -0,0 +1,33 @@
+import os
+import subprocess
+import sys
+
+import sap2k
+
+# Import sap2k and the post-processing functions in a fresh interpreter and
+# report the time taken (numpy excluded) and the heavy modules loaded
+SCRIPT = """
+import sys, time
+import numpy
+start = time.perf_counter()
+import sap2k
+from sap2k import W_A_Eq, Envelope
+from sap2k.functions.averaging import nodal_average
+print(time.perf_counter() - start)
+print(' '.join(nm for nm in ('pandas', 'comtypes', 'scipy') if nm in sys.modules))
+"""
+
+
+def test_import_is_fast_and_light():
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(sys.path))
+    output = subprocess.run([sys.executable, '-c', SCRIPT], env=env, capture_output=True,
+                            text=True, check=True).stdout.splitlines()
+    seconds, loaded = float(output[0]), output[1] if len(output) > 1 else ''
+    assert loaded == ''
+    assert seconds < 0.5
+
+
+def test_lazy_names_resolve():
+    assert set(sap2k.__all__) <= set(dir(sap2k))
+    for name in sap2k.__all__:
+        assert callable(getattr(sap2k, name))
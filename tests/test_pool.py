@@ -0,0 +1,99 @@
+import os
+
+import pytest
+
+from sap2k.pool import InstancePool
+
+
+class FakeFile:
+    def __init__(self):
+        self.path = None
+
+    def OpenFile(self, path):
+        self.path = path
+        return 0
+
+
+class FakeModel:
+    def __init__(self):
+        self.File = FakeFile()
+
+
+class FakeSapObject:
+    def __init__(self):
+        self.SapModel = FakeModel()
+
+    def ApplicationExit(self, SaveFile):
+        return 0
+
+
+class FakeFactory:
+    def __call__(self):
+        return FakeSapObject()
+
+
+class BrokenFactory:
+    def __call__(self):
+        raise OSError("SAP2000 is not installed")
+
+
+def open_path(model, suffix=""):
+    return (os.getpid(), model.File.path + suffix)
+
+
+def fail(model):
+    raise ValueError("bad model")
+
+
+def test_pool_distributes_jobs_and_reuses_instances():
+    paths = ["model_{0}.sdb".format(i) for i in range(12)]
+    with InstancePool(FakeFactory(), workers=3) as pool:
+        results = list(pool.map(open_path, paths, suffix="!"))
+
+    assert sorted(res.path for res in results) == sorted(paths)
+    assert all(res.error is None for res in results)
+    assert all(res.value[1] == res.path + "!" for res in results)
+    # Never more instances than workers
+    assert len({res.value[0] for res in results}) <= 3
+
+
+def test_pool_reports_job_errors():
+    with InstancePool(FakeFactory(), workers=1) as pool:
+        ok = pool.submit("a.sdb", open_path)
+        bad = pool.submit("b.sdb", fail)
+        results = {res.job_id: res for res in pool.results()}
+
+    assert results[ok].error is None
+    assert "bad model" in results[bad].error
+
+
+def test_pool_raises_when_no_worker_starts():
+    with InstancePool(BrokenFactory(), workers=2) as pool:
+        pool.submit("a.sdb", open_path)
+        with pytest.raises(RuntimeError, match="not installed"):
+            list(pool.results())
+
+
+def crash(model):
+    os._exit(3)
+
+
+def test_pool_fails_job_of_dead_worker():
+    with InstancePool(FakeFactory(), workers=2) as pool:
+        bad = pool.submit("crash.sdb", crash)
+        ok = [pool.submit("model_{0}.sdb".format(i), open_path) for i in range(4)]
+        results = {res.job_id: res for res in pool.results(timeout=30)}
+
+    assert "exited with code 3" in results[bad].error
+    assert results[bad].path == "crash.sdb"
+    assert all(results[job].error is None for job in ok)
+
+
+def test_pool_raises_when_every_worker_dies():
+    with InstancePool(FakeFactory(), workers=1) as pool:
+        pool.submit("a.sdb", crash)
+        pool.submit("b.sdb", open_path)
+        results = pool.results(timeout=30)
+        assert "exited" in next(results).error
+        with pytest.raises(RuntimeError, match="stopped with 1 jobs"):
+            next(results)
@@ -0,0 +1,30 @@
+from sap2k import AreaForceShell, JointReact, Profiler, ResultSession
+from sap2k.testing import FakeSapModel
+
+
+def test_profiler_counts_and_attributes_calls():
+    model = FakeSapModel(nx=6, ny=4)
+    prof = Profiler()
+    wrapped = prof.wrap(model)
+    with prof:
+        AreaForceShell(wrapped, ['DEAD', 'LIVE'], ['Wharf Deck'], Backend='results')
+        JointReact(ResultSession(wrapped), 'DEAD', ['Pile Tips'])
+
+    by_method = prof.summary('Method')
+    calls = dict(zip(by_method['Method'], by_method['Calls']))
+    assert calls == {name: count for name, count in model.calls.items()}
+
+    by_caller = prof.summary(('Caller', 'Entry', 'Method'))
+    rows = by_caller['Method'] == 'Results.AreaForceShell'
+    assert list(by_caller['Caller'][rows]) == ['_results_call']
+    assert list(by_caller['Entry'][rows]) == ['AreaForceShell']
+    # 192 rows of 23 fields, NumberResults and ret
+    assert by_caller['Values'][rows][0] == 192 * 23 + 2
+    assert prof.wall_time >= prof.com_time > 0
+
+    stack, micros = prof.folded()[0].rsplit(' ', 1)
+    assert stack.split(';')[-1] in calls and int(micros) >= 0
+
+    # Calls made while disabled are not recorded
+    AreaForceShell(wrapped, 'DEAD', ['Wharf Deck'])
+    assert prof.summary('Method')['Calls'].sum() == sum(calls.values())
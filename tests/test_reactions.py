@@ -0,0 +1,62 @@
+import numpy as np
+
+from sap2k import BaseReactionTensor, ReactionTensor, ResultSession, base_reactions
+from sap2k.testing import FakeSapModel
+
+CASES = {'EQX': ('LinDirHist', 40), 'NL': ('NonlinStatic', 10), 'DEAD': ('LinStatic', 1)}
+
+
+def test_tensor_from_one_base_react_call():
+    model = FakeSapModel(nx=2, ny=2, cases=CASES, combos={})
+    rx = BaseReactionTensor(model, ['EQX', 'NL', 'DEAD'])
+    assert model.calls['Results.BaseReact'] == 1
+    assert rx.shape == (3, 40, 6)
+    assert rx.cases == ['EQX', 'NL', 'DEAD']
+    assert np.isnan(rx.values[1, 10:]).all() and np.isnan(rx.values[2, 1:]).all()
+
+    # The history options are restored, step-by-step rows are asked for
+    assert model.options['DirectHist'] == 1 and model.options['ModalHist'] == 1
+    model.Results.Setup.SetOptionDirectHist(2)
+    rows = base_reactions(model, 'EQX', Backend='results')
+    np.testing.assert_array_equal(rx.component('Fy')[0], rows['Fy'])
+    np.testing.assert_array_equal(rx.step_num[0], rows['StepNum'])
+
+    peak = rx.peak()
+    fx = rows['Fx']
+    k = np.argmax(np.abs(fx))
+    assert peak['Fx'][0] == fx[k] and peak['FxStep'][0] == rows['StepNum'][k]
+    np.testing.assert_allclose(rx.rms()['Fx'][0], np.sqrt(np.mean(fx ** 2)))
+    env = rx.envelope()
+    assert env['FxMax'][0] == fx.max() and env['FxMin'][0] == fx.min()
+    assert peak['Fx'][2] == rx.values[2, 0, 0]
+
+
+def test_case_order_and_moment_transfer():
+    model = FakeSapModel(nx=2, ny=2, cases=CASES, combos={})
+    table = base_reactions(model, ['DEAD', 'NL'], NLStatic=2, Backend='results')
+    rx = ReactionTensor.from_table(table, ['NL', 'MISSING', 'DEAD'])
+    assert rx.shape == (3, 10, 6)
+    assert np.isnan(rx.values[1]).all() and np.isnan(rx.peak()['Fx'][1])
+
+    moved = rx.about((0.0, 0.0, -10.0))
+    fx, my = rx.component('Fx'), rx.component('My')
+    np.testing.assert_allclose(moved.component('My'), my + 10.0 * fx)
+    np.testing.assert_array_equal(moved.component('Fx'), fx)
+
+
+def test_tensor_history_options_kept_in_session():
+    model = FakeSapModel(nx=2, ny=2, cases=CASES, combos={})
+    model.Results.Setup.SetOptionModalHist(3)
+    session = ResultSession(model)
+    first = BaseReactionTensor(session, ['EQX', 'DEAD'])
+    assert model.options['DirectHist'] == 1 and model.options['ModalHist'] == 3
+    assert model.calls['Results.Setup.SetOptionDirectHist'] == 2
+
+    # The session knows the restored options, plain extractions leave them
+    envelope = base_reactions(session, 'EQX', Backend='results')
+    assert model.calls['Results.Setup.SetOptionDirectHist'] == 2
+    assert envelope.nrows < first.shape[1]
+
+    again = BaseReactionTensor(session, ['EQX', 'DEAD'])
+    np.testing.assert_array_equal(again.values, first.values)
+    assert BaseReactionTensor(session, ['EQX'], History=1).shape[1] < first.shape[1]
@@ -0,0 +1,101 @@
+import pickle
+
+import numpy as np
+import pandas as pd
+
+from sap2k.functions.results import POOL, CodedColumn, ResultTable, StringPool
+
+FIELDS = ['NumberResults', 'Obj', 'LoadCase', 'F1', 'F2', 'ret']
+
+
+def make_table(objs, cases, f1):
+    f1 = np.asarray(f1, dtype=np.float64)
+    return ResultTable.from_output(FIELDS, (len(objs), objs, cases, f1, 2 * f1, 0), Units=4)
+
+
+def test_string_pool_codes():
+    pool = StringPool()
+    codes = pool.encode(['b', 'a', 'b'])
+    assert codes.dtype == np.int32
+    assert codes.tolist() == [0, 1, 0]
+    assert pool.encode(['a', 'c']).tolist() == [1, 2]
+    assert pool.code('c') == 2 and pool.code('missing') == -1
+    assert list(pool.decode(codes)) == ['b', 'a', 'b']
+    assert len(pool) == 3
+
+
+def test_from_output():
+    table = make_table(['1', '2', '1'], ['DEAD'] * 3, [1.0, 2.0, 3.0])
+    assert table.nrows == 3 and table.Units == 4
+    assert table['NumberResults'] == 3 and table['ret'] == 0
+    assert table.numeric_fields == ['F1', 'F2']
+    assert table.string_fields == ['Obj', 'LoadCase']
+    assert isinstance(table['Obj'], CodedColumn)
+    assert list(table['Obj']) == ['1', '2', '1']
+    assert table.codes('Obj').tolist() == POOL.encode(['1', '2', '1']).tolist()
+    # Numeric fields are rows of one contiguous block
+    assert table.to_numpy().shape == (2, 3)
+    assert np.shares_memory(table['F2'], table.block)
+    np.testing.assert_array_equal(table['F2'], [2.0, 4.0, 6.0])
+    assert (table['Obj'] == '1').tolist() == [True, False, True]
+    assert table['Obj'].isin(['2']).tolist() == [False, True, False]
+
+
+def test_concat_and_take():
+    first = make_table(['1', '2'], ['DEAD', 'DEAD'], [1.0, 2.0])
+    second = make_table(['3'], ['LIVE'], [3.0])
+    table = ResultTable.concat([first, None, second])
+    assert table.nrows == 3 and table['NumberResults'] == 3
+    assert list(table['LoadCase']) == ['DEAD', 'DEAD', 'LIVE']
+    np.testing.assert_array_equal(table['F1'], [1.0, 2.0, 3.0])
+
+    rows = table.take(np.array([2, 0]))
+    assert list(rows['Obj']) == ['3', '1']
+    np.testing.assert_array_equal(rows['F2'], [6.0, 2.0])
+    assert rows.take(rows['F1'] > 2.0).nrows == 1
+    assert ResultTable.concat([]).nrows == 0
+
+    again = pickle.loads(pickle.dumps(table))
+    assert list(again['Obj']) == list(table['Obj'])
+    np.testing.assert_array_equal(again['F1'], table['F1'])
+
+
+def test_to_pandas_categories_are_observed_names():
+    # Names pooled by other tables are not categories of this one
+    POOL.encode(['unrelated %d' % k for k in range(50)])
+    table = make_table(['2', '1', '2'], ['DEAD'] * 3, [1.0, 2.0, 3.0])
+    frame = table.to_pandas()
+    assert list(frame.columns) == ['Obj', 'LoadCase', 'F1', 'F2']
+    assert isinstance(frame['Obj'].dtype, pd.CategoricalDtype)
+    assert sorted(frame['Obj'].cat.categories) == ['1', '2']
+    assert list(frame['Obj']) == ['2', '1', '2']
+    sums = frame.groupby('Obj', observed=False)['F1'].sum()
+    assert sums.to_dict() == {'1': 2.0, '2': 4.0}
+    assert list(frame['LoadCase'].cat.categories) == ['DEAD']
+
+
+def test_setitem_updates_one_column():
+    table = make_table(['1', '2', '1'], ['DEAD'] * 3, [1.0, 2.0, 3.0])
+    block = table.block
+    codes = table.codes('Obj')
+    table['F1'] = [4.0, 5.0, 6.0]
+    # The row is overwritten in place, string fields are not re-encoded
+    assert table.block is block and table.codes('Obj') is codes
+    np.testing.assert_array_equal(block[0], [4.0, 5.0, 6.0])
+
+    table['F3'] = table['F1'] + table['F2']
+    assert table.numeric_fields == ['F1', 'F2', 'F3']
+    np.testing.assert_array_equal(table.block[2], [6.0, 9.0, 12.0])
+    assert np.shares_memory(table['F3'], table.block)
+
+    table['F2'] = ['a', 'b', 'c']
+    assert table.numeric_fields == ['F1', 'F3'] and table.block.shape == (2, 3)
+    assert list(table['F2']) == ['a', 'b', 'c']
+    table['ret'] = 1
+    assert table['ret'] == 1 and table.nrows == 3
+
+    # Tables on a read-only block are repacked rather than written
+    block.setflags(write=False)
+    table = ResultTable.from_block(['F1', 'Obj'], block[:1], {'Obj': table['Obj']})
+    table['F1'] = [0.0, 0.0, 0.0]
+    assert table['F1'].tolist() == [0.0] * 3 and block[0].tolist() == [4.0, 5.0, 6.0]
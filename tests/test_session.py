@@ -0,0 +1,70 @@
+from sap2k import JointReact, ResultSession
+from sap2k.functions.helpers import result_setup, select_groups
+from sap2k.testing import FakeSapModel
+
+SETUP = 'Results.Setup.'
+
+
+def count(model, *names):
+    return {name: model.calls[name] for name in names}
+
+
+def test_session_issues_only_the_delta():
+    model = FakeSapModel(nx=2, ny=2)
+    session = ResultSession(model)
+
+    result_setup(session, ['DEAD', 'LIVE'], Units=4)
+    assert model.calls['SetPresentUnits'] == 1
+    assert model.calls[SETUP + 'DeselectAllCasesAndCombosForOutput'] == 1
+    assert model.calls[SETUP + 'SetCaseSelectedForOutput'] == 2
+    assert model.calls[SETUP + 'SetOptionNLStatic'] == 1
+
+    # The same state again issues no calls
+    before = dict(model.calls)
+    result_setup(session, ['LIVE', 'DEAD'], Units=4)
+    session.set_units(4)
+    assert model.calls == before
+
+    # Only the cases which change are selected or deselected, combinations
+    # are remembered as such
+    result_setup(session, ['LIVE', 'LC1'], Units=6)
+    assert model.calls['SetPresentUnits'] == 2
+    assert model.calls[SETUP + 'DeselectAllCasesAndCombosForOutput'] == 1
+    assert model.calls[SETUP + 'SetCaseSelectedForOutput'] == 4
+    assert model.calls[SETUP + 'SetComboSelectedForOutput'] == 1
+    assert model.calls[SETUP + 'SetOptionNLStatic'] == 1
+    result_setup(session, ['LIVE'], Units=6)
+    assert model.calls[SETUP + 'SetCaseSelectedForOutput'] == 4
+    assert model.calls[SETUP + 'SetComboSelectedForOutput'] == 2
+
+    # Groups are added to the selection, and the selection cleared when one
+    # is dropped
+    select_groups(session, ['Wharf Deck'])
+    select_groups(session, ['Wharf Deck', 'Pile Tips'])
+    assert model.calls['SelectObj.ClearSelection'] == 1
+    assert model.calls['SelectObj.Group'] == 2
+    select_groups(session, ['Pile Tips'])
+    assert model.calls['SelectObj.ClearSelection'] == 2
+    assert model.calls['SelectObj.Group'] == 3
+
+
+def test_invalidated_session_sets_everything_again():
+    model = FakeSapModel(nx=2, ny=2)
+    session = ResultSession(model)
+    first = JointReact(session, ['DEAD', 'LIVE'], ['Pile Tips'], Backend='results')
+    calls = count(model, 'SetPresentUnits', SETUP + 'DeselectAllCasesAndCombosForOutput',
+                  SETUP + 'SetCaseSelectedForOutput', 'SelectObj.ClearSelection')
+
+    # Selections changed behind the session's back
+    model.Results.Setup.DeselectAllCasesAndCombosForOutput()
+    model.SelectObj.ClearSelection()
+    session.invalidate()
+    again = JointReact(session, ['DEAD', 'LIVE'], ['Pile Tips'], Backend='results')
+    assert again.nrows == first.nrows
+    assert count(model, *calls) == {'SetPresentUnits': calls['SetPresentUnits'] + 1,
+                                    SETUP + 'DeselectAllCasesAndCombosForOutput':
+                                        calls[SETUP + 'DeselectAllCasesAndCombosForOutput'] + 2,
+                                    SETUP + 'SetCaseSelectedForOutput':
+                                        calls[SETUP + 'SetCaseSelectedForOutput'] + 2,
+                                    'SelectObj.ClearSelection':
+                                        calls['SelectObj.ClearSelection'] + 2}
@@ -0,0 +1,61 @@
+import numpy as np
+
+from sap2k import AreaForceShell, JointReact, Selection, spatial_index
+from sap2k.functions.spatial import PointGrid, SpatialIndex
+from sap2k.testing import FakeSapModel
+
+
+def test_grid_queries_match_brute_force():
+    rng = np.random.default_rng(0)
+    xyz = rng.uniform(0, 50, (2000, 3))
+    grid = PointGrid(xyz)
+    lo, hi = np.array([10.0, 5.0, 0.0]), np.array([30.0, 20.0, 25.0])
+    expected = np.nonzero(np.all((xyz >= lo) & (xyz <= hi), axis=1))[0]
+    np.testing.assert_array_equal(grid.box(lo, hi), expected)
+
+    center = np.array([25.0, 25.0, 25.0])
+    dist = np.sum((xyz - center)**2, axis=1)
+    np.testing.assert_array_equal(grid.radius(center, 8.0), np.nonzero(dist <= 64.0)[0])
+    np.testing.assert_array_equal(grid.nearest(center, 5), np.argsort(dist)[:5])
+
+
+def test_region_selection_extracts_only_region():
+    model = FakeSapModel(nx=6, ny=4)
+    deck = spatial_index(model).box((0, 0, -1), (20, 20, 1), contain='all')
+    assert len(deck.names('Area')) == 4
+
+    region = AreaForceShell(model, 'DEAD', deck)
+    full = AreaForceShell(model, 'DEAD', ['Wharf Deck'])
+    mask = full['Obj'].isin(deck.names('Area'))
+    assert set(region['Obj']) == set(deck.names('Area'))
+    np.testing.assert_array_equal(region['M11'], full['M11'][mask])
+
+
+def test_selection_of_points():
+    model = FakeSapModel(nx=2, ny=2, piles=2, pile_segments=1)
+    tips = spatial_index(model).box((-1, -1, -10), (100, 100, -1))
+    assert JointReact(model, 'DEAD', tips).nrows == 2
+    assert (tips | Selection(Point=['1'])).names('Point')[-1] == '1'
+
+
+def test_connectivity_is_read_in_bulk():
+    model = FakeSapModel(nx=3, ny=2, piles=2, pile_segments=2)
+    for Elements in (False, True):
+        index = spatial_index(model, Elements=Elements)
+        assert model.calls['FrameObj.GetPoints'] == model.calls['AreaObj.GetPoints'] == 0
+        assert model.calls['FrameElm.GetPoints'] == model.calls['AreaElm.GetPoints'] == 0
+        assert index.frame_names == model.frame_names.tolist()
+        np.testing.assert_array_equal(index.frame_points, model.frame_points)
+        np.testing.assert_array_equal(index.area_points, model.area_points.ravel())
+        np.testing.assert_array_equal(index.area_offsets, np.arange(0, model.area_points.size, 4))
+
+
+def test_connectivity_falls_back_to_get_points():
+    model = FakeSapModel(nx=3, ny=2, piles=2, pile_segments=2)
+    bulk = spatial_index(model)
+    model.DatabaseTables.GetTableForDisplayArray = lambda TableKey, FieldKeyList, GroupName: \
+        (FieldKeyList, 1, (), 0, (), 1)
+    index = SpatialIndex.from_model(model)
+    assert model.calls['FrameObj.GetPoints'] == len(model.frame_names)
+    np.testing.assert_array_equal(index.frame_points, bulk.frame_points)
+    np.testing.assert_array_equal(index.area_points, bulk.area_points)
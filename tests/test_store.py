@@ -0,0 +1,60 @@
+import numpy as np
+
+from sap2k import AreaForceShell, AreaForceShellIter, Envelope, ResultStore, wood_armer_fields
+from sap2k.functions.averaging import nodal_average
+from sap2k.functions.results import ResultTable
+from sap2k.testing import FakeSapModel
+
+CASES = {'NL': ('NonlinStatic', 25), 'DEAD': ('LinStatic', 1)}
+
+
+def test_store_round_trip_and_partitions(tmp_path):
+    model = FakeSapModel(nx=3, ny=3, cases=CASES, combos={})
+    store = ResultStore(str(tmp_path / 'th'), StepsPerPartition=10)
+    chunks = AreaForceShellIter(model, ['NL', 'DEAD'], ['Wharf Deck'], NLStatic=2, ChunkRows=100)
+    assert store.write(chunks, 'shells') == 936
+    assert [part[:2] for part in store.partitions('shells')] == \
+        [['NL', (0, 9)], ['NL', (10, 19)], ['NL', (20, 29)], ['DEAD', (0, 9)]]
+
+    # Reopened store, numeric fields read through memory maps
+    store = ResultStore(str(tmp_path / 'th'))
+    chunk = next(store.chunks('shells'))
+    assert isinstance(chunk['M11'], np.memmap)
+    full = AreaForceShell(model, ['NL', 'DEAD'], ['Wharf Deck'], NLStatic=2)
+    stored = store.read('shells')
+    order = lambda tbl: np.lexsort((tbl['StepNum'], tbl.codes('PointElm'), tbl.codes('Elm'),
+                                    tbl.codes('LoadCase')))
+    for fldnm in ('M11', 'StepNum'):
+        np.testing.assert_array_equal(stored[fldnm][order(stored)], full[fldnm][order(full)])
+
+    steps = np.concatenate([tbl['StepNum'] for tbl in store.chunks('shells', 'NL', (5, 12))])
+    assert set(steps) == set(range(5, 13))
+
+
+def test_streamed_processing_from_store(tmp_path):
+    model = FakeSapModel(nx=3, ny=2, cases=CASES, combos={})
+    store = ResultStore(str(tmp_path / 'th'), StepsPerPartition=8)
+    store.write(AreaForceShellIter(model, 'NL', ['Wharf Deck'], NLStatic=2), 'shells')
+    full = AreaForceShell(model, 'NL', ['Wharf Deck'], NLStatic=2)
+
+    averaged = nodal_average(store.chunks('shells'), ['M11'])
+    assert averaged.nrows == nodal_average(full, ['M11']).nrows
+
+    env = Envelope(['M11'], derive=wood_armer_fields())
+    for chunk in store.chunks('shells'):
+        env.add(chunk)
+    direct = Envelope(['M11'], derive=wood_armer_fields())
+    direct.add(full)
+    np.testing.assert_allclose(env.result()['MxPosMax'], direct.result()['MxPosMax'])
+
+
+def test_numpy_scalars_are_stored(tmp_path):
+    table = ResultTable({'LoadCase': ['DEAD'] * 3, 'StepNum': [0.0, 0.0, 0.0],
+                         'gx': np.float64(1.5), 'Count': np.int64(3), 'F1': [1.0, 2.0, 3.0]})
+    store = ResultStore(str(tmp_path / 'th'))
+    store.write(table, 'scalars')
+
+    stored = ResultStore(str(tmp_path / 'th')).read('scalars')
+    assert stored['gx'] == 1.5 and stored['Count'] == 3
+    assert stored.numeric_fields == ['StepNum', 'F1']
+    np.testing.assert_array_equal(stored['F1'], [1.0, 2.0, 3.0])
@@ -0,0 +1,33 @@
+import numpy as np
+
+from sap2k import AreaForceShell, AreaForceShellIter
+from sap2k.functions.averaging import nodal_average
+from sap2k.testing import FakeSapModel
+
+CASES = {'NL': ('NonlinStatic', 5), 'DEAD': ('LinStatic', 1)}
+
+
+def test_chunks_match_full_extraction():
+    model = FakeSapModel(nx=3, ny=3, cases=CASES, combos={})
+    full = AreaForceShell(model, ['NL', 'DEAD'], ['Wharf Deck'], NLStatic=2)
+    chunks = list(AreaForceShellIter(model, ['NL', 'DEAD'], ['Wharf Deck'], NLStatic=2,
+                                     ChunkRows=50))
+    assert max(chunk.nrows for chunk in chunks) <= 50
+    assert sum(chunk.nrows for chunk in chunks) == full.nrows
+
+
+def test_step_range():
+    model = FakeSapModel(nx=2, ny=2, cases=CASES, combos={})
+    chunks = AreaForceShellIter(model, 'NL', ['Wharf Deck'], NLStatic=2, Steps=(2, 3))
+    steps = np.concatenate([chunk['StepNum'] for chunk in chunks])
+    assert set(steps) == {2.0, 3.0}
+
+
+def test_streamed_average_matches():
+    model = FakeSapModel(nx=3, ny=2, cases=CASES, combos={})
+    full = nodal_average(AreaForceShell(model, ['NL', 'DEAD'], ['Wharf Deck'], NLStatic=2),
+                         ['M11'])
+    streamed = nodal_average(AreaForceShellIter(model, ['NL', 'DEAD'], ['Wharf Deck'],
+                                                NLStatic=2, ChunkRows=7), ['M11'])
+    key = lambda tbl: sorted(zip(tbl['PointElm'], tbl['LoadCase'], tbl['StepNum'], tbl['M11']))
+    np.testing.assert_allclose([row[3] for row in key(full)], [row[3] for row in key(streamed)])
@@ -0,0 +1,43 @@
+import numpy as np
+import pytest
+
+from sap2k import AreaForceShell, SectionCutForces, SectionCuts, spatial_index, strip_cuts
+from sap2k.functions.results import ResultTable
+from sap2k.testing import FakeSapModel
+
+
+def test_cuts_integrate_linear_field_exactly():
+    model = FakeSapModel(nx=12, ny=4)
+    cuts = strip_cuts('S1', (0, 15), (120, 15), 30, spacing=25) + [('Edge', (20, 0), (20, 40))]
+    section = SectionCuts.from_model(model, cuts)
+    np.testing.assert_allclose(section.length, [30, 30, 30, 30, 30, 30, 40])
+
+    # M11 equal to the X coordinate of each joint, F11 and V13 uniform
+    raw = AreaForceShell(model, 'DEAD', ['Wharf Deck'])
+    index = spatial_index(model, Elements=True)
+    x = index.coords.xyz[[index.coords.index[nm] for nm in raw['PointElm']], 0]
+    field = dict(raw, M11=x, F11=np.ones(raw.nrows), V13=np.full(raw.nrows, 2.0))
+    res = section.integrate(ResultTable(field, Units=raw.Units))
+
+    stations = np.array([0, 24, 48, 72, 96, 120, 20])
+    np.testing.assert_allclose(res['M11'], stations * section.length)
+    np.testing.assert_allclose(res['F11'], section.length)
+    np.testing.assert_allclose(res['Vn'], -2 * section.length)
+
+
+def test_streamed_cuts_match_single_table():
+    model = FakeSapModel(nx=6, ny=4)
+    cuts = [('Diag', (3, 2), (50, 37))]
+    section = SectionCuts.from_model(model, cuts)
+    whole = section.integrate(AreaForceShell(model, ['DEAD', 'ENV'], ['Wharf Deck']))
+    streamed = SectionCutForces(model, ['DEAD', 'ENV'], ['Wharf Deck'], section, ChunkRows=50)
+    assert list(whole['LoadCase']) == ['DEAD', 'ENV', 'ENV']
+    np.testing.assert_allclose(streamed['M22'], whole['M22'])
+    np.testing.assert_allclose(streamed['Mn'], whole['Mn'])
+
+
+def test_strip_cuts_need_spacing_or_stations():
+    cuts = strip_cuts('S1', (0, 0), (10, 0), 4, stations=[5.0])
+    assert cuts == [('S1_1', (5.0, -2.0), (5.0, 2.0))]
+    with pytest.raises(ValueError, match='spacing or stations'):
+        strip_cuts('S1', (0, 0), (10, 0), 4)
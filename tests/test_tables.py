@@ -0,0 +1,64 @@
+import numpy as np
+
+from sap2k import AreaForceShell, base_reactions
+from sap2k.functions import tables
+from sap2k.testing import FakeSapModel
+
+CASES = {'NL': ('NonlinStatic', 3), 'DEAD': ('LinStatic', 1), 'LIVE': ('LinStatic', 1)}
+COMBOS = {'C1': (0, [('DEAD', 1.2), ('LIVE', 1.6)])}
+
+
+def assert_same(a, b):
+    assert list(a) == list(b)
+    for fldnm in a:
+        if isinstance(a[fldnm], np.ndarray):
+            np.testing.assert_array_equal(a[fldnm], b[fldnm])
+        else:
+            assert list(np.atleast_1d(a[fldnm])) == list(np.atleast_1d(b[fldnm]))
+
+
+def test_tables_match_results():
+    model = FakeSapModel(nx=3, ny=2, cases=CASES, combos=COMBOS)
+    for NLStatic in (1, 2):
+        assert_same(AreaForceShell(model, ['NL', 'C1'], ['Wharf Deck'], NLStatic=NLStatic,
+                                   Backend='results'),
+                    AreaForceShell(model, ['NL', 'C1'], ['Wharf Deck'], NLStatic=NLStatic,
+                                   Backend='tables'))
+    assert_same(base_reactions(model, ['DEAD', 'C1'], Backend='results'),
+                base_reactions(model, ['DEAD', 'C1'], Backend='tables'))
+
+
+def test_auto_chooses_faster_backend():
+    tables._timings.clear()
+    tables._rows_per_case.clear()
+    model = FakeSapModel(nx=2, ny=2, latency={'Results.AreaForceShell': 0.05})
+    assert tables.choose_backend('AreaForceShell', ['Wharf Deck'], ['DEAD']) == 'results'
+    tables.benchmark_backends(AreaForceShell, model, ['DEAD'], ['Wharf Deck'])
+    assert tables.choose_backend('AreaForceShell', ['Wharf Deck'], ['DEAD']) == 'tables'
+
+
+def test_auto_times_each_backend_first():
+    tables._timings.clear()
+    tables._rows_per_case.clear()
+    model = FakeSapModel(nx=2, ny=2, latency={'Results.AreaForceShell': 0.05})
+    for _ in range(3):
+        AreaForceShell(model, ['DEAD'], ['Wharf Deck'], Backend='auto')
+    # Results, then tables to time it, then the faster tables again
+    assert model.calls['Results.AreaForceShell'] == 1
+    assert model.calls['DatabaseTables.GetTableForDisplayArray'] == 2
+
+
+def test_default_backend_is_results():
+    model = FakeSapModel(nx=2, ny=2)
+    for _ in range(3):
+        AreaForceShell(model, ['DEAD'], ['Wharf Deck'])
+    assert model.calls['Results.AreaForceShell'] == 3
+    assert model.calls['DatabaseTables.GetTableForDisplayArray'] == 0
+
+
+def test_backends_share_history_options():
+    model = FakeSapModel(nx=2, ny=2, cases={'EQX': ('LinDirHist', 5)}, combos={})
+    model.Results.Setup.SetOptionDirectHist(2)
+    assert_same(base_reactions(model, 'EQX', Backend='results'),
+                base_reactions(model, 'EQX', Backend='tables'))
+    assert base_reactions(model, 'EQX', Backend='tables').nrows == 5
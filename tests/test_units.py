@@ -0,0 +1,36 @@
+import numpy as np
+
+from sap2k import AreaForceShell, FrameForces, Envelope
+from sap2k.functions.units import convert_units, unit_scales
+from sap2k.testing import FakeSapModel
+
+
+def test_conversion_factors_and_round_trip():
+    model = FakeSapModel(nx=4, ny=4)
+    frames = FrameForces(model, 'DEAD', ['Piles'], Units='kip, ft')
+    metric = frames.to_units('kN, m')
+    assert metric.Units == 6
+    np.testing.assert_allclose(metric['P'], frames['P'] * 4.4482216152605)
+    np.testing.assert_allclose(metric['M3'], frames['M3'] * 1.3558179483314)
+    np.testing.assert_allclose(metric['ObjSta'], frames['ObjSta'] * 0.3048)
+    assert list(metric['Obj']) == list(frames['Obj'])
+    np.testing.assert_allclose(convert_units(metric, 4).to_numpy(), frames.to_numpy())
+
+    force, length = unit_scales(3, 4)
+    assert force == 1 and np.isclose(length, 1 / 12)
+
+
+def test_shell_and_envelope_fields():
+    model = FakeSapModel(nx=4, ny=4)
+    shells = AreaForceShell(model, 'DEAD', ['Wharf Deck'], Units=1)
+    env = Envelope(['F11', 'M11'])
+    env.add(shells)
+    result = env.result().to_units(3)
+    # lb, in to kip, in: only the force unit changes
+    np.testing.assert_allclose(result['F11Max'], env.result()['F11Max'] / 1000)
+    np.testing.assert_allclose(result['M11Min'], env.result()['M11Min'] / 1000)
+    np.testing.assert_array_equal(result['M11MaxStep'], env.result()['M11MaxStep'])
+
+    metric = shells.to_units(10)
+    np.testing.assert_allclose(metric['F11'], shells['F11'] * 4.4482216152605 / 0.0254)
+    np.testing.assert_allclose(metric['FAngle'], shells['FAngle'])
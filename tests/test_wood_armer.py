@@ -0,0 +1,42 @@
+import numpy as np
+import pytest
+
+from sap2k import W_A_Eq
+from sap2k.outputs.shell_output import W_A_Eq_Array
+
+# (M11, M22, M12, alpha) and [Mx_pos, Ma_pos, Mx_neg, Ma_neg] returned by the
+# original scalar W_A_Eq, covering each branch of the positive and negative
+# moment demands
+BASELINE = [
+    ((10.0, 5.0, 2.0, 90), [12.0, 7.0, 0.0, 0.0]),
+    ((-50.0, 5.0, 1.0, 90), [0.0, 5.02, -50.2, 0.0]),                 # Mx_pos < 0
+    ((10.0, -20.0, 1.0, 90), [10.05, 0.0, 0.0, -20.1]),               # Ma_pos < 0
+    ((50.0, 5.0, 1.0, 90), [51.0, 6.0, 0.0, 0.0]),                    # Mx_neg > 0
+    ((-10.0, 20.0, 1.0, 90), [0.0, 20.1, -10.05, 0.0]),               # Ma_neg > 0
+    ((0.0, 0.0, 0.0, 90), [0.0, 0.0, 0.0, 0.0]),
+    ((12.5, -3.0, 4.0, 60), [17.833333333333336, 0.0, 0.0, -4.248157397919748]),
+    ((-8.0, -6.0, 2.5, 75), [0.0, 0.0, -8.014816608312184, -7.354562570467798]),
+    ((3.0, 2.0, 0.0, 90), [3.0, 2.0, 0.0, 0.0]),
+]
+
+
+@pytest.mark.parametrize('args, expected', BASELINE)
+def test_scalar_matches_baseline(args, expected):
+    result = W_A_Eq(*args)
+    assert result == expected
+    # Zero results are floats rather than the integer 0
+    assert all(type(val) is float for val in result)
+
+
+def test_array_matches_baseline():
+    M11, M22, M12, alpha = (np.array(col) for col in zip(*(args for args, _ in BASELINE)))
+    result = W_A_Eq_Array(M11, M22, M12, alpha)
+    np.testing.assert_allclose(np.stack(result), np.array([exp for _, exp in BASELINE]).T,
+                               rtol=1e-12, atol=1e-12)
+
+
+def test_degenerate_angle_does_not_raise():
+    with np.errstate(all='raise'):
+        result = W_A_Eq_Array([1.0, 2.0], [1.0, 1.0], [1.0, 0.0], alpha=0)
+    assert not np.isfinite(np.stack(result)).all()
+    assert not all(np.isfinite(W_A_Eq(1.0, 1.0, 1.0, alpha=0)))